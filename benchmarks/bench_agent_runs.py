@@ -0,0 +1,322 @@
+"""
+Benchmark: concurrent agent runs (`POST /chat/agent/{id}/run`) end to end.
+
+The FastAPI app is booted in-process (uvicorn in a background thread) against a
+throw-away DINGENT_HOME, with
+  - a deterministic fake chat model patched into the LLM resolution: the first
+    turn calls the stub tool, the second streams a fixed answer in N chunks;
+  - a local FastMCP stub plugin (stdio, like tests/plugins/my_server.py) that
+    the seeded assistant uses, so every run makes one real MCP tool call.
+
+N concurrent SSE streams are driven against a seeded guest workspace and the
+script reports throughput, time-to-first-event, latency percentiles, database
+queries per run (app engine, plus checkpoint writes) and RSS growth of the
+process. Client and server share the process, so treat the numbers as a
+baseline for comparing changes, not as absolute capacity.
+
+Usage:
+    python benchmarks/bench_agent_runs.py --concurrency 16 --runs 200
+    python benchmarks/bench_agent_runs.py --concurrency 64 --runs 1000 --chunks 32 --llm-latency 0.05
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+import uuid
+
+os.environ.setdefault("DINGENT_HOME", tempfile.mkdtemp(prefix="dingent-bench-"))
+# 压测关注的是执行路径本身，限流会让大部分请求直接 429
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+
+import aiohttp  # noqa: E402
+import psutil  # noqa: E402
+import uvicorn  # noqa: E402
+from langchain_core.language_models.chat_models import BaseChatModel  # noqa: E402
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage, ToolMessage  # noqa: E402
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult  # noqa: E402
+from sqlalchemy import event  # noqa: E402
+from sqlmodel import Session  # noqa: E402
+
+from dingent.core import metrics  # noqa: E402
+from dingent.core.db.models import Assistant, AssistantPluginLink, Plugin, Workflow, WorkflowNode, Workspace  # noqa: E402
+from dingent.core.db.session import create_db_and_tables, engine  # noqa: E402
+from dingent.core.paths import paths  # noqa: E402
+
+PLUGIN_ID = "bench_stub"
+TOOL_NAME = "lookup"
+WORKSPACE_SLUG = "bench"
+WORKFLOW_NAME = "bench"
+
+STUB_SERVER = '''
+from fastmcp import FastMCP
+
+mcp = FastMCP(name="BenchStub")
+
+
+@mcp.tool()
+def lookup(query: str = "") -> dict:
+    """Deterministic lookup used by the agent-run benchmark."""
+    return {"model_text": f"result for {query}", "display": None}
+
+
+if __name__ == "__main__":
+    mcp.run()
+'''
+
+
+class FakeChatModel(BaseChatModel):
+    """确定性的聊天模型：有可用的 stub 工具且本轮尚未调用时发起工具调用，否则分块输出固定回答。"""
+
+    chunks: int = 8
+    latency: float = 0.0
+    bound_tools: list[str] = []
+
+    @property
+    def _llm_type(self) -> str:
+        return "bench-fake"
+
+    def bind_tools(self, tools, **kwargs):
+        return self.model_copy(update={"bound_tools": [t.name for t in tools]})
+
+    def _wants_tool(self, messages) -> bool:
+        if TOOL_NAME not in self.bound_tools:
+            return False
+        for message in reversed(messages):
+            if isinstance(message, ToolMessage):
+                return False
+            if isinstance(message, HumanMessage):
+                return True
+        return True
+
+    def _tool_call(self) -> dict:
+        return {"name": TOOL_NAME, "args": {"query": "bench"}, "id": f"call_{uuid.uuid4().hex[:12]}"}
+
+    def _answer_parts(self) -> list[str]:
+        return [f"token{i} " for i in range(self.chunks)]
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        if self._wants_tool(messages):
+            message = AIMessage(content="", tool_calls=[self._tool_call()])
+        else:
+            message = AIMessage(content="".join(self._answer_parts()))
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _astream(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self._wants_tool(messages):
+            call = self._tool_call()
+            chunk = AIMessageChunk(content="", tool_call_chunks=[{"name": call["name"], "args": json.dumps(call["args"]), "id": call["id"], "index": 0}])
+            yield ChatGenerationChunk(message=chunk)
+            return
+        for part in self._answer_parts():
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=part))
+            if run_manager:
+                await run_manager.on_llm_new_token(part, chunk=chunk)
+            yield chunk
+
+
+def _install_fake_llm(model: FakeChatModel) -> None:
+    # get_agent_context 在每次请求中从该模块导入解析函数，直接替换模块属性即可
+    from dingent.core.llms import service
+
+    service.get_llm_for_context = lambda *args, **kwargs: model
+    service.get_llms_for_assistants = lambda session, assistant_ids, **kwargs: dict.fromkeys(assistant_ids, model)
+
+
+def _write_stub_plugin() -> None:
+    plugin_dir = paths.plugins_dir / PLUGIN_ID
+    plugin_dir.mkdir(parents=True, exist_ok=True)
+    (plugin_dir / "server.py").write_text(STUB_SERVER, encoding="utf-8")
+    (plugin_dir / "plugin.toml").write_text(
+        f'[plugin]\nid = "{PLUGIN_ID}"\ndisplay_name = "Bench Stub"\ndescription = "Deterministic MCP server"\nversion = "0.1.0"\n\n'
+        f'[plugin.server]\ncommand = {json.dumps(sys.executable)}\nargs = ["server.py"]\n',
+        encoding="utf-8",
+    )
+
+
+def _seed() -> None:
+    """游客可访问的工作空间 + 单节点 workflow，其助手挂载 stub 插件。"""
+    create_db_and_tables()
+    with Session(engine) as session:
+        workspace = Workspace(name="Bench", slug=WORKSPACE_SLUG, allow_guest_access=True)
+        plugin = Plugin(registry_id=PLUGIN_ID, display_name="Bench Stub", description="Deterministic MCP server", config_schema={})
+        session.add_all([workspace, plugin])
+        session.flush()
+        assistant = Assistant(name="BenchAssistant", description="Calls the stub tool once per run", workspace_id=workspace.id)
+        workflow = Workflow(name=WORKFLOW_NAME, workspace_id=workspace.id)
+        session.add_all([assistant, workflow])
+        session.flush()
+        session.add(AssistantPluginLink(assistant_id=assistant.id, plugin_id=plugin.id))
+        session.add(WorkflowNode(workflow_id=workflow.id, assistant_id=assistant.id, is_start_node=True, position={"x": 0, "y": 0}))
+        session.commit()
+
+
+def _free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def _start_server(port: int) -> uvicorn.Server:
+    from dingent.server.main import app
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    return server
+
+
+def _chat_payload() -> dict:
+    return {
+        "threadId": str(uuid.uuid4()),
+        "runId": str(uuid.uuid4()),
+        "state": {},
+        "messages": [{"id": str(uuid.uuid4()), "role": "user", "content": "ping"}],
+        "tools": [],
+        "context": [],
+        "forwardedProps": {},
+    }
+
+
+async def _wait_ready(session: aiohttp.ClientSession, base_url: str, timeout: float = 120.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/api/v1/health/ready") as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("server did not become ready")
+
+
+async def _one_run(session: aiohttp.ClientSession, url: str) -> tuple[float, float, int]:
+    """返回 (首个事件耗时 ms, 总耗时 ms, 事件数)。"""
+    headers = {"Accept": "text/event-stream", "X-Visitor-ID": str(uuid.uuid4())}
+    start = time.perf_counter()
+    first = None
+    events = 0
+    async with session.post(url, json=_chat_payload(), headers=headers) as resp:
+        if resp.status >= 400:
+            raise RuntimeError(f"run -> {resp.status}: {(await resp.text())[:200]}")
+        async for line in resp.content:
+            if line.startswith(b"data:"):
+                if first is None:
+                    first = time.perf_counter()
+                events += 1
+    end = time.perf_counter()
+    return ((first or end) - start) * 1000, (end - start) * 1000, events
+
+
+async def _drive(url: str, runs: int, concurrency: int, timeout: float) -> dict:
+    semaphore = asyncio.Semaphore(concurrency)
+    ttfe: list[float] = []
+    latency: list[float] = []
+    events = 0
+    errors: list[str] = []
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=timeout)) as session:
+
+        async def one() -> None:
+            nonlocal events
+            async with semaphore:
+                try:
+                    first_ms, total_ms, count = await _one_run(session, url)
+                except Exception as e:
+                    errors.append(f"{type(e).__name__}: {e}")
+                    return
+                ttfe.append(first_ms)
+                latency.append(total_ms)
+                events += count
+
+        started = time.perf_counter()
+        await asyncio.gather(*(one() for _ in range(runs)))
+        wall = time.perf_counter() - started
+    return {"ttfe": ttfe, "latency": latency, "events": events, "errors": errors, "wall": wall}
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def _checkpoint_writes() -> float:
+    return metrics.REGISTRY.get_sample_value("dingent_checkpoint_write_bytes_count") or 0.0
+
+
+def _report(args, result: dict, queries: int, checkpoint_writes: float, rss_before: int, rss_after: int) -> None:
+    ok = len(result["latency"])
+    print(f"runs={args.runs} concurrency={args.concurrency} chunks={args.chunks} llm_latency={args.llm_latency}s")
+    print(f"  ok={ok} errors={len(result['errors'])} wall={result['wall']:.2f}s")
+    if result["errors"]:
+        print(f"  first error: {result['errors'][0]}")
+    if not ok:
+        return
+    print(f"  throughput     {ok / result['wall']:8.1f} runs/s   {result['events'] / result['wall']:8.1f} events/s")
+    for name in ("ttfe", "latency"):
+        values = result[name]
+        percentiles = "  ".join(f"p{int(q * 100)}={_pct(values, q):8.1f}ms" for q in (0.5, 0.95, 0.99))
+        print(f"  {name:<14} mean={statistics.mean(values):8.1f}ms  {percentiles}")
+    print(f"  db queries/run {queries / ok:8.1f}   checkpoint writes/run {checkpoint_writes / ok:6.1f}")
+    print(f"  rss            {rss_before / 2**20:8.1f}MB -> {rss_after / 2**20:8.1f}MB  (growth {(rss_after - rss_before) / 2**20:+.1f}MB)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--warmup", type=int, default=5, help="runs before measuring (graph build, MCP connection, caches)")
+    parser.add_argument("--chunks", type=int, default=8, help="streamed answer chunks per run")
+    parser.add_argument("--llm-latency", type=float, default=0.0, help="simulated seconds before the fake model responds")
+    parser.add_argument("--timeout", type=float, default=300.0)
+    args = parser.parse_args()
+
+    _write_stub_plugin()
+    _seed()
+    _install_fake_llm(FakeChatModel(chunks=args.chunks, latency=args.llm_latency))
+
+    port = _free_port()
+    base_url = f"http://127.0.0.1:{port}"
+    url = f"{base_url}/api/v1/{WORKSPACE_SLUG}/chat/agent/{WORKFLOW_NAME}/run"
+    server = _start_server(port)
+
+    queries = 0
+
+    def count_query(*_args):
+        nonlocal queries
+        queries += 1
+
+    async def bench() -> None:
+        async with aiohttp.ClientSession() as session:
+            await _wait_ready(session, base_url)
+        warmup = await _drive(url, args.warmup, min(args.warmup, args.concurrency), args.timeout) if args.warmup else None
+        if warmup and warmup["errors"]:
+            raise SystemExit(f"warmup failed: {warmup['errors'][0]}")
+
+        process = psutil.Process()
+        rss_before = process.memory_info().rss
+        checkpoint_before = _checkpoint_writes()
+        event.listen(engine, "before_cursor_execute", count_query)
+        try:
+            result = await _drive(url, args.runs, args.concurrency, args.timeout)
+        finally:
+            event.remove(engine, "before_cursor_execute", count_query)
+        _report(args, result, queries, _checkpoint_writes() - checkpoint_before, rss_before, process.memory_info().rss)
+
+    try:
+        asyncio.run(bench())
+    finally:
+        server.should_exit = True
+        time.sleep(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Benchmark: assistant listing with many encrypted plugin links.
+
+Every `AssistantPluginLink.user_plugin_config` is stored through `EncryptedJSON`,
+so listing an assistant decrypts one Fernet token per plugin link. This script
+loads one assistant with 100 plugin links repeatedly (fresh session each time,
+as the API does per request) and compares the cold path with the decryption cache.
+
+Usage:
+    python benchmarks/bench_assistant_listing.py --links 100 --iterations 200
+"""
+
+import argparse
+import os
+import statistics
+import tempfile
+import time
+
+os.environ.setdefault("DINGENT_HOME", tempfile.mkdtemp(prefix="dingent-bench-"))
+
+from sqlalchemy.orm import selectinload  # noqa: E402
+from sqlalchemy.pool import StaticPool  # noqa: E402
+from sqlmodel import Session, SQLModel, create_engine, select  # noqa: E402
+
+from dingent.core.db.models import Assistant, AssistantPluginLink, Plugin, Workspace  # noqa: E402
+from dingent.core.security.crypto import get_secret_manager  # noqa: E402
+
+
+def _seed(engine, links: int):
+    with Session(engine) as session:
+        workspace = Workspace(name="bench", slug="bench")
+        session.add(workspace)
+        session.flush()
+        assistant = Assistant(name="bench-assistant", workspace_id=workspace.id)
+        session.add(assistant)
+        session.flush()
+        for i in range(links):
+            plugin = Plugin(registry_id=f"plugin-{i}", display_name=f"Plugin {i}", description="bench", config_schema={})
+            session.add(plugin)
+            session.flush()
+            session.add(
+                AssistantPluginLink(
+                    assistant_id=assistant.id,
+                    plugin_id=plugin.id,
+                    user_plugin_config={"api_key": f"sk-{i:040d}", "region": "eu-west-1", "timeout": 30},
+                )
+            )
+        session.commit()
+        return workspace.id
+
+
+def _list_assistants(engine, workspace_id) -> int:
+    with Session(engine) as session:
+        assistants = session.exec(
+            select(Assistant).where(Assistant.workspace_id == workspace_id).options(selectinload(Assistant.plugin_links).selectinload(AssistantPluginLink.plugin))
+        ).all()
+        return sum(len(a.to_spec().plugins) for a in assistants)
+
+
+def _run(engine, workspace_id, iterations: int) -> list[float]:
+    timings = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        _list_assistants(engine, workspace_id)
+        timings.append((time.perf_counter() - start) * 1000)
+    return timings
+
+
+def _report(label: str, timings: list[float]) -> None:
+    timings = sorted(timings)
+    p95 = timings[int(len(timings) * 0.95) - 1]
+    print(f"{label:<14} mean={statistics.mean(timings):7.2f}ms  p50={statistics.median(timings):7.2f}ms  p95={p95:7.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=100)
+    parser.add_argument("--iterations", type=int, default=200)
+    args = parser.parse_args()
+
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    workspace_id = _seed(engine, args.links)
+
+    cache = get_secret_manager().cache
+    max_entries = cache.max_entries
+
+    cache.clear()
+    cache.max_entries = 0
+    _report("no cache", _run(engine, workspace_id, args.iterations))
+
+    cache.max_entries = max_entries
+    _list_assistants(engine, workspace_id)  # warm
+    _report("with cache", _run(engine, workspace_id, args.iterations))
+    print(f"cache entries={len(cache)} hits={cache.hits} misses={cache.misses}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,138 @@
+"""
+Benchmark: cold import time of the Dingent entry points, with a budget.
+
+Each target is imported in a fresh interpreter with `python -X importtime`
+(`--repeat` times, the median run is reported). Modules that the interpreter
+loads before running any code are subtracted, and the remaining self time is
+attributed to the top-level dependency that owns each module (litellm,
+langgraph, copilotkit, fastmcp, google-genai, ... and dingent itself).
+
+Budgets live in a JSON file (default: benchmarks/import_budget.json):
+
+    {"targets": {"dingent.cli.cli": 300}, "packages": {"dingent.server.main": {"litellm": 900}}}
+
+Every value is in milliseconds. The script exits with status 1 when any budget
+is exceeded and with status 2 when a target cannot be imported, so it can run
+as a CI step.
+
+Usage:
+    python benchmarks/bench_import_time.py
+    python benchmarks/bench_import_time.py --target dingent.cli.cli --repeat 5 --budget my_budget.json
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+from pathlib import Path
+
+os.environ.setdefault("DINGENT_HOME", tempfile.mkdtemp(prefix="dingent-bench-"))
+
+from dingent.cli.startup_profile import ImportRecord, profile_imports  # noqa: E402
+
+DEFAULT_TARGETS = ["dingent.server.main", "dingent.cli.cli", "dingent.engine"]
+# 单独列出的重量级依赖；其余第三方模块归入 "other"
+TRACKED_PACKAGES = [
+    "litellm",
+    "langgraph",
+    "langgraph_swarm",
+    "langchain",
+    "langchain_core",
+    "copilotkit",
+    "fastmcp",
+    "mcp",
+    "google",
+    "sqlalchemy",
+    "fastapi",
+    "typer",
+    "rich",
+    "dingent",
+]
+DEFAULT_BUDGET = Path(__file__).with_name("import_budget.json")
+
+
+def _startup_modules() -> set[str]:
+    # `import sys` 不会触发任何新的导入：结果就是解释器启动时加载的模块
+    return {r.module for r in profile_imports("sys")}
+
+
+def _attribute(records: list[ImportRecord], startup: set[str]) -> dict[str, float]:
+    """按依赖汇总自身耗时（毫秒），并给出 "total"。"""
+    costs = dict.fromkeys([*TRACKED_PACKAGES, "other"], 0.0)
+    for record in records:
+        if record.module in startup:
+            continue
+        package = record.package if record.package in costs else "other"
+        costs[package] += record.self_us / 1000
+    costs["total"] = sum(costs.values())
+    return costs
+
+
+def measure(target: str, repeat: int, startup: set[str]) -> dict[str, float]:
+    runs = [_attribute(profile_imports(target), startup) for _ in range(repeat)]
+    median_total = statistics.median(run["total"] for run in runs)
+    # 选取总耗时最接近中位数的一次，保证各依赖的数字来自同一次运行
+    return min(runs, key=lambda run: abs(run["total"] - median_total))
+
+
+def check_budget(results: dict[str, dict[str, float]], budget: dict) -> list[str]:
+    violations = []
+    for target, limit in budget.get("targets", {}).items():
+        if target in results and results[target]["total"] > limit:
+            violations.append(f"{target}: {results[target]['total']:.0f}ms > {limit}ms")
+    for target, packages in budget.get("packages", {}).items():
+        for package, limit in packages.items():
+            if target in results and results[target].get(package, 0.0) > limit:
+                violations.append(f"{target} [{package}]: {results[target][package]:.0f}ms > {limit}ms")
+    return violations
+
+
+def _report(target: str, costs: dict[str, float]) -> None:
+    print(f"{target}  total={costs['total']:.0f}ms")
+    for package, ms in sorted(((p, v) for p, v in costs.items() if p != "total" and v >= 1), key=lambda item: item[1], reverse=True):
+        print(f"    {package:<16} {ms:8.1f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--target", action="append", help=f"Module to import (repeatable). Default: {', '.join(DEFAULT_TARGETS)}")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--budget", type=Path, default=DEFAULT_BUDGET, help="Budget JSON file")
+    parser.add_argument("--no-budget", action="store_true", help="Only report, never fail")
+    parser.add_argument("--json", action="store_true", help="Print results as JSON")
+    args = parser.parse_args()
+
+    startup = _startup_modules()
+    results = {}
+    failed = []
+    for target in args.target or DEFAULT_TARGETS:
+        try:
+            results[target] = measure(target, args.repeat, startup)
+        except RuntimeError as e:
+            # 继续测量其余入口，最后以状态码 2 退出
+            print(e, file=sys.stderr)
+            failed.append(target)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        for target, costs in results.items():
+            _report(target, costs)
+
+    if failed:
+        sys.exit(2)
+    if args.no_budget or not args.budget.is_file():
+        return
+    violations = check_budget(results, json.loads(args.budget.read_text(encoding="utf-8")))
+    if violations:
+        print("\nImport-time budget exceeded:", file=sys.stderr)
+        for line in violations:
+            print(f"  {line}", file=sys.stderr)
+        sys.exit(1)
+    print(f"\nWithin budget ({args.budget}).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+"""
+Load test: sweep database pool / SQLite PRAGMA settings.
+
+For every combination of the given settings a fresh server process is started
+with the values passed as environment variables (they map 1:1 to `Settings`
+fields), the dashboard and chat endpoints are hammered concurrently, and the
+latency percentiles together with the server-side pool metrics
+(`GET /api/v1/{workspace}/overview/database`) are reported.
+
+The chat endpoint runs the real agent, so point the workspace at a cheap model
+(or a local one) before including it; pass `--no-chat` to only exercise the
+dashboard endpoints.
+
+Usage:
+    python benchmarks/load_db_pool.py --workspace my-ws --token <jwt> \\
+        --set SQLITE_SYNCHRONOUS=NORMAL,FULL --set DB_POOL_SIZE=5,20 \\
+        --concurrency 32 --requests 500
+"""
+
+import argparse
+import asyncio
+import itertools
+import os
+import statistics
+import subprocess
+import sys
+import time
+import uuid
+
+import aiohttp
+
+
+def _parse_grid(values: list[str]) -> dict[str, list[str]]:
+    grid: dict[str, list[str]] = {}
+    for item in values:
+        key, _, options = item.partition("=")
+        if not options:
+            raise SystemExit(f"--set expects KEY=v1,v2 (got {item!r})")
+        grid[key.strip()] = [o.strip() for o in options.split(",")]
+    return grid
+
+
+def _chat_payload() -> dict:
+    return {
+        "threadId": str(uuid.uuid4()),
+        "runId": str(uuid.uuid4()),
+        "state": {},
+        "messages": [{"id": str(uuid.uuid4()), "role": "user", "content": "ping"}],
+        "tools": [],
+        "context": [],
+        "forwardedProps": {},
+    }
+
+
+async def _wait_ready(session: aiohttp.ClientSession, base_url: str, timeout: float = 60.0) -> None:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            async with session.get(f"{base_url}/api/v1/health") as resp:
+                if resp.status == 200:
+                    return
+        except aiohttp.ClientError:
+            pass
+        await asyncio.sleep(0.25)
+    raise RuntimeError("server did not become ready")
+
+
+async def _hit(session: aiohttp.ClientSession, method: str, url: str, **kwargs) -> float:
+    start = time.perf_counter()
+    async with session.request(method, url, **kwargs) as resp:
+        # 读完整个响应体（聊天接口为 SSE 流）
+        async for _ in resp.content.iter_chunked(64 * 1024):
+            pass
+        if resp.status >= 400:
+            raise RuntimeError(f"{method} {url} -> {resp.status}")
+    return (time.perf_counter() - start) * 1000
+
+
+async def _drive(args, base_url: str) -> dict[str, list[float]]:
+    prefix = f"{base_url}/api/v1/{args.workspace}"
+    targets = [
+        ("dashboard:overview", "GET", f"{prefix}/overview", {}),
+        ("dashboard:assistants", "GET", f"{prefix}/assistants", {}),
+    ]
+    if not args.no_chat:
+        targets.append(("chat:run", "POST", f"{prefix}/chat/agent/{args.agent}/run", {"json": None}))
+
+    headers = {"Authorization": f"Bearer {args.token}", "X-Visitor-ID": str(uuid.uuid4())}
+    timings: dict[str, list[float]] = {name: [] for name, *_ in targets}
+    errors = 0
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async with aiohttp.ClientSession(headers=headers, timeout=aiohttp.ClientTimeout(total=args.timeout)) as session:
+        await _wait_ready(session, base_url)
+
+        async def one(i: int) -> None:
+            nonlocal errors
+            name, method, url, kwargs = targets[i % len(targets)]
+            if "json" in kwargs:
+                kwargs = {"json": _chat_payload()}
+            async with semaphore:
+                try:
+                    timings[name].append(await _hit(session, method, url, **kwargs))
+                except Exception:
+                    errors += 1
+
+        await asyncio.gather(*(one(i) for i in range(args.requests)))
+        async with session.get(f"{prefix}/overview/database") as resp:
+            pool = await resp.json() if resp.status == 200 else {}
+
+    timings["_errors"] = [errors]
+    timings["_pool"] = [pool]  # type: ignore[list-item]
+    return timings
+
+
+def _pct(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * q))] if values else 0.0
+
+
+def _report(combo: dict[str, str], result: dict[str, list]) -> None:
+    label = " ".join(f"{k}={v}" for k, v in combo.items()) or "(defaults)"
+    print(f"\n== {label}")
+    for name, values in result.items():
+        if name.startswith("_"):
+            continue
+        if not values:
+            print(f"  {name:<22} no successful requests")
+            continue
+        percentiles = "  ".join(f"p{int(q * 100)}={_pct(values, q):8.1f}ms" for q in (0.5, 0.95, 0.99))
+        print(f"  {name:<22} n={len(values):<5} mean={statistics.mean(values):8.1f}ms  {percentiles}")
+    pool = result["_pool"][0]
+    print(f"  errors={result['_errors'][0]}")
+    if pool:
+        print(
+            f"  pool checkouts={pool.get('checkouts')} waits={pool.get('waits')} "
+            f"checkout p50={pool.get('checkout_ms_p50', 0):.2f}ms p99={pool.get('checkout_ms_p99', 0):.2f}ms max={pool.get('checkout_ms_max', 0):.2f}ms"
+        )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workspace", required=True, help="workspace slug")
+    parser.add_argument("--token", required=True, help="bearer token of a workspace member")
+    parser.add_argument("--agent", default="default", help="workflow name used for the chat endpoint")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=v1,v2", help="setting to sweep (repeatable)")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--timeout", type=float, default=120.0)
+    parser.add_argument("--no-chat", action="store_true", help="only exercise dashboard endpoints")
+    args = parser.parse_args()
+
+    grid = _parse_grid(args.set)
+    keys = list(grid)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    for values in itertools.product(*(grid[k] for k in keys)) if keys else [()]:
+        combo = dict(zip(keys, values, strict=True))
+        env = {**os.environ, **combo}
+        server = subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "dingent.server.main:app", "--port", str(args.port), "--log-level", "warning"],
+            env=env,
+        )
+        try:
+            result = asyncio.run(_drive(args, base_url))
+        finally:
+            server.terminate()
+            server.wait(timeout=30)
+        _report(combo, result)
+
+
+if __name__ == "__main__":
+    main()
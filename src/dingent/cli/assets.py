@@ -1,86 +1,242 @@
 import hashlib
+import json
 import os
 import shutil
 import sys
 import tarfile
+import tempfile
 from pathlib import Path
 
 from rich import print
 
 from dingent.core.paths import paths  # 修改导入源
 
+MANIFEST_FORMAT = 1
+_HASH_CHUNK = 1024 * 1024
+# 旧版本直接解压在 runtime 目录下的内容；升级到版本化目录后清理（runtime 目录中还有其它数据，不能整体删除）
+_LEGACY_ENTRIES = ("version.hash", "node", "node.exe", "frontend")
+
+
+def _file_sha256(path: Path) -> str:
+    """流式计算文件摘要，不把整个文件读入内存。"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        while chunk := f.read(_HASH_CHUNK):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _write_json_atomic(path: Path, data: dict) -> None:
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+    os.replace(tmp, path)
+
+
+def _read_json(path: Path) -> dict:
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def _stream_member(source, target: Path, previous: Path | None) -> tuple[str, bool]:
+    """
+    把压缩包成员流式写入 target，同时计算摘要。
+    内容与 previous 完全相同时不写入任何数据，返回 (sha256, 是否写入了 target)。
+    """
+    h = hashlib.sha256()
+    try:
+        prev = open(previous, "rb") if previous is not None else None
+    except OSError:
+        prev = None
+    out = None
+    matched = 0
+
+    def open_target():
+        f = open(target, "wb")
+        if prev is not None:
+            # 已比较过的前缀与旧文件相同，从旧文件补写
+            prev.seek(0)
+            remaining = matched
+            while remaining and (data := prev.read(min(_HASH_CHUNK, remaining))):
+                f.write(data)
+                remaining -= len(data)
+        return f
+
+    try:
+        while chunk := source.read(_HASH_CHUNK):
+            h.update(chunk)
+            if out is None and prev is not None and prev.read(len(chunk)) == chunk:
+                matched += len(chunk)
+                continue
+            if out is None:
+                out = open_target()
+            out.write(chunk)
+        # 没有旧文件，或旧文件比新内容更长
+        if out is None and (prev is None or prev.read(1)):
+            out = open_target()
+    finally:
+        if prev is not None:
+            prev.close()
+        if out is not None:
+            out.close()
+    return h.hexdigest(), out is not None
+
 
 class AssetManager:
-    def __init__(self):
-        self.target_dir = paths.runtime_dir  # 使用 paths
-        self.version_file = self.target_dir / "version.hash"
-        self.source_tar = paths.bundle_dir / "runtime.tar.gz"  # 使用 paths
+    """
+    把打包的 runtime.tar.gz（Node + 前端）解压到缓存目录。
+
+    目录结构（runtime_dir 下）：
+      fingerprint.json      压缩包的 size / mtime / sha256 及当前版本
+      versions/<version>/   每个版本一个目录，内含 .manifest.json（每个文件的 size / mode / sha256）
+      current -> versions/<version>   通过原子替换符号链接切换版本
+
+    - 压缩包的 size 和 mtime 未变时不读取压缩包；变了才流式计算摘要，内容相同则只更新指纹。
+    - 解压新版本时边解压边与上一版本比对：大小、权限和内容都相同的文件直接硬链接复用，只写入变化的文件。
+    """
+
+    def __init__(self, runtime_dir: Path | None = None, source_tar: Path | None = None):
+        self.runtime_dir = runtime_dir or paths.runtime_dir  # 使用 paths
+        self.source_tar = source_tar or paths.bundle_dir / "runtime.tar.gz"  # 使用 paths
+        self.versions_dir = self.runtime_dir / "versions"
+        self.current_link = self.runtime_dir / "current"
+        self.fingerprint_file = self.runtime_dir / "fingerprint.json"
 
     def ensure_assets(self):
         """确保运行时环境是最新的"""
         # 如果不是打包环境，直接返回开发路径
         if not paths.is_frozen:
             return self._get_dev_paths()
+        return self.prepare()
 
+    def prepare(self):
+        """按需解压压缩包并返回当前版本的路径。"""
         if not self.source_tar.exists():
             print(f"[bold red]❌ Critical Error: Runtime assets not found at {self.source_tar}![/bold red]")
             sys.exit(1)
 
-        current_hash = self._get_file_hash(self.source_tar)
-
-        if self._needs_update(current_hash):
-            self._extract_assets(current_hash)
-
-        return self._get_prod_paths()
-
-    def _get_file_hash(self, path: Path) -> str:
-        with open(path, "rb") as f:
-            return hashlib.md5(f.read()).hexdigest()
-
-    def _needs_update(self, current_hash: str) -> bool:
-        if not self.version_file.exists():
-            return True
-        # 简单校验：目录必须不为空
-        if not any(self.target_dir.iterdir()):
-            return True
-        cached_hash = self.version_file.read_text().strip()
-        return cached_hash != current_hash
-
-    def _extract_assets(self, current_hash: str):
+        stat = self.source_tar.stat()
+        fingerprint = _read_json(self.fingerprint_file)
+        version = fingerprint.get("version")
+        # 快速路径：只 stat 压缩包
+        if fingerprint.get("size") == stat.st_size and fingerprint.get("mtime_ns") == stat.st_mtime_ns and self._is_complete(version):
+            return self._get_prod_paths(self._active_dir(version))
+
+        digest = _file_sha256(self.source_tar)
+        if digest != fingerprint.get("sha256") or not self._is_complete(version):
+            version = digest[:16]
+            if not self._is_complete(version):
+                self._extract_assets(version, previous=fingerprint.get("version"))
+            self._activate(version)
+        # 压缩包被 touch / 复制但内容未变：只刷新指纹
+        _write_json_atomic(self.fingerprint_file, {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha256": digest, "version": version})
+        return self._get_prod_paths(self._active_dir(version))
+
+    def _is_complete(self, version: str | None) -> bool:
+        # manifest 最后写入，存在即表示该版本解压完整
+        return bool(version) and (self.versions_dir / version / ".manifest.json").is_file()
+
+    def _active_dir(self, version: str) -> Path:
+        # 不支持符号链接时（如未开启开发者模式的 Windows）直接使用版本目录
+        return self.current_link if self.current_link.is_symlink() else self.versions_dir / version
+
+    def _extract_assets(self, version: str, previous: str | None):
         print("[bold blue]📦 Upgrading runtime environment (Node.js + Frontend)...[/bold blue]")
 
-        if self.target_dir.exists():
-            try:
-                shutil.rmtree(self.target_dir)
-            except Exception as e:
-                print(f"[yellow]⚠️  Could not clean old cache: {e}[/yellow]")
-
-        self.target_dir.mkdir(parents=True, exist_ok=True)
+        self.versions_dir.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(dir=self.versions_dir, prefix=f".{version}-"))
+        previous_dir = self.versions_dir / previous if self._is_complete(previous) else None
+        previous_files = _read_json(previous_dir / ".manifest.json").get("files", {}) if previous_dir else {}
 
         try:
-            with tarfile.open(self.source_tar, "r:gz") as tar:
-                # filter='data' 更加安全 (Python 3.12+)
-                tar.extractall(path=self.target_dir, filter="data" if sys.version_info >= (3, 12) else None)
-
-            self.version_file.write_text(current_hash)
-
+            files, reused = self._extract_incremental(staging, previous_dir, previous_files)
             # 给二进制文件加权限
-            node_path = Path(self._get_prod_paths()["node_bin"])
+            node_path = Path(self._get_prod_paths(staging)["node_bin"])
             if node_path.exists() and os.name != "nt":
                 node_path.chmod(0o755)
-
-            print("[bold green]✅ Assets extracted successfully.[/bold green]")
+            _write_json_atomic(staging / ".manifest.json", {"format": MANIFEST_FORMAT, "files": files})
+            final_dir = self.versions_dir / version
+            shutil.rmtree(final_dir, ignore_errors=True)
+            os.replace(staging, final_dir)
+            print(f"[bold green]✅ Assets extracted successfully ({len(files) - reused} written, {reused} reused).[/bold green]")
         except Exception as e:
             print(f"[bold red]❌ Failed to extract assets: {e}[/bold red]")
-            # 失败时清理，避免残留损坏文件
-            shutil.rmtree(self.target_dir, ignore_errors=True)
+            # 失败时清理，避免残留损坏文件；当前版本不受影响
+            shutil.rmtree(staging, ignore_errors=True)
             sys.exit(1)
 
-    def _get_prod_paths(self):
+    def _extract_incremental(self, dest: Path, previous_dir: Path | None, previous_files: dict) -> tuple[dict, int]:
+        files: dict[str, dict] = {}
+        reused = 0
+        with tarfile.open(self.source_tar, "r|gz") as tar:
+            for member in tar:
+                # 与 extractall(filter="data") 相同的安全检查：拒绝绝对路径、越界路径和指向目录外的链接
+                member = tarfile.data_filter(member, str(dest))
+                target = dest / member.name
+                if member.isdir():
+                    target.mkdir(parents=True, exist_ok=True)
+                    continue
+                if not member.isfile():
+                    tar.extract(member, dest, filter="data")
+                    continue
+
+                target.parent.mkdir(parents=True, exist_ok=True)
+                old = previous_files.get(member.name)
+                # 大小和权限都相同的旧文件才可能复用（硬链接共享 inode，权限不同不能共用）
+                candidate = previous_dir / member.name if previous_dir is not None and old and (old.get("size"), old.get("mode")) == (member.size, member.mode) else None
+                source = tar.extractfile(member)
+                assert source is not None
+                with source:
+                    digest, written = _stream_member(source, target, candidate)
+                if not written:
+                    assert candidate is not None
+                    if self._link(candidate, target):
+                        reused += 1
+                    else:
+                        shutil.copy2(candidate, target)
+                else:
+                    os.chmod(target, member.mode)
+                    os.utime(target, (member.mtime, member.mtime))
+                files[member.name] = {"size": member.size, "mode": member.mode, "sha256": digest}
+        return files, reused
+
+    @staticmethod
+    def _link(source: Path, target: Path) -> bool:
+        try:
+            os.link(source, target)
+            return True
+        except OSError:
+            return False
+
+    def _activate(self, version: str):
+        """原子切换 current 符号链接，并清理旧版本。"""
+        tmp_link = self.runtime_dir / f".current-{os.getpid()}"
+        try:
+            tmp_link.unlink(missing_ok=True)
+            os.symlink(Path("versions") / version, tmp_link, target_is_directory=True)
+            os.replace(tmp_link, self.current_link)
+        except OSError:
+            tmp_link.unlink(missing_ok=True)
+
+        # 保留上一个版本：已启动的前端进程可能仍在使用
+        previous = _read_json(self.fingerprint_file).get("version")
+        for entry in self.versions_dir.iterdir():
+            if entry.name not in (version, previous):
+                shutil.rmtree(entry, ignore_errors=True)
+        for name in _LEGACY_ENTRIES:
+            legacy = self.runtime_dir / name
+            if legacy.is_dir():
+                shutil.rmtree(legacy, ignore_errors=True)
+            else:
+                legacy.unlink(missing_ok=True)
+
+    def _get_prod_paths(self, root: Path):
         node_name = "node.exe" if os.name == "nt" else "node"
         return {
-            "node_bin": str(self.target_dir / node_name),
-            "frontend_dir": self.target_dir / "frontend",
+            "node_bin": str(root / node_name),
+            "frontend_dir": root / "frontend",
             "frontend_script": "server.js",
         }
 
@@ -2,8 +2,10 @@
 Dingent CLI (跨平台兼容版本)
 
 Commands:
-  dingent run        Concurrently start backend + frontend
-  dingent version    Show version
+  dingent run              Concurrently start backend + frontend
+  dingent serve            Run the backend for production (workers, graceful drain)
+  dingent profile-startup  Report import cost and time-to-healthy of the backend
+  dingent version          Show version
 """
 
 from __future__ import annotations
@@ -22,6 +24,8 @@ from typing import Annotated
 import typer
 from rich.console import Console
 
+from dingent.cli.log_mux import OutputMultiplexer
+
 if sys.platform == "win32":
     os.environ["PYTHONUTF8"] = "1"
     # 保护性修改：防止在无控制台模式(pythonw)下报错
@@ -51,26 +55,35 @@ class ServiceConfig:
     cwd: Path | None = None
     env: dict[str, str] = field(default_factory=dict)
     health_check_url: str | None = None
+    health_check_timeout: float = 60
     depends_on: list[str] = field(default_factory=list)
     open_browser_hint: bool = False
+    # 关闭时等待进程退出的秒数，超时后强制 kill
+    stop_timeout: float = 5
+    # 关闭前先创建该文件（服务的就绪探针据此返回 503），再等待 drain_delay 秒才发送 SIGTERM
+    drain_file: Path | None = None
+    drain_delay: float = 0
 
 
 # --------- Async Service Manager ---------
 
 
 class AsyncServiceManager:
-    def __init__(self, auto_open_browser: bool = True):
+    def __init__(self, auto_open_browser: bool = True, json_logs: bool = False):
         self.processes: dict[str, asyncio.subprocess.Process] = {}
+        self.services: dict[str, ServiceConfig] = {}
         self.ready_events: dict[str, asyncio.Event] = {}
         self.auto_open_browser = auto_open_browser
         self._browser_opened = False
         self._shutdown_event = asyncio.Event()
-        self._print_lock = asyncio.Lock()
+        self._stopping = False
+        self._stopped = asyncio.Event()
+        # 所有输出（子进程日志与状态消息）经由同一个多路复用器按帧批量渲染
+        self.output = OutputMultiplexer(console, json_lines=json_logs)
 
     async def _safe_print(self, message: str):
-        """线程安全的打印"""
-        async with self._print_lock:
-            console.print(message)
+        """排队一条状态消息，由渲染循环统一输出"""
+        self.output.message(message)
 
     async def _health_check(self, url: str, timeout: float = 60) -> bool:
         """异步健康检查"""
@@ -105,6 +118,7 @@ class AsyncServiceManager:
     async def _run_service(self, service: ServiceConfig):
         """运行单个服务"""
         # 初始化就绪事件
+        self.services[service.name] = service
         self.ready_events[service.name] = asyncio.Event()
 
         # 等待依赖
@@ -147,40 +161,34 @@ class AsyncServiceManager:
             self._shutdown_event.set()
 
     async def _stream_output(self, service: ServiceConfig, proc: asyncio.subprocess.Process):
-        """流式输出日志"""
+        """流式输出日志：分块读取直到 EOF，渲染由多路复用器按帧批量完成"""
+        assert proc.stdout is not None
+        on_line = self._browser_hint_handler() if service.open_browser_hint and self.auto_open_browser else None
+        await self.output.pump(service.name, service.color, proc.stdout, on_line=on_line)
+
+    def _browser_hint_handler(self):
+        """检测输出中的端口并打开浏览器（仅一次）"""
         port_regex = re.compile(r"http://localhost:(\d+)")
 
-        assert proc.stdout is not None
-        while not self._shutdown_event.is_set():
-            try:
-                line_bytes = await asyncio.wait_for(proc.stdout.readline(), timeout=0.5)
-            except asyncio.TimeoutError:
-                if proc.returncode is not None:
-                    break
-                continue
-
-            if not line_bytes:
-                break
-
-            line = line_bytes.decode(errors="replace").rstrip()
-            await self._safe_print(f"[{service.color}][{service.name.upper():^8}][/] {line}")
-
-            # 检测端口并打开浏览器
-            if service.open_browser_hint and self.auto_open_browser and not self._browser_opened:
-                match = port_regex.search(line)
-                if match:
-                    url = f"http://localhost:{match.group(1)}"
-                    await self._safe_print(f"[bold blue]🌐 Opening browser:  {url}[/bold blue]")
-                    try:
-                        webbrowser.open_new_tab(url)
-                        self._browser_opened = True
-                    except Exception:
-                        await self._safe_print("[yellow]⚠️ Could not open browser[/yellow]")
+        def on_line(line: str):
+            if self._browser_opened:
+                return
+            match = port_regex.search(line)
+            if match:
+                url = f"http://localhost:{match.group(1)}"
+                self.output.message(f"[bold blue]🌐 Opening browser:  {url}[/bold blue]")
+                self._browser_opened = True
+                try:
+                    webbrowser.open_new_tab(url)
+                except Exception:
+                    self.output.message("[yellow]⚠️ Could not open browser[/yellow]")
+
+        return on_line
 
     async def _monitor_health(self, service: ServiceConfig):
         """监控服务健康状态"""
         assert service.health_check_url is not None
-        if await self._health_check(service.health_check_url):
+        if await self._health_check(service.health_check_url, timeout=service.health_check_timeout):
             await self._safe_print(f"[bold green]✓ {service.name} is healthy![/bold green]")
             self.ready_events[service.name].set()
         else:
@@ -189,12 +197,17 @@ class AsyncServiceManager:
 
     async def shutdown(self):
         """优雅关闭所有服务"""
-        if self._shutdown_event.is_set():
-            return  # 防止重复关闭
+        if self._stopping:
+            # 防止重复关闭：等待进行中的关闭完成
+            await self._stopped.wait()
+            return
 
+        self._stopping = True
         self._shutdown_event.set()
         await self._safe_print("\n[bold yellow]🛑 Shutting down all services.. .[/bold yellow]")
 
+        await self._drain()
+
         # 逆序关闭（先关闭依赖者）
         for name in reversed(list(self.processes.keys())):
             proc = self.processes[name]
@@ -202,7 +215,7 @@ class AsyncServiceManager:
                 await self._safe_print(f"[yellow]Stopping {name} (PID {proc.pid}).. .[/yellow]")
                 try:
                     proc.terminate()
-                    await asyncio.wait_for(proc.wait(), timeout=5)
+                    await asyncio.wait_for(proc.wait(), timeout=self.services[name].stop_timeout)
                     await self._safe_print(f"[green]✓ {name} stopped[/green]")
                 except asyncio.TimeoutError:
                     await self._safe_print(f"[red]Force killing {name}.. .[/red]")
@@ -221,9 +234,24 @@ class AsyncServiceManager:
         _TEMP_DIRS.clear()
 
         await self._safe_print("[bold blue]✓ All services stopped[/bold blue]")
+        self._stopped.set()
+
+    async def _drain(self):
+        """标记需要优雅下线的服务为 draining，并等待负载均衡摘除流量"""
+        draining = [svc for name, svc in self.services.items() if svc.drain_file and self.processes.get(name) and self.processes[name].returncode is None]
+        if not draining:
+            return
+        for svc in draining:
+            assert svc.drain_file is not None
+            svc.drain_file.touch()
+            await self._safe_print(f"[yellow]{svc.name} is draining (readiness now reports 503)[/yellow]")
+        delay = max(svc.drain_delay for svc in draining)
+        if delay > 0:
+            await asyncio.sleep(delay)
 
     async def run_all(self, services: list[ServiceConfig]):
         """运行所有服务"""
+        self.output.start()
         await self._safe_print("[bold cyan]🚀 Starting services...[/bold cyan]")
 
         # 跨平台信号处理
@@ -238,9 +266,8 @@ class AsyncServiceManager:
         shutdown_task = asyncio.create_task(self._shutdown_event.wait())
         done, pending = await asyncio.wait([shutdown_task, *tasks], return_when=asyncio.FIRST_COMPLETED)
 
-        # 确保完全关闭
-        if not self._shutdown_event.is_set():
-            await self.shutdown()
+        # 确保完全关闭（服务意外退出时也要停止其余服务；信号触发的关闭则等待其完成）
+        await self.shutdown()
 
         # 取消剩余任务
         for task in pending:
@@ -250,6 +277,8 @@ class AsyncServiceManager:
             except asyncio.CancelledError:
                 pass
 
+        await self.output.close()
+
     def _setup_signal_handlers(self):
         """跨平台信号处理设置"""
         if IS_WINDOWS:
@@ -316,6 +345,7 @@ def run(
     data_dir: Annotated[Path | None, typer.Option("--data-dir", "-d")] = None,
     dev: bool = False,
     base_path: Annotated[str | None, typer.Option("--base-path", help="Base path for frontend (e.g., /myapp)")] = None,
+    json_logs: Annotated[bool, typer.Option("--json-logs", help="Write service output as JSON lines instead of rich console output")] = False,
 ):
     """
     Concurrently starts the backend and frontend services.
@@ -338,7 +368,7 @@ def run(
 
     # 4. 构建服务配置
     if paths.is_frozen:
-        backend_cmd = [sys.executable, "internal-backend", host, str(port)]
+        backend_cmd = [sys.executable, "internal-backend", "--host", host, "--port", str(port)]
         backend_cwd = paths.bundle_dir
     else:
         backend_cmd = [
@@ -385,16 +415,189 @@ def run(
         )
 
     # 5. 运行服务
-    manager = AsyncServiceManager(auto_open_browser=not no_browser and not dev)
+    manager = AsyncServiceManager(auto_open_browser=not no_browser and not dev, json_logs=json_logs)
     _run_async(manager.run_all(services))
 
 
+@app.command()
+def serve(
+    host: str = "0.0.0.0",
+    port: int = 8000,
+    workers: Annotated[int, typer.Option(envvar="WEB_CONCURRENCY", help="Number of worker processes")] = 1,
+    loop: Annotated[str, typer.Option(help="Event loop implementation: uvloop, asyncio or auto")] = "asyncio" if IS_WINDOWS else "uvloop",
+    http: Annotated[str, typer.Option(help="HTTP protocol implementation: httptools, h11 or auto")] = "httptools",
+    keep_alive: Annotated[int, typer.Option("--keep-alive", help="Idle keep-alive timeout in seconds; keep it above the load balancer's idle timeout")] = 65,
+    backlog: Annotated[int, typer.Option(help="Maximum number of pending connections")] = 2048,
+    graceful_timeout: Annotated[float, typer.Option("--graceful-timeout", help="Seconds in-flight requests (including chat streams) may take to finish after SIGTERM")] = 30,
+    drain_delay: Annotated[float, typer.Option("--drain-delay", help="Seconds to report not-ready before the server stops accepting connections")] = 5,
+    ready_timeout: Annotated[float, typer.Option("--ready-timeout", help="Seconds to wait for /api/v1/health/ready at startup")] = 180,
+    access_log: bool = True,
+    forwarded_allow_ips: Annotated[
+        str,
+        typer.Option(
+            "--forwarded-allow-ips",
+            envvar="FORWARDED_ALLOW_IPS",
+            help="Comma-separated proxy IPs (or '*') whose X-Forwarded-For / X-Forwarded-Proto are trusted; the guest IP rate limit keys on the resulting client address",
+        ),
+    ] = "127.0.0.1",
+    data_dir: Annotated[Path | None, typer.Option("--data-dir", "-d")] = None,
+    json_logs: Annotated[bool, typer.Option("--json-logs", help="Write service output as JSON lines instead of rich console output")] = False,
+):
+    """
+    Runs the backend for production: multiple workers, no reload, graceful drain on SIGTERM.
+
+    Liveness is /api/v1/health; readiness is /api/v1/health/ready, which turns 503
+    while the agent runtime is still initializing and once draining has started.
+    """
+    import importlib.util
+
+    if data_dir:
+        os.environ["DINGENT_HOME"] = str(data_dir.resolve())
+
+    for option, name in (("--loop", loop), ("--http", http)):
+        if name in ("uvloop", "httptools") and importlib.util.find_spec(name) is None:
+            console.print(f"[bold red]{name} is not installed; pass {option} auto to fall back.[/bold red]")
+            raise typer.Exit(1)
+
+    from dingent.core.paths import paths
+
+    uvicorn_args = [
+        "--host",
+        host,
+        "--port",
+        str(port),
+        "--workers",
+        str(workers),
+        "--loop",
+        loop,
+        "--http",
+        http,
+        "--timeout-keep-alive",
+        str(keep_alive),
+        "--backlog",
+        str(backlog),
+        "--timeout-graceful-shutdown",
+        str(int(graceful_timeout)),
+        "--access-log" if access_log else "--no-access-log",
+        "--proxy-headers",
+        "--forwarded-allow-ips",
+        forwarded_allow_ips,
+    ]
+    if paths.is_frozen:
+        backend_cmd = [sys.executable, "internal-backend", *uvicorn_args]
+    else:
+        backend_cmd = [sys.executable, "-m", "uvicorn", "dingent.server.main:app", *uvicorn_args]
+
+    drain_dir = tempfile.TemporaryDirectory(prefix="dingent-serve-")
+    _TEMP_DIRS.append(drain_dir)
+    drain_file = Path(drain_dir.name) / "draining"
+
+    from dingent.server.workers import WorkerConfigError, prepare_workers
+
+    # 表结构在父进程中初始化一次，worker 之间不再并发建表 / 补列
+    try:
+        worker_env = prepare_workers(workers, Path(drain_dir.name))
+    except WorkerConfigError as e:
+        console.print(f"[bold red]{e}[/bold red]")
+        raise typer.Exit(1)
+    probe_host = "127.0.0.1" if host in ("0.0.0.0", "::") else host
+
+    service = ServiceConfig(
+        name="backend",
+        command=backend_cmd,
+        cwd=paths.bundle_dir,
+        color="magenta",
+        env={"DRAIN_FILE": str(drain_file), **worker_env},
+        health_check_url=f"http://{probe_host}:{port}/api/v1/health/ready",
+        health_check_timeout=ready_timeout,
+        # uvicorn 自身的优雅关闭超时之外，再留出 lifespan 清理的时间
+        stop_timeout=graceful_timeout + 15,
+        drain_file=drain_file,
+        drain_delay=drain_delay,
+    )
+    manager = AsyncServiceManager(auto_open_browser=False, json_logs=json_logs)
+    _run_async(manager.run_all([service]))
+
+
 @app.command(hidden=True)
-def internal_backend(host: str, port: int):
-    """(Internal) 仅供打包后调用"""
+def internal_backend(
+    host: Annotated[str, typer.Option()] = "localhost",
+    port: Annotated[int, typer.Option()] = 8000,
+    workers: Annotated[int, typer.Option()] = 1,
+    loop: Annotated[str, typer.Option()] = "auto",
+    http: Annotated[str, typer.Option()] = "auto",
+    timeout_keep_alive: Annotated[int, typer.Option()] = 5,
+    backlog: Annotated[int, typer.Option()] = 2048,
+    timeout_graceful_shutdown: Annotated[int | None, typer.Option()] = None,
+    access_log: bool = True,
+    proxy_headers: bool = True,
+    forwarded_allow_ips: Annotated[str | None, typer.Option()] = None,
+):
+    """(Internal) 仅供打包后调用；参数与 uvicorn 命令行一致"""
     import uvicorn
 
-    uvicorn.run("dingent.server.main:app", host=host, port=port)
+    uvicorn.run(
+        "dingent.server.main:app",
+        host=host,
+        port=port,
+        workers=workers,
+        loop=loop,
+        http=http,
+        timeout_keep_alive=timeout_keep_alive,
+        backlog=backlog,
+        timeout_graceful_shutdown=timeout_graceful_shutdown,
+        access_log=access_log,
+        proxy_headers=proxy_headers,
+        forwarded_allow_ips=forwarded_allow_ips,
+    )
+
+
+@app.command("profile-startup")
+def profile_startup(
+    module: str = "dingent.server.main",
+    top: int = 25,
+    health: Annotated[bool, typer.Option("--health", help="Also start the backend and measure time until /api/v1/health responds")] = False,
+    data_dir: Annotated[Path | None, typer.Option("--data-dir", "-d")] = None,
+):
+    """
+    Profile backend startup: `python -X importtime` report grouped by package.
+    """
+    from rich.table import Table
+
+    from dingent.cli.startup_profile import by_package, profile_imports, time_to_healthy, total_us
+
+    if data_dir:
+        os.environ["DINGENT_HOME"] = str(data_dir.resolve())
+
+    try:
+        records = profile_imports(module)
+    except RuntimeError as e:
+        console.print(f"[bold red]{e}[/bold red]")
+        raise typer.Exit(1)
+
+    slowest = Table(title=f"Slowest imports under {module} (cumulative)")
+    slowest.add_column("module")
+    slowest.add_column("cumulative ms", justify="right")
+    slowest.add_column("self ms", justify="right")
+    for record in sorted(records, key=lambda r: r.cumulative_us, reverse=True)[:top]:
+        slowest.add_row("  " * record.depth + record.module, f"{record.cumulative_us / 1000:.1f}", f"{record.self_us / 1000:.1f}")
+    console.print(slowest)
+
+    packages = Table(title="Import time by package (self)")
+    packages.add_column("package")
+    packages.add_column("ms", justify="right")
+    for package, us in by_package(records)[:top]:
+        packages.add_row(package, f"{us / 1000:.1f}")
+    console.print(packages)
+    console.print(f"[bold]Total import time:[/bold] {total_us(records) / 1000:.0f} ms across {len(records)} modules")
+
+    if health:
+        try:
+            seconds = time_to_healthy()
+        except (RuntimeError, TimeoutError) as e:
+            console.print(f"[bold red]{e}[/bold red]")
+            raise typer.Exit(1)
+        console.print(f"[bold]Process start → healthy /health:[/bold] {seconds:.2f} s")
 
 
 @app.command()
@@ -0,0 +1,166 @@
+"""
+Output multiplexer for `dingent run`.
+
+Child processes are read in large chunks and split into lines without
+waiting on a per-line timeout. Lines are queued and rendered in batches at a
+fixed frame rate: one `console.print` per frame, executed in a worker thread,
+so Rich rendering never blocks the event loop that drains the pipes. When
+output arrives faster than it can be shown, new lines are dropped (bounded
+memory, the child is never blocked on a full pipe) and a per-service summary
+is printed instead. With `json_lines=True` Rich is bypassed entirely and each
+line is written as one JSON object.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import TextIO
+
+from rich.console import Console
+from rich.text import Text
+
+READ_CHUNK_SIZE = 64 * 1024
+# 单行超过该长度仍未遇到换行时强制切分，避免缓冲区无限增长
+MAX_LINE_BYTES = 1024 * 1024
+
+
+@dataclass(slots=True)
+class _Entry:
+    ts: float
+    service: str
+    text: str
+    color: str | None = None
+    # "line": 子进程输出；"status": CLI 自身的状态消息（Rich markup，永不丢弃）；"dropped": 丢弃摘要
+    kind: str = "line"
+    dropped: int = 0
+
+
+class OutputMultiplexer:
+    def __init__(
+        self,
+        console: Console | None = None,
+        json_lines: bool = False,
+        fps: float = 20,
+        max_pending: int = 10_000,
+        max_lines_per_frame: int = 2_000,
+        out: TextIO | None = None,
+    ):
+        self.console = console or Console()
+        self.json_lines = json_lines
+        self.frame_interval = 1 / fps
+        self.max_pending = max_pending
+        self.max_lines_per_frame = max_lines_per_frame
+        self.out = out or sys.stdout
+        self._pending: deque[_Entry] = deque()
+        self._dropped: dict[str, int] = {}
+        self._wakeup = asyncio.Event()
+        self._renderer: asyncio.Task | None = None
+
+    # ---------- 输入 ----------
+    def message(self, markup: str) -> None:
+        """排队一条 CLI 状态消息（Rich markup）。"""
+        self._pending.append(_Entry(time.time(), "dingent", markup, kind="status"))
+        self._wakeup.set()
+
+    def _push_line(self, service: str, color: str, line: str) -> None:
+        if len(self._pending) >= self.max_pending:
+            self._dropped[service] = self._dropped.get(service, 0) + 1
+            return
+        self._pending.append(_Entry(time.time(), service, line, color))
+        self._wakeup.set()
+
+    async def pump(self, service: str, color: str, stream: asyncio.StreamReader, on_line: Callable[[str], None] | None = None) -> None:
+        """分块读取 `stream` 直到 EOF，按行入队；`on_line` 会在每一行上同步调用。"""
+        buffer = b""
+        while True:
+            chunk = await stream.read(READ_CHUNK_SIZE)
+            if not chunk:
+                break
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > MAX_LINE_BYTES:
+                lines.append(buffer)
+                buffer = b""
+            for raw in lines:
+                line = raw.decode(errors="replace").rstrip("\r")
+                self._push_line(service, color, line)
+                if on_line is not None:
+                    on_line(line)
+        if buffer:
+            line = buffer.decode(errors="replace").rstrip("\r")
+            self._push_line(service, color, line)
+            if on_line is not None:
+                on_line(line)
+
+    # ---------- 渲染 ----------
+    def start(self) -> None:
+        if self._renderer is None:
+            self._renderer = asyncio.create_task(self._render_loop())
+
+    async def close(self) -> None:
+        """停止渲染循环并输出剩余内容。"""
+        if self._renderer is not None:
+            self._renderer.cancel()
+            try:
+                await self._renderer
+            except asyncio.CancelledError:
+                pass
+            self._renderer = None
+        while self._pending or self._dropped:
+            self._render(self._take_batch())
+
+    async def _render_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+            started = time.perf_counter()
+            batch = self._take_batch()
+            if batch:
+                await asyncio.to_thread(self._render, batch)
+            if self._pending:
+                self._wakeup.set()
+            await asyncio.sleep(max(0.0, self.frame_interval - (time.perf_counter() - started)))
+
+    def _take_batch(self) -> list[_Entry]:
+        # 每帧行数上限只用于限制 Rich 渲染耗时；JSON 直写没有这项开销
+        count = len(self._pending) if self.json_lines else min(len(self._pending), self.max_lines_per_frame)
+        batch = [self._pending.popleft() for _ in range(count)]
+        if self._dropped:
+            now = time.time()
+            batch.extend(_Entry(now, service, f"… {n} lines dropped (output too fast)", "yellow", kind="dropped", dropped=n) for service, n in self._dropped.items())
+            self._dropped = {}
+        return batch
+
+    def _render(self, batch: list[_Entry]) -> None:
+        if self.json_lines:
+            self.out.write("".join(self._format_json(entry) for entry in batch))
+            self.out.flush()
+            return
+        text = Text()
+        for i, entry in enumerate(batch):
+            if i:
+                text.append("\n")
+            if entry.kind == "status":
+                text.append_text(Text.from_markup(entry.text))
+            else:
+                # 子进程输出按纯文本处理，不解析其中的 [markup]
+                text.append(f"[{entry.service.upper():^8}] ", style=entry.color)
+                text.append(entry.text, style="italic yellow" if entry.kind == "dropped" else None)
+        self.console.print(text, highlight=False, soft_wrap=True)
+
+    @staticmethod
+    def _format_json(entry: _Entry) -> str:
+        record: dict = {"ts": round(entry.ts, 3), "service": entry.service}
+        if entry.kind == "status":
+            record["event"] = Text.from_markup(entry.text).plain
+        elif entry.kind == "dropped":
+            record["dropped"] = entry.dropped
+        else:
+            record["message"] = entry.text
+        return json.dumps(record, ensure_ascii=False) + "\n"
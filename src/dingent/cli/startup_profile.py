@@ -0,0 +1,117 @@
+"""
+Startup profiling helpers behind `dingent profile-startup`.
+
+Import cost is measured in a fresh interpreter with `python -X importtime`, so
+the numbers are not skewed by modules the CLI itself already imported; boot
+time is measured by starting the backend and polling its health endpoint.
+"""
+
+from __future__ import annotations
+
+import os
+import re
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from collections import defaultdict
+from dataclasses import dataclass
+
+# "import time:       412 |       1032 |     dingent.core.config"
+_LINE_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s+)(\S+)\s*$")
+
+
+@dataclass(frozen=True)
+class ImportRecord:
+    module: str
+    self_us: int
+    cumulative_us: int
+    # 嵌套深度：0 表示被 `import <module>` 直接（或最先）触发
+    depth: int
+
+    @property
+    def package(self) -> str:
+        return self.module.split(".", 1)[0]
+
+
+def parse_importtime(text: str) -> list[ImportRecord]:
+    """解析 `-X importtime` 写到 stderr 的报告，忽略表头与其它输出。"""
+    records = []
+    for line in text.splitlines():
+        match = _LINE_RE.match(line)
+        if match:
+            self_us, cumulative_us, indent, module = match.groups()
+            records.append(ImportRecord(module, int(self_us), int(cumulative_us), (len(indent) - 1) // 2))
+    return records
+
+
+def profile_imports(module: str = "dingent.server.main", env: dict[str, str] | None = None) -> list[ImportRecord]:
+    """在新的解释器中导入 `module` 并返回每个模块的导入耗时。"""
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+        env={**os.environ, **(env or {})},
+    )
+    if proc.returncode != 0:
+        tail = "\n".join(line for line in proc.stderr.splitlines() if not line.startswith("import time:"))[-2000:]
+        raise RuntimeError(f"Importing '{module}' failed:\n{tail}")
+    return parse_importtime(proc.stderr)
+
+
+def total_us(records: list[ImportRecord]) -> int:
+    """全部导入的耗时（各模块自身耗时之和）。"""
+    return sum(r.self_us for r in records)
+
+
+def by_package(records: list[ImportRecord]) -> list[tuple[str, int]]:
+    """按顶层包汇总自身耗时，从高到低排序。"""
+    totals: dict[str, int] = defaultdict(int)
+    for record in records:
+        totals[record.package] += record.self_us
+    return sorted(totals.items(), key=lambda item: item[1], reverse=True)
+
+
+def _free_port(host: str) -> int:
+    with socket.socket() as sock:
+        sock.bind((host, 0))
+        return sock.getsockname()[1]
+
+
+def time_to_healthy(app: str = "dingent.server.main:app", host: str = "127.0.0.1", port: int | None = None, timeout: float = 60.0) -> float:
+    """
+    启动后端进程，返回从进程启动到 /api/v1/health 首次返回 200 的秒数。
+
+    Raises:
+        TimeoutError: 超时仍未就绪
+        RuntimeError: 进程提前退出
+    """
+    port = port or _free_port(host)
+    url = f"http://{host}:{port}/api/v1/health"
+    started = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", app, "--host", host, "--port", str(port), "--log-level", "warning"],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    try:
+        while time.perf_counter() - started < timeout:
+            if proc.poll() is not None:
+                raise RuntimeError(f"Backend exited with code {proc.returncode}:\n{(proc.stderr.read() if proc.stderr else '')[-2000:]}")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        return time.perf_counter() - started
+            except (urllib.error.URLError, ConnectionError, TimeoutError):
+                pass
+            time.sleep(0.02)
+        raise TimeoutError(f"Backend did not become healthy within {timeout:.0f}s")
+    finally:
+        proc.terminate()
+        try:
+            proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+            proc.kill()
@@ -4,6 +4,7 @@ from collections.abc import Callable
 from contextlib import asynccontextmanager
 from uuid import UUID
 
+from ..logs.correlation import get_correlation_id
 from ..plugins.plugin import PluginRuntime
 from ..plugins.plugin_manager import PluginManager
 from ..plugins.schemas import RunnableTool
@@ -89,8 +90,11 @@ class AssistantRuntime:
             for t in tools:
 
                 async def call_tool(arguments: dict, _runtime=inst, _tool=t):
+                    # 将当前 run 的 correlation id 作为请求元数据传给插件进程
+                    correlation_id = get_correlation_id()
+                    meta = {"correlation_id": correlation_id} if correlation_id else None
                     async with _runtime.mcp_client as tool_client:
-                        return await tool_client.call_tool(_tool.name, arguments=arguments)
+                        return await tool_client.call_tool(_tool.name, arguments=arguments, meta=meta)
 
                 runnable.append(RunnableTool(tool=t, plugin_id=inst.id, run=call_tool))
         yield runnable
@@ -1,4 +1,5 @@
 from functools import lru_cache
+from typing import Literal
 
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -12,8 +13,100 @@ class Settings(BaseSettings):
     PROJECT_NAME: str = "Dingent"
 
     DING_MASTER_KEY: str | None = None
+    # 解密缓存：按密文摘要缓存明文，0 表示禁用
+    DECRYPT_CACHE_MAX_ENTRIES: int = 1024
+    DECRYPT_CACHE_TTL_SECONDS: float = 300.0
 
     DATABASE_URL: str = f"sqlite:///{paths.sqlite_path}"
+    # 启动时创建表 / 补列 / 创建默认角色；多 worker 时由父进程完成一次，worker 中关闭
+    DB_INIT_ON_STARTUP: bool = True
+
+    # --- 模型解析缓存 ---
+    # 解析结果的有效期（秒）：失效通知只作用于当前进程，多 worker 时其它 worker 最迟在该时间后看到模型 / API Key 的变更
+    MODEL_CACHE_TTL_SECONDS: float = 60.0
+    MODEL_CACHE_MAX_RESOLUTIONS: int = 4096
+
+    # --- 日志存储 ---
+    # 日志持久化到 paths.log_db_path；超过条数或天数的旧日志会被定期清理
+    LOG_RETENTION_MAX_ENTRIES: int = 100_000
+    LOG_RETENTION_DAYS: float = 7.0
+    # 多个 worker 写入同一个日志库时开启：统计不再只靠本进程的增量计数，而是定期从库中重新聚合
+    # （实时日志流仍只包含本 worker 的日志）
+    LOG_SHARED_STORE: bool = False
+
+    # --- 用量与预算 ---
+    # 用量明细批量写入的条数 / 间隔；预算为每日（UTC）美元上限，None 表示不限制
+    USAGE_BATCH_SIZE: int = 200
+    USAGE_FLUSH_INTERVAL: float = 2.0
+    USAGE_WORKSPACE_DAILY_BUDGET_USD: float | None = None
+    USAGE_PRINCIPAL_DAILY_BUDGET_USD: float | None = None
+    # 每日 token 上限：工作空间整体 / 单个游客（X-Visitor-ID）
+    USAGE_WORKSPACE_DAILY_TOKEN_BUDGET: int | None = None
+    USAGE_VISITOR_DAILY_TOKEN_BUDGET: int | None = None
+
+    # --- 对话限流（令牌桶，<=0 表示不限制） ---
+    # memory: 进程内；sqlite: 同机多个 worker 共享
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: Literal["memory", "sqlite"] = "memory"
+    RATE_LIMIT_WORKSPACE_PER_MINUTE: float = 120.0
+    RATE_LIMIT_WORKSPACE_BURST: int = 30
+    RATE_LIMIT_USER_PER_MINUTE: float = 30.0
+    RATE_LIMIT_USER_BURST: int = 10
+    # 游客按 visitor id 和客户端 IP 同时限流（visitor id 可被任意伪造）
+    # 客户端 IP 取自 uvicorn 解析后的地址：部署在反向代理之后时须把代理地址加入
+    # `dingent serve --forwarded-allow-ips`（或 FORWARDED_ALLOW_IPS），否则所有游客共用代理 IP 这一个桶
+    RATE_LIMIT_VISITOR_PER_MINUTE: float = 10.0
+    RATE_LIMIT_VISITOR_BURST: int = 5
+    RATE_LIMIT_GUEST_IP_PER_MINUTE: float = 30.0
+    RATE_LIMIT_GUEST_IP_BURST: int = 10
+
+    # --- Dashboard 总览缓存（秒） ---
+    OVERVIEW_PLUGINS_TTL: float = 30.0
+    OVERVIEW_LOGS_TTL: float = 10.0
+    OVERVIEW_MARKET_TTL: float = 300.0
+
+    # --- 服务就绪 ---
+    # `dingent serve` 开始优雅关闭时创建该文件；文件存在时 /health/ready 返回 503，
+    # 负载均衡据此停止转发新请求，进行中的对话流照常完成
+    DRAIN_FILE: str | None = None
+
+    # --- 插件 ---
+    # 监听插件目录，增删改插件后自动刷新注册表并同步数据库（需要 watchfiles）
+    PLUGIN_WATCH_ENABLED: bool = False
+
+    # --- 插件市场 ---
+    # 为空时使用 GitHub 上的 dingent-hub；file:///path/to/hub 使用本地目录（离线 / 测试）
+    MARKET_SOURCE: str | None = None
+    # 本地索引快照的有效期（秒），过期后用 ETag / If-Modified-Since 检查远端是否有变化
+    MARKET_INDEX_TTL: float = 600.0
+    # 安装插件时同时下载的文件数
+    MARKET_DOWNLOAD_CONCURRENCY: int = 8
+
+    # --- 监控指标 ---
+    # 在 /metrics 暴露 Prometheus 指标。该端点不做鉴权，且包含各工作空间的 workflow 名称和模型配置 id，
+    # 默认关闭；只在 /metrics 无法从公网访问时开启（如由反向代理屏蔽，仅供内网的 Prometheus 抓取）
+    METRICS_ENABLED: bool = False
+
+    # --- 链路追踪 ---
+    # 默认不记录；开启后在进程内统计各阶段耗时，TRACING_OTEL 额外转发到 OpenTelemetry
+    TRACING_ENABLED: bool = False
+    TRACING_OTEL: bool = False
+    TRACING_WINDOW_SECONDS: float = 900.0
+
+    # --- 数据库连接池（内存 SQLite 除外）---
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 30.0
+    # 连接回收周期（秒），-1 表示不回收
+    DB_POOL_RECYCLE: int = 1800
+
+    # --- SQLite PRAGMA ---
+    SQLITE_SYNCHRONOUS: Literal["OFF", "NORMAL", "FULL", "EXTRA"] = "NORMAL"
+    # 负数表示 KiB，正数表示页数
+    SQLITE_CACHE_SIZE: int = -64000
+    SQLITE_MMAP_SIZE: int = 256 * 1024 * 1024
+    SQLITE_BUSY_TIMEOUT_MS: int = 5000
+    SQLITE_TEMP_STORE: Literal["DEFAULT", "FILE", "MEMORY"] = "MEMORY"
 
 
 @lru_cache
@@ -1,7 +1,9 @@
 from collections.abc import Sequence
-from uuid import UUID
+from typing import Any
+from uuid import UUID, uuid4
 
-from sqlmodel import Session, select
+from sqlalchemy import insert, update
+from sqlmodel import Session, SQLModel, col, delete, select
 
 from dingent.core.db.models import Workflow, WorkflowEdge, WorkflowNode
 from dingent.core.workflows.schemas import (
@@ -39,82 +41,135 @@ def get_workflow_by_name(db: Session, name: str, workspace_id: UUID) -> Workflow
     return db.exec(statement).first()
 
 
-def replace_workflow(db: Session, db_workflow: Workflow, wf_create: WorkflowReplace) -> Workflow:
+def replace_workflow(db: Session, db_workflow: Workflow, wf_create: WorkflowReplace, *, diff: bool = False) -> Workflow:
     """
     Replaces an existing workflow with new data, including its nodes and edges.
 
-    This is an atomic operation: it deletes all existing nodes and edges
-    for the workflow and creates new ones from the `wf_create` payload.
-    """
-    # 1. Delete all existing edges and nodes associated with the workflow
-    # It's good practice to delete edges first to avoid foreign key constraint issues.
-    for edge in list_workflow_edges(db, db_workflow.id):
-        db.delete(edge)
-    for node in list_workflow_nodes(db, db_workflow.id):
-        db.delete(node)
+    This is an atomic, set-based operation: nodes and edges are written with one
+    DELETE / INSERT (executemany) statement per table instead of one ORM object
+    at a time, and everything is committed in a single transaction.
 
-    db.flush()
+    With ``diff=True`` only the rows that actually changed are touched: nodes whose
+    payload id matches an existing node keep their id and are updated in place,
+    unchanged edges are left alone, and only stale rows are deleted.
+    """
+    workflow_id = db_workflow.id
 
-    # 2. Update the workflow's own properties (name, description, etc.)
+    # 1. Update the workflow's own properties (name, description, etc.)
     # We exclude nodes and edges as we will handle them separately.
     update_data = wf_create.model_dump(exclude={"nodes", "edges"})
     for key, value in update_data.items():
         setattr(db_workflow, key, value)
     db.add(db_workflow)
 
-    db.flush()
-    # 3. Create new nodes from the payload
-    # Assumes that wf_create.nodes contains a list of WorkflowNodeCreate schemas
-    # and that the IDs in the payload are the ones we want to use.
-    id_map: dict[str, UUID] = {}
-    if wf_create.nodes:
-        for node_create in wf_create.nodes:
-            client_id_str = str(node_create.id) if getattr(node_create, "id", None) is not None else None
-
-            # 丢弃前端 id，用 DB/模型默认 UUID
-            new_node = WorkflowNode.model_validate(
-                node_create.model_dump(exclude={"id"}),
-                update={"workflow_id": db_workflow.id},
-            )
-            db.add(new_node)
-            if client_id_str:
-                id_map[client_id_str] = new_node.id
-
-    db.flush()
-
-    # 4. Create new edges from the payload
-    # Assumes that wf_create.edges contains a list of WorkflowEdgeCreate schemas
-    def resolve_node_id(raw) -> UUID:
-        raw_str = str(raw)
-        if raw_str in id_map:
-            return id_map[raw_str]
-        try:
-            return UUID(raw_str)
-        except ValueError:
-            raise ValueError(f"edge 引用的节点 id 未找到映射且不是合法 UUID: {raw_str}")
-
-    if wf_create.edges:
-        for edge_create in wf_create.edges:
-            src = resolve_node_id(edge_create.source_node_id)
-            tgt = resolve_node_id(edge_create.target_node_id)
-
-            new_edge = WorkflowEdge.model_validate(
-                edge_create.model_dump(exclude={"id"}),
-                update={
-                    "workflow_id": db_workflow.id,
-                    "source_node_id": src,
-                    "target_node_id": tgt,
-                },
-            )
-            db.add(new_edge)
-
-    db.flush()
-    # 5. Commit the transaction and refresh the state
+    if diff:
+        _sync_workflow_graph(db, workflow_id, wf_create)
+    else:
+        # 2. Drop the whole graph; edges first to avoid foreign key constraint issues.
+        db.exec(delete(WorkflowEdge).where(col(WorkflowEdge.workflow_id) == workflow_id))
+        db.exec(delete(WorkflowNode).where(col(WorkflowNode.workflow_id) == workflow_id))
+
+        # 3. Re-create nodes and edges with one bulk INSERT each.
+        id_map: dict[str, UUID] = {}
+        node_rows = [_node_row(workflow_id, node_create, uuid4(), id_map) for node_create in wf_create.nodes]
+        edge_rows = [_edge_row(workflow_id, edge_create, id_map) for edge_create in wf_create.edges]
+        _bulk_insert(db, WorkflowNode, node_rows)
+        _bulk_insert(db, WorkflowEdge, edge_rows)
+
+    # 4. Commit the transaction and refresh the state
     db.commit()
+    # Core statements bypass the identity map, drop anything the session still caches.
+    db.expire_all()
     db.refresh(db_workflow)
     return db_workflow
 
 
+_NODE_FIELDS = ("assistant_id", "type", "is_start_node", "position", "measured")
+_EDGE_FIELDS = ("source_node_id", "target_node_id", "source_handle", "target_handle", "type", "mode")
+
+
+def _node_row(workflow_id: UUID, node_create: WorkflowNodeCreate, node_id: UUID, id_map: dict[str, UUID]) -> dict[str, Any]:
+    """Build an INSERT/UPDATE row for a node and record its client id -> DB id mapping."""
+    if getattr(node_create, "id", None) is not None:
+        id_map[str(node_create.id)] = node_id
+    data = node_create.model_dump(exclude={"id"})
+    return {"id": node_id, "workflow_id": workflow_id, **{k: data.get(k) for k in _NODE_FIELDS}}
+
+
+def _edge_row(workflow_id: UUID, edge_create: WorkflowEdgeCreate, id_map: dict[str, UUID]) -> dict[str, Any]:
+    data = edge_create.model_dump(exclude={"id"})
+    data["source_node_id"] = _resolve_node_id(edge_create.source_node_id, id_map)
+    data["target_node_id"] = _resolve_node_id(edge_create.target_node_id, id_map)
+    return {"id": uuid4(), "workflow_id": workflow_id, **{k: data.get(k) for k in _EDGE_FIELDS}}
+
+
+def _resolve_node_id(raw: Any, id_map: dict[str, UUID]) -> UUID:
+    raw_str = str(raw)
+    if raw_str in id_map:
+        return id_map[raw_str]
+    try:
+        return UUID(raw_str)
+    except ValueError:
+        raise ValueError(f"edge 引用的节点 id 未找到映射且不是合法 UUID: {raw_str}")
+
+
+def _bulk_insert(db: Session, model: type[SQLModel], rows: list[dict[str, Any]]) -> None:
+    if rows:
+        # executemany: SQLAlchemy batches this into multi-row INSERT ... VALUES statements
+        db.exec(insert(model), params=rows)  # type: ignore[call-overload]
+
+
+def _sync_workflow_graph(db: Session, workflow_id: UUID, wf_create: WorkflowReplace) -> None:
+    """Diff the payload against the stored graph and only write the changed rows."""
+    # Plain column tuples: nothing enters the identity map, so nothing can go stale.
+    existing_nodes = {
+        row[0]: dict(zip(_NODE_FIELDS, row[1:], strict=True))
+        for row in db.exec(select(WorkflowNode.id, *(getattr(WorkflowNode, f) for f in _NODE_FIELDS)).where(WorkflowNode.workflow_id == workflow_id))
+    }
+    existing_edges = {
+        tuple(row[1:]): row[0] for row in db.exec(select(WorkflowEdge.id, *(getattr(WorkflowEdge, f) for f in _EDGE_FIELDS)).where(WorkflowEdge.workflow_id == workflow_id))
+    }
+
+    # 1. Nodes: keep the DB id when the editor echoes it back, otherwise it is a new node.
+    id_map: dict[str, UUID] = {}
+    nodes_to_insert: list[dict[str, Any]] = []
+    nodes_to_update: list[dict[str, Any]] = []
+    for node_create in wf_create.nodes:
+        node_id = _existing_id(node_create.id, existing_nodes)
+        row = _node_row(workflow_id, node_create, node_id or uuid4(), id_map)
+        if node_id is None:
+            nodes_to_insert.append(row)
+        elif any(existing_nodes[node_id][k] != row[k] for k in _NODE_FIELDS):
+            nodes_to_update.append(row)
+    stale_node_ids = set(existing_nodes) - set(id_map.values())
+
+    # 2. Edges carry no stable id, so they are compared by value.
+    desired_edges: dict[tuple, dict[str, Any]] = {}
+    for edge_create in wf_create.edges:
+        row = _edge_row(workflow_id, edge_create, id_map)
+        desired_edges.setdefault(tuple(row[k] for k in _EDGE_FIELDS), row)
+    stale_edge_ids = [edge_id for key, edge_id in existing_edges.items() if key not in desired_edges]
+    edges_to_insert = [row for key, row in desired_edges.items() if key not in existing_edges]
+
+    # 3. Apply: edges are removed before nodes and added after them (foreign keys).
+    if stale_edge_ids:
+        db.exec(delete(WorkflowEdge).where(col(WorkflowEdge.id).in_(stale_edge_ids)))
+    if stale_node_ids:
+        db.exec(delete(WorkflowNode).where(col(WorkflowNode.id).in_(stale_node_ids)))
+    if nodes_to_update:
+        db.exec(update(WorkflowNode), params=nodes_to_update)  # type: ignore[call-overload]
+    _bulk_insert(db, WorkflowNode, nodes_to_insert)
+    _bulk_insert(db, WorkflowEdge, edges_to_insert)
+
+
+def _existing_id(raw: Any, existing: dict[UUID, Any]) -> UUID | None:
+    try:
+        candidate = UUID(str(raw))
+    except ValueError:
+        return None
+    return candidate if candidate in existing else None
+
+
 def list_workflows_by_workspace(db: Session, workspace_id: UUID) -> list[Workflow]:
     """
     List all workflows for a specific WORKSPACE.
@@ -1,5 +1,5 @@
 from collections import defaultdict
-from datetime import datetime
+from datetime import date, datetime
 from typing import Any
 from uuid import UUID, uuid4
 
@@ -225,6 +225,8 @@ class Plugin(SQLModel, table=True):
     version: str = "0.1.0"
 
     config_schema: dict[str, Any] = Field(default=None, sa_column=Column(JSON))
+    # 上次同步的 manifest 摘要，见 PluginSyncService
+    schema_hash: str | None = None
 
     # 多对多
     assistants: list["Assistant"] = Relationship(
@@ -407,6 +409,51 @@ class LLMModelConfig(SQLModel, table=True):
         return {k: v for k, v in kwargs.items() if v is not None}
 
 
+# --- 用量统计 ---
+
+
+class UsageRecord(SQLModel, table=True):
+    """
+    单次 LLM 调用的用量明细，由 litellm 回调经 UsageLedger 批量写入。
+    不设外键：删除工作空间 / 模型配置后账目仍需保留。
+    """
+
+    id: int | None = Field(default=None, primary_key=True)
+    created_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+
+    workspace_id: UUID | None = Field(default=None, index=True)
+    user_id: UUID | None = Field(default=None)
+    visitor_id: str | None = Field(default=None)
+    assistant_id: UUID | None = Field(default=None)
+    model_config_id: UUID | None = Field(default=None)
+    model: str
+
+    prompt_tokens: int = Field(default=0)
+    completion_tokens: int = Field(default=0)
+    cost: float = Field(default=0.0, description="litellm 计算的费用（美元）")
+    correlation_id: str | None = Field(default=None)
+
+
+class UsageDailyRollup(SQLModel, table=True):
+    """
+    按天预聚合的用量，仪表盘和预算检查只读这张表。
+    维度列作为复合主键，缺失的维度存为空字符串（主键列不能为 NULL）。
+    """
+
+    day: date = Field(primary_key=True)
+    workspace_id: str = Field(default="", primary_key=True)
+    # "user:<id>" / "visitor:<id>" / ""
+    principal: str = Field(default="", primary_key=True)
+    assistant_id: str = Field(default="", primary_key=True)
+    model_config_id: str = Field(default="", primary_key=True)
+    model: str = Field(default="", primary_key=True)
+
+    requests: int = Field(default=0)
+    prompt_tokens: int = Field(default=0)
+    completion_tokens: int = Field(default=0)
+    cost: float = Field(default=0.0)
+
+
 class Conversation(SQLModel, table=True):
     """
     业务层面的对话记录 (Thread)。
@@ -0,0 +1,76 @@
+"""
+连接池监控：记录每次借出连接的耗时，以及因连接池耗尽而需要等待的次数。
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any
+
+from sqlalchemy.pool import QueuePool
+
+
+class PoolMetrics:
+    """连接借出统计（线程安全）。"""
+
+    def __init__(self, window: int = 2048):
+        self._lock = threading.Lock()
+        self._recent: deque[float] = deque(maxlen=window)
+        self.checkouts = 0
+        self.waits = 0
+        self.total_checkout_seconds = 0.0
+        self.max_checkout_seconds = 0.0
+
+    def record(self, seconds: float, waited: bool) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.waits += int(waited)
+            self.total_checkout_seconds += seconds
+            self.max_checkout_seconds = max(self.max_checkout_seconds, seconds)
+            self._recent.append(seconds)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._recent.clear()
+            self.checkouts = 0
+            self.waits = 0
+            self.total_checkout_seconds = 0.0
+            self.max_checkout_seconds = 0.0
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            recent = sorted(self._recent)
+            data = {
+                "checkouts": self.checkouts,
+                "waits": self.waits,
+                "checkout_seconds_total": self.total_checkout_seconds,
+                "checkout_ms_max": self.max_checkout_seconds * 1000,
+            }
+
+        def pct(q: float) -> float:
+            if not recent:
+                return 0.0
+            return recent[min(len(recent) - 1, int(len(recent) * q))] * 1000
+
+        data.update(checkout_ms_p50=pct(0.50), checkout_ms_p95=pct(0.95), checkout_ms_p99=pct(0.99))
+        return data
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """
+    QueuePool 的计时版本。
+
+    借出前如果已用连接数达到 pool_size + max_overflow，则本次借出必然排队等待，计入 waits。
+    """
+
+    def _do_get(self):
+        limit = self.size() + self._max_overflow
+        waited = self._max_overflow >= 0 and self.checkedout() >= limit
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            pool_metrics.record(time.perf_counter() - start, waited)
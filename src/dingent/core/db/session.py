@@ -1,27 +1,50 @@
-from sqlalchemy import create_engine, event
+from typing import Any
+
+from sqlalchemy import create_engine, event, inspect
+from sqlalchemy.engine import make_url
 from sqlmodel import Session, SQLModel, select
 
 from ..config import settings
 from .models import *  # noqa: F403
 from .models import Role
+from .pool import InstrumentedQueuePool
+
+_url = make_url(settings.DATABASE_URL)
+_is_sqlite = _url.get_backend_name() == "sqlite"
+
+
+def _engine_options() -> dict[str, Any]:
+    options: dict[str, Any] = {"echo": False, "pool_pre_ping": True}
+    if _is_sqlite and _url.database in (None, "", ":memory:"):
+        # 内存库由 SQLAlchemy 使用单连接池，连接池参数不适用
+        return options
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=settings.DB_POOL_SIZE,
+        max_overflow=settings.DB_MAX_OVERFLOW,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+    )
+    return options
+
 
-engine = create_engine(
-    settings.DATABASE_URL,
-    echo=False,
-    pool_pre_ping=True,
-    # connect_args={"check_same_thread": False},
-)
+engine = create_engine(settings.DATABASE_URL, **_engine_options())
 
 
-def _set_sqlite_pragmas(dbapi_connection, connection_record):
-    print(connection_record)
+def _set_sqlite_pragmas(dbapi_connection, _connection_record):
     cursor = dbapi_connection.cursor()
     cursor.execute("PRAGMA journal_mode=WAL;")
     cursor.execute("PRAGMA foreign_keys=ON;")
+    cursor.execute(f"PRAGMA synchronous={settings.SQLITE_SYNCHRONOUS};")
+    cursor.execute(f"PRAGMA cache_size={int(settings.SQLITE_CACHE_SIZE)};")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.SQLITE_MMAP_SIZE)};")
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.SQLITE_BUSY_TIMEOUT_MS)};")
+    cursor.execute(f"PRAGMA temp_store={settings.SQLITE_TEMP_STORE};")
     cursor.close()
 
 
-event.listen(engine, "connect", _set_sqlite_pragmas)
+if _is_sqlite:
+    event.listen(engine, "connect", _set_sqlite_pragmas)
 
 
 def create_initial_roles():
@@ -45,10 +68,28 @@ def create_initial_roles():
         session.commit()
 
 
+def add_missing_columns():
+    """
+    create_all 不会给已存在的表加列：为旧数据库补上模型中新增的可空列。
+    只处理可空且无服务端默认值的列，其余变更仍需手动迁移。
+    """
+    inspector = inspect(engine)
+    existing_tables = set(inspector.get_table_names())
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            existing = {col["name"] for col in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing or not column.nullable or column.server_default is not None:
+                    continue
+                column_type = column.type.compile(dialect=engine.dialect)
+                conn.exec_driver_sql(f'ALTER TABLE "{table.name}" ADD COLUMN "{column.name}" {column_type}')
+
+
 # --- 3. Database Initialization Function ---
+# 不在导入时执行：由应用 lifespan 在启动时调用
 def create_db_and_tables():
     SQLModel.metadata.create_all(engine)
+    add_missing_columns()
     create_initial_roles()
-
-
-create_db_and_tables()
@@ -1,53 +1,83 @@
+from typing import Any
+from uuid import UUID
+
 import litellm
-from litellm.budget_manager import BudgetManager
 from litellm.integrations.custom_logger import CustomLogger
 
+from dingent.core import metrics
+from dingent.core.config import settings
+from dingent.core.llms.usage_ledger import UsageEvent, UsageLedger
+
 
 # This is an "internal" class used by AnalyticsManager.
 # The underscore indicates it's not meant for direct use outside the manager.
 class _AnalyticsCallbackHandler(CustomLogger):
     """
-    Custom litellm logger that connects to a BudgetManager
-    to update costs after a successful API call.
+    Custom litellm logger that records Prometheus metrics (latency, tokens,
+    cost per model config) and, when a UsageLedger is attached, books every
+    successful call into the persistent usage ledger.
     """
 
-    def __init__(self, budget_manager: BudgetManager):
-        self.budget_manager = budget_manager
+    def __init__(self, ledger: UsageLedger | None = None):
+        self.ledger = ledger
+
+    def _record(self, kwargs, response_obj, start_time, end_time, outcome: str):
+        metadata = (kwargs.get("litellm_params") or {}).get("metadata") or {}
+        model_config = str(metadata.get("model_config_id") or "default")
+        model = str(kwargs.get("model") or "unknown")
+        if start_time and end_time:
+            metrics.LLM_CALL_SECONDS.labels(model_config, model, outcome).observe((end_time - start_time).total_seconds())
+        usage = getattr(response_obj, "usage", None)
+        if usage is not None:
+            metrics.LLM_TOKENS.labels(model_config, model, "prompt").inc(getattr(usage, "prompt_tokens", 0) or 0)
+            metrics.LLM_TOKENS.labels(model_config, model, "completion").inc(getattr(usage, "completion_tokens", 0) or 0)
+        cost = kwargs.get("response_cost")
+        if cost:
+            metrics.LLM_COST.labels(model_config, model).inc(cost)
+
+    def _book(self, kwargs, response_obj, end_time):
+        if self.ledger is not None:
+            self.ledger.record(UsageEvent.from_litellm(kwargs, response_obj, end_time))
 
     def log_success_event(self, kwargs, response_obj, start_time, end_time):
         """Sync version of the callback."""
-        # Extract user from metadata passed in the litellm call
-        user = kwargs.get("litellm_params", {}).get("metadata", {}).get("user_id")
-        if user:
-            self.budget_manager.update_cost(user, response_obj)
+        if not kwargs:
+            return
+        self._record(kwargs, response_obj, start_time, end_time, "ok")
+        self._book(kwargs, response_obj, end_time)
 
     async def async_log_success_event(self, kwargs, response_obj, start_time, end_time):
         """Async version of the callback."""
-        # Extract user from metadata passed in the litellm call
         if not kwargs:
             return
-        user = ((kwargs.get("litellm_params", {}).get("metadata")) or {}).get("user_id")
-        if user:
-            self.budget_manager.update_cost(user, response_obj)
+        self._record(kwargs, response_obj, start_time, end_time, "ok")
+        self._book(kwargs, response_obj, end_time)
+
+    def log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        if kwargs:
+            self._record(kwargs, None, start_time, end_time, "error")
+
+    async def async_log_failure_event(self, kwargs, response_obj, start_time, end_time):
+        if kwargs:
+            self._record(kwargs, None, start_time, end_time, "error")
 
 
 class AnalyticsManager:
     """
     Manages cost and budget analytics for litellm.
 
-    This class initializes a BudgetManager and a custom callback handler,
-    and provides a simple interface to register the callback and manage user budgets.
+    Usage is persisted by a `UsageLedger` (raw rows plus daily rollups in the
+    application database); this class wires the litellm callback to it and
+    answers spend / budget questions from the rollups.
     """
 
-    def __init__(self, project_name: str):
+    def __init__(self, ledger: UsageLedger):
         """
-        Initializes the BudgetManager and the callback handler.
-
         Args:
-            project_name (str): A unique name for the project to store budget data.
+            ledger (UsageLedger): The ledger usage events are booked into.
         """
-        self.budget_manager = BudgetManager(project_name=project_name)
-        self._callback_handler = _AnalyticsCallbackHandler(self.budget_manager)
+        self.ledger = ledger
+        self._callback_handler = _AnalyticsCallbackHandler(ledger)
 
     def register(self):
         """
@@ -58,30 +88,49 @@ class AnalyticsManager:
         """
         if self._callback_handler not in litellm.callbacks:
             litellm.callbacks.append(self._callback_handler)
-        print("AnalyticsManager callback registered with litellm.")
 
-    def get_or_create_user_budget(self, user: str, total_budget: float):
-        """
-        Creates a budget for a user if they don't already have one.
-
-        Args:
-            user (str): The identifier for the user.
-            total_budget (float): The total budget to assign to the user.
-        """
-        if not self.budget_manager.is_valid_user(user):
-            self.budget_manager.create_budget(total_budget=total_budget, user=user)
-            print(f"Budget created for user '{user}' with a total of ${total_budget}.")
-        else:
-            print(f"User '{user}' already has an existing budget.")
+    def unregister(self):
+        if self._callback_handler in litellm.callbacks:
+            litellm.callbacks.remove(self._callback_handler)
 
-    def get_user_cost(self, user: str) -> dict:
+    def get_workspace_usage(self, workspace_id: UUID, days: int = 30) -> dict[str, Any]:
         """
-        Retrieves the current spending data for a specific user.
+        Usage summary of a workspace for the dashboard.
 
         Args:
-            user (str): The identifier for the user.
+            workspace_id (UUID): The workspace to report on.
+            days (int): Number of days covered by the history and breakdowns.
 
         Returns:
-            dict: A dictionary containing the user's spending information.
+            dict: Today's spend against the configured budget, the daily history
+            and per-model / per-assistant breakdowns.
+        """
+        today = self.ledger.spend(workspace_id)
+        budget = settings.USAGE_WORKSPACE_DAILY_BUDGET_USD
+        return {
+            "today": today,
+            "budget": {
+                "daily_limit": budget,
+                "remaining": max(budget - today["cost"], 0.0) if budget is not None else None,
+                "principal_daily_limit": settings.USAGE_PRINCIPAL_DAILY_BUDGET_USD,
+                "daily_token_limit": settings.USAGE_WORKSPACE_DAILY_TOKEN_BUDGET,
+                "visitor_daily_token_limit": settings.USAGE_VISITOR_DAILY_TOKEN_BUDGET,
+            },
+            "daily": self.ledger.daily(workspace_id, days),
+            "by_model": self.ledger.breakdown(workspace_id, "model", days),
+            "by_assistant": self.ledger.breakdown(workspace_id, "assistant_id", days),
+        }
+
+    def check_budget(self, workspace_id: UUID, principal: str) -> str | None:
+        """
+        Returns the reason a new run must be refused, or None when within budget.
         """
-        return self.budget_manager.user_dict.get("user", {})
+        is_visitor = principal.startswith("visitor:")
+        return self.ledger.over_budget(
+            workspace_id,
+            principal,
+            workspace_budget=settings.USAGE_WORKSPACE_DAILY_BUDGET_USD,
+            principal_budget=settings.USAGE_PRINCIPAL_DAILY_BUDGET_USD,
+            workspace_tokens=settings.USAGE_WORKSPACE_DAILY_TOKEN_BUDGET,
+            principal_tokens=settings.USAGE_VISITOR_DAILY_TOKEN_BUDGET if is_visitor else None,
+        )
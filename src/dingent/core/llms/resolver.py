@@ -8,25 +8,160 @@ to use at runtime. The priority order is:
 2. Workflow-level configuration
 3. Workspace-level default configuration
 4. Environment fallback (lowest priority)
+
+Resolved config ids and the built ChatLiteLLM clients are cached process-wide
+(see `ModelCache`); any write that can change the outcome of the cascade must
+call `invalidate_model_cache()`. Invalidation only reaches the current process,
+so resolutions also expire after `MODEL_CACHE_TTL_SECONDS`: edits made through
+another worker (or a revoked API key) take effect within that window.
 """
 
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterable
+from functools import lru_cache
+from typing import Any
 from uuid import UUID
 
 from langchain_litellm import ChatLiteLLM
-from sqlmodel import Session
+from sqlmodel import Session, col, select
 
+from dingent.core.config import settings
 from dingent.core.db.models import Assistant, LLMModelConfig, Workflow, Workspace
 from dingent.core.security.crypto import get_secret_manager
 
+ResolutionKey = tuple[UUID | None, UUID | None, UUID | None]
+
+
+def _content_hash(kwargs: dict[str, Any]) -> str:
+    """配置内容指纹：相同参数（含 API Key）的配置共享同一个客户端。"""
+    payload = json.dumps(kwargs, sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ModelCache:
+    """
+    Process-wide cache for model resolution.
+
+    - resolutions: (assistant_id, workflow_id, workspace_id) -> config id (None = environment fallback),
+      bounded LRU whose entries expire after `ttl` seconds (None = never)
+    - config hashes: config id -> content hash of its LiteLLM kwargs
+    - clients: content hash -> ChatLiteLLM, bounded LRU so HTTP sessions are reused
+    """
+
+    def __init__(self, max_clients: int = 64, max_resolutions: int = 4096, ttl: float | None = 60.0):
+        self.max_clients = max_clients
+        self.max_resolutions = max_resolutions
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (config id, 过期时间)
+        self._resolutions: OrderedDict[ResolutionKey, tuple[UUID | None, float]] = OrderedDict()
+        self._config_hashes: dict[UUID | None, str] = {}
+        self._clients: OrderedDict[str, ChatLiteLLM] = OrderedDict()
+
+    def _resolution(self, key: ResolutionKey) -> tuple[bool, UUID | None]:
+        """调用方需持有锁；过期的条目视为未命中并移除。"""
+        entry = self._resolutions.get(key)
+        if entry is None:
+            return False, None
+        config_id, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._resolutions[key]
+            return False, None
+        self._resolutions.move_to_end(key)
+        return True, config_id
+
+    def get(self, key: ResolutionKey) -> ChatLiteLLM | None:
+        """命中时直接返回客户端；任何一级缺失或过期都视为未命中。"""
+        with self._lock:
+            known, config_id = self._resolution(key)
+            if not known:
+                return None
+            content_hash = self._config_hashes.get(config_id)
+            if content_hash is None or content_hash not in self._clients:
+                return None
+            self._clients.move_to_end(content_hash)
+            return self._clients[content_hash]
+
+    def get_or_create_client(self, config_id: UUID | None, kwargs: dict[str, Any]) -> ChatLiteLLM:
+        content_hash = _content_hash(kwargs)
+        with self._lock:
+            self._config_hashes[config_id] = content_hash
+            client = self._clients.get(content_hash)
+            if client is not None:
+                self._clients.move_to_end(content_hash)
+                return client
+        # 构建客户端可能较慢，放在锁外；并发构建时以先写入者为准
+        client = ChatLiteLLM(**kwargs)
+        with self._lock:
+            existing = self._clients.get(content_hash)
+            if existing is not None:
+                return existing
+            self._clients[content_hash] = client
+            while len(self._clients) > self.max_clients:
+                self._clients.popitem(last=False)
+            return client
+
+    def lookup(self, key: ResolutionKey) -> tuple[bool, UUID | None]:
+        """返回 (是否已缓存, 解析得到的 config id)。"""
+        with self._lock:
+            return self._resolution(key)
+
+    def remember(self, key: ResolutionKey, config_id: UUID | None) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl is not None else float("inf")
+        with self._lock:
+            self._resolutions[key] = (config_id, expires_at)
+            self._resolutions.move_to_end(key)
+            while len(self._resolutions) > self.max_resolutions:
+                self._resolutions.popitem(last=False)
+
+    def invalidate(self, config_id: UUID | None = None) -> None:
+        """
+        清空所有解析结果。指定 config_id 时，同时丢弃只被该配置使用的客户端。
+        """
+        with self._lock:
+            self._resolutions.clear()
+            if config_id is None:
+                return
+            content_hash = self._config_hashes.pop(config_id, None)
+            if content_hash is not None and content_hash not in self._config_hashes.values():
+                self._clients.pop(content_hash, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._resolutions.clear()
+            self._config_hashes.clear()
+            self._clients.clear()
+
+    def __len__(self) -> int:
+        return len(self._clients)
+
+
+@lru_cache
+def get_model_cache() -> ModelCache:
+    return ModelCache(max_resolutions=settings.MODEL_CACHE_MAX_RESOLUTIONS, ttl=settings.MODEL_CACHE_TTL_SECONDS)
+
+
+def invalidate_model_cache(config_id: UUID | None = None) -> None:
+    """
+    Drop cached resolutions after a write that can change the cascade
+    (LLM config CRUD, assistant/workflow model_config_id, workspace default).
+    """
+    get_model_cache().invalidate(config_id)
+
 
 class ModelResolver:
     """
     Resolves and builds ChatModel instances based on cascading configuration.
     """
 
-    def __init__(self, session: Session):
+    def __init__(self, session: Session, cache: ModelCache | None = None):
         self.session = session
         self.secret_manager = get_secret_manager()
+        self.cache = cache if cache is not None else get_model_cache()
 
     def resolve_for_assistant(
         self,
@@ -51,13 +186,78 @@ class ModelResolver:
         Returns:
             ChatLiteLLM instance configured with resolved parameters
         """
+        key: ResolutionKey = (assistant_id, workflow_id, workspace_id)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
         config = self._resolve_config(assistant_id, workflow_id, workspace_id)
 
         if config:
-            return self._build_model_from_config(config)
+            llm = self._build_model_from_config(config)
         else:
             # Fallback to environment-based configuration
-            return ChatLiteLLM()
+            llm = self.cache.get_or_create_client(None, {})
+
+        self.cache.remember(key, config.id if config else None)
+        return llm
+
+    def resolve_for_assistants(
+        self,
+        assistant_ids: Iterable[UUID],
+        workflow_id: UUID | None = None,
+        workspace_id: UUID | None = None,
+    ) -> dict[UUID, ChatLiteLLM]:
+        """
+        Batch variant of `resolve_for_assistant` used when building a whole swarm.
+
+        Cache misses are resolved with one query for the assistants' model_config_id
+        and one for the referenced configs; assistants without an active override
+        share the workflow/workspace-level client.
+
+        Args:
+            assistant_ids: Assistant IDs of the swarm members
+            workflow_id: Optional workflow ID for fallback
+            workspace_id: Optional workspace ID for fallback
+
+        Returns:
+            Mapping of assistant ID to ChatLiteLLM instance (every requested ID is present)
+        """
+        fallback = self.resolve_for_assistant(None, workflow_id, workspace_id)
+        fallback_known, fallback_config_id = self.cache.lookup((None, workflow_id, workspace_id))
+
+        result: dict[UUID, ChatLiteLLM] = {}
+        missing: list[UUID] = []
+        for assistant_id in dict.fromkeys(assistant_ids):
+            cached = self.cache.get((assistant_id, workflow_id, workspace_id))
+            if cached is not None:
+                result[assistant_id] = cached
+            else:
+                missing.append(assistant_id)
+        if not missing:
+            return result
+
+        overrides = dict(self.session.exec(select(Assistant.id, Assistant.model_config_id).where(col(Assistant.id).in_(missing))).all())
+        config_ids = {cid for cid in overrides.values() if cid}
+        configs: dict[UUID, LLMModelConfig] = {}
+        if config_ids:
+            statement = select(LLMModelConfig).where(col(LLMModelConfig.id).in_(config_ids), col(LLMModelConfig.is_active).is_(True))
+            configs = {c.id: c for c in self.session.exec(statement).all()}
+
+        for assistant_id in missing:
+            if assistant_id not in overrides:
+                # 不在数据库中的助手（如兜底工作流）直接使用上层配置，不写入缓存
+                result[assistant_id] = fallback
+                continue
+            config = configs.get(overrides[assistant_id]) if overrides[assistant_id] else None
+            if config:
+                result[assistant_id] = self._build_model_from_config(config)
+                self.cache.remember((assistant_id, workflow_id, workspace_id), config.id)
+            else:
+                result[assistant_id] = fallback
+                if fallback_known:
+                    self.cache.remember((assistant_id, workflow_id, workspace_id), fallback_config_id)
+        return result
 
     def _resolve_config(
         self,
@@ -97,7 +297,7 @@ class ModelResolver:
 
     def _build_model_from_config(self, config: LLMModelConfig) -> ChatLiteLLM:
         """
-        Build a ChatLiteLLM instance from a model configuration.
+        Build (or reuse from the pool) a ChatLiteLLM instance from a model configuration.
 
         Args:
             config: LLMModelConfig database model
@@ -112,8 +312,10 @@ class ModelResolver:
 
         # Use the model's built-in method to get LiteLLM kwargs
         kwargs = config.to_litellm_kwargs(api_key)
+        # 透传给 litellm 回调，用于按模型配置统计延迟 / token / 费用
+        kwargs["model_kwargs"] = {**kwargs.get("model_kwargs", {}), "metadata": {"model_config_id": str(config.id)}}
 
-        return ChatLiteLLM(**kwargs)
+        return self.cache.get_or_create_client(config.id, kwargs)
 
     def resolve_for_workflow(
         self,
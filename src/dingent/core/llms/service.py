@@ -1,3 +1,4 @@
+from collections.abc import Iterable
 from functools import lru_cache
 from uuid import UUID
 
@@ -42,3 +43,20 @@ def get_llm_for_context(
     """
     resolver = ModelResolver(session)
     return resolver.resolve_for_assistant(assistant_id, workflow_id, workspace_id)
+
+
+def get_llms_for_assistants(
+    session: Session,
+    assistant_ids: Iterable[UUID],
+    workflow_id: UUID | None = None,
+    workspace_id: UUID | None = None,
+) -> dict[UUID, ChatLiteLLM]:
+    """
+    Resolve one ChatLiteLLM per assistant in a single batch.
+
+    Assistants without their own model configuration fall back to the
+    workflow/workspace/environment cascade. Clients are shared through the
+    resolver's client pool.
+    """
+    resolver = ModelResolver(session)
+    return resolver.resolve_for_assistants(assistant_ids, workflow_id, workspace_id)
@@ -0,0 +1,478 @@
+"""
+Persistent token / cost accounting.
+
+The litellm success callback turns every completion into a `UsageEvent` and
+hands it to `UsageLedger.record`, which only enqueues it. A background task
+drains the queue in batches and, in a single transaction per batch, appends
+the raw `UsageRecord` rows and bumps the matching `UsageDailyRollup` rows.
+Dashboards and budget checks read the rollups (plus the not-yet-flushed
+amounts kept in memory), never the raw ledger.
+
+Who is spending is carried to the callback through the litellm call metadata;
+`usage_scope` binds the workspace / principal / assistant ids for a run and
+`usage_metadata` produces the metadata entries for a given agent.
+"""
+
+import asyncio
+import threading
+import time
+from collections import defaultdict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field, replace
+from datetime import UTC, date, datetime, timedelta
+from typing import Any
+from uuid import UUID
+
+from loguru import logger
+from sqlalchemy import Engine, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, col, select
+
+from dingent.core.db.models import UsageDailyRollup, UsageRecord
+
+RollupKey = tuple[date, str, str, str, str, str]
+
+
+@dataclass
+class UsageScope:
+    """本次 run 的计费主体；assistant_ids 为 agent 名称 -> Assistant.id。"""
+
+    workspace_id: UUID | None = None
+    user_id: UUID | None = None
+    visitor_id: str | None = None
+    assistant_ids: dict[str, UUID] = field(default_factory=dict)
+
+    @property
+    def principal(self) -> str:
+        return principal_key(self.user_id, self.visitor_id)
+
+
+_usage_scope: ContextVar[UsageScope | None] = ContextVar("usage_scope", default=None)
+
+
+@contextmanager
+def usage_scope(scope: UsageScope | None) -> Iterator[None]:
+    token = _usage_scope.set(scope)
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+def bind_usage_scope(scope: UsageScope | None) -> None:
+    _usage_scope.set(scope)
+
+
+def usage_metadata(agent_name: str | None = None) -> dict[str, str]:
+    """当前 scope 对应的 litellm metadata 条目（仅包含已知字段）。"""
+    scope = _usage_scope.get()
+    if scope is None:
+        return {}
+    assistant_id = scope.assistant_ids.get(agent_name) if agent_name else None
+    values = {
+        "workspace_id": scope.workspace_id,
+        "user_id": scope.user_id,
+        "visitor_id": scope.visitor_id,
+        "assistant_id": assistant_id,
+    }
+    return {k: str(v) for k, v in values.items() if v is not None}
+
+
+def principal_key(user_id: UUID | str | None, visitor_id: str | None) -> str:
+    if user_id:
+        return f"user:{user_id}"
+    if visitor_id:
+        return f"visitor:{visitor_id}"
+    return ""
+
+
+@dataclass
+class UsageEvent:
+    timestamp: datetime
+    model: str
+    workspace_id: UUID | None = None
+    user_id: UUID | None = None
+    visitor_id: str | None = None
+    assistant_id: UUID | None = None
+    model_config_id: UUID | None = None
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+    correlation_id: str | None = None
+
+    @classmethod
+    def from_litellm(cls, kwargs: dict[str, Any], response_obj: Any, end_time: datetime | None = None) -> "UsageEvent":
+        metadata = (kwargs.get("litellm_params") or {}).get("metadata") or {}
+        usage = getattr(response_obj, "usage", None)
+        return cls(
+            timestamp=(end_time or datetime.now()).astimezone(UTC).replace(tzinfo=None),
+            model=str(kwargs.get("model") or "unknown"),
+            workspace_id=_uuid(metadata.get("workspace_id")),
+            user_id=_uuid(metadata.get("user_id")),
+            visitor_id=metadata.get("visitor_id"),
+            assistant_id=_uuid(metadata.get("assistant_id")),
+            model_config_id=_uuid(metadata.get("model_config_id")),
+            prompt_tokens=int(getattr(usage, "prompt_tokens", 0) or 0),
+            completion_tokens=int(getattr(usage, "completion_tokens", 0) or 0),
+            cost=float(kwargs.get("response_cost") or 0.0),
+            correlation_id=metadata.get("correlation_id"),
+        )
+
+    @property
+    def rollup_key(self) -> RollupKey:
+        return (
+            self.timestamp.date(),
+            _str(self.workspace_id),
+            principal_key(self.user_id, self.visitor_id),
+            _str(self.assistant_id),
+            _str(self.model_config_id),
+            self.model,
+        )
+
+    def to_record(self) -> UsageRecord:
+        return UsageRecord(
+            created_at=self.timestamp,
+            workspace_id=self.workspace_id,
+            user_id=self.user_id,
+            visitor_id=self.visitor_id,
+            assistant_id=self.assistant_id,
+            model_config_id=self.model_config_id,
+            model=self.model,
+            prompt_tokens=self.prompt_tokens,
+            completion_tokens=self.completion_tokens,
+            cost=self.cost,
+            correlation_id=self.correlation_id,
+        )
+
+
+@dataclass
+class _Totals:
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cost: float = 0.0
+
+    def add(self, event: UsageEvent) -> None:
+        self.requests += 1
+        self.prompt_tokens += event.prompt_tokens
+        self.completion_tokens += event.completion_tokens
+        self.cost += event.cost
+
+    def subtract(self, other: "_Totals") -> None:
+        self.requests -= other.requests
+        self.prompt_tokens -= other.prompt_tokens
+        self.completion_tokens -= other.completion_tokens
+        self.cost -= other.cost
+
+    def as_dict(self) -> dict[str, Any]:
+        return {
+            "requests": self.requests,
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "total_tokens": self.prompt_tokens + self.completion_tokens,
+            "cost": self.cost,
+        }
+
+
+class UsageLedger:
+    """
+    Batched writer for `UsageRecord` / `UsageDailyRollup`.
+
+    Args:
+        engine: SQLAlchemy engine of the application database
+        batch_size: Maximum number of events written per transaction
+        flush_interval: Seconds to wait for more events before writing a partial batch
+        max_queue: Events beyond this many pending ones are dropped (and counted)
+        spend_cache_seconds: How long the flushed part of `spend()` is reused; batches
+            written by this process invalidate it immediately
+    """
+
+    def __init__(self, engine: Engine, batch_size: int = 200, flush_interval: float = 2.0, max_queue: int = 10_000, spend_cache_seconds: float = 5.0):
+        self.engine = engine
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_queue = max_queue
+        self.spend_cache_seconds = spend_cache_seconds
+        self.dropped = 0
+        # (day, workspace, principal | None) -> (过期时间, 已落库的汇总)
+        self._spend_cache: dict[tuple[date, str, str | None], tuple[float, _Totals]] = {}
+
+        self._queue: asyncio.Queue[UsageEvent] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._task: asyncio.Task | None = None
+        # 已入队但尚未落库的用量，预算检查需要把它们算进去
+        self._lock = threading.Lock()
+        self._pending: defaultdict[RollupKey, _Totals] = defaultdict(_Totals)
+
+    # ------------------------------------------------------------------
+    # Lifecycle
+    # ------------------------------------------------------------------
+    def start(self) -> None:
+        if self._task is not None:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._task = self._loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        """停止后台任务，并把队列中剩余的事件写完。"""
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+        remaining = self._drain()
+        if remaining:
+            await asyncio.to_thread(self.write_batch, remaining)
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def record(self, event: UsageEvent) -> None:
+        """线程安全、非阻塞：litellm 可能在工作线程中调用同步回调。"""
+        if self._loop is None or self._loop.is_closed():
+            # 未启动（如 CLI / 测试场景）时直接同步写入
+            self.write_batch([event])
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._enqueue(event)
+        else:
+            self._loop.call_soon_threadsafe(self._enqueue, event)
+
+    def _enqueue(self, event: UsageEvent) -> None:
+        assert self._queue is not None
+        try:
+            self._queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            logger.warning("Usage ledger queue is full, dropping usage event for model {}", event.model)
+            return
+        with self._lock:
+            self._pending[event.rollup_key].add(event)
+
+    def _drain(self) -> list[UsageEvent]:
+        events: list[UsageEvent] = []
+        while self._queue is not None and not self._queue.empty():
+            events.append(self._queue.get_nowait())
+        return events
+
+    async def _run(self) -> None:
+        assert self._queue is not None
+        loop = asyncio.get_running_loop()
+        while True:
+            batch: list[UsageEvent] = []
+            try:
+                batch.append(await self._queue.get())
+                deadline = loop.time() + self.flush_interval
+                while len(batch) < self.batch_size and (timeout := deadline - loop.time()) > 0:
+                    try:
+                        batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                    except TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # 停止时已取出但尚未写入的事件
+                self.write_batch(batch)
+                raise
+            try:
+                await asyncio.to_thread(self.write_batch, batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Failed to write {} usage events: {}", len(batch), e)
+
+    def write_batch(self, events: list[UsageEvent]) -> None:
+        """在一个事务中追加明细并累加对应的日汇总行。"""
+        if not events:
+            return
+        rollups: defaultdict[RollupKey, _Totals] = defaultdict(_Totals)
+        for event in events:
+            rollups[event.rollup_key].add(event)
+
+        for attempt in range(2):
+            try:
+                with Session(self.engine) as session:
+                    session.add_all([event.to_record() for event in events])
+                    for key, totals in rollups.items():
+                        self._upsert_rollup(session, key, totals)
+                    session.commit()
+                break
+            except IntegrityError:
+                # 多进程同时插入同一汇总行：回滚后重试一次，此时走 UPDATE 分支
+                if attempt:
+                    raise
+
+        with self._lock:
+            touched = {(key[0], key[1]) for key in rollups}
+            for cache_key in [k for k in self._spend_cache if k[:2] in touched]:
+                del self._spend_cache[cache_key]
+            for key, totals in rollups.items():
+                pending = self._pending.get(key)
+                if pending is not None:
+                    pending.subtract(totals)
+                    if pending.requests <= 0:
+                        del self._pending[key]
+
+    @staticmethod
+    def _upsert_rollup(session: Session, key: RollupKey, totals: _Totals) -> None:
+        day, workspace_id, principal, assistant_id, model_config_id, model = key
+        statement = (
+            update(UsageDailyRollup)
+            .where(
+                col(UsageDailyRollup.day) == day,
+                col(UsageDailyRollup.workspace_id) == workspace_id,
+                col(UsageDailyRollup.principal) == principal,
+                col(UsageDailyRollup.assistant_id) == assistant_id,
+                col(UsageDailyRollup.model_config_id) == model_config_id,
+                col(UsageDailyRollup.model) == model,
+            )
+            .values(
+                requests=UsageDailyRollup.requests + totals.requests,
+                prompt_tokens=UsageDailyRollup.prompt_tokens + totals.prompt_tokens,
+                completion_tokens=UsageDailyRollup.completion_tokens + totals.completion_tokens,
+                cost=UsageDailyRollup.cost + totals.cost,
+            )
+        )
+        if session.exec(statement).rowcount == 0:  # type: ignore[call-overload]
+            session.add(
+                UsageDailyRollup(
+                    day=day,
+                    workspace_id=workspace_id,
+                    principal=principal,
+                    assistant_id=assistant_id,
+                    model_config_id=model_config_id,
+                    model=model,
+                    requests=totals.requests,
+                    prompt_tokens=totals.prompt_tokens,
+                    completion_tokens=totals.completion_tokens,
+                    cost=totals.cost,
+                )
+            )
+
+    # ------------------------------------------------------------------
+    # Reads (rollups only)
+    # ------------------------------------------------------------------
+    def spend(self, workspace_id: UUID | None, principal: str | None = None, day: date | None = None) -> dict[str, Any]:
+        """某天（默认今天，UTC）某工作空间 / 主体的累计用量，包含尚未落库的部分。"""
+        day = day or datetime.now(UTC).date()
+        workspace_key = _str(workspace_id)
+        # 复制一份，避免累加待写入部分时修改缓存
+        totals = replace(self._flushed_spend(day, workspace_key, principal))
+
+        with self._lock:
+            for key, pending in self._pending.items():
+                if key[0] == day and key[1] == workspace_key and (principal is None or key[2] == principal):
+                    totals.requests += pending.requests
+                    totals.prompt_tokens += pending.prompt_tokens
+                    totals.completion_tokens += pending.completion_tokens
+                    totals.cost += pending.cost
+        return totals.as_dict()
+
+    def _flushed_spend(self, day: date, workspace_key: str, principal: str | None) -> _Totals:
+        cache_key = (day, workspace_key, principal)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._spend_cache.get(cache_key)
+        if cached is not None and cached[0] > now:
+            return cached[1]
+
+        statement = select(
+            func.coalesce(func.sum(UsageDailyRollup.requests), 0),
+            func.coalesce(func.sum(UsageDailyRollup.prompt_tokens), 0),
+            func.coalesce(func.sum(UsageDailyRollup.completion_tokens), 0),
+            func.coalesce(func.sum(UsageDailyRollup.cost), 0.0),
+        ).where(col(UsageDailyRollup.day) == day, col(UsageDailyRollup.workspace_id) == workspace_key)
+        if principal is not None:
+            statement = statement.where(col(UsageDailyRollup.principal) == principal)
+        with Session(self.engine) as session:
+            totals = _Totals(*session.exec(statement).one())
+        if self.spend_cache_seconds > 0:
+            with self._lock:
+                self._spend_cache[cache_key] = (now + self.spend_cache_seconds, totals)
+        return totals
+
+    def daily(self, workspace_id: UUID | None, days: int = 30) -> list[dict[str, Any]]:
+        """最近 N 天的按天汇总（升序）。"""
+        since = datetime.now(UTC).date() - timedelta(days=days - 1)
+        statement = (
+            select(
+                UsageDailyRollup.day,
+                func.sum(UsageDailyRollup.requests),
+                func.sum(UsageDailyRollup.prompt_tokens),
+                func.sum(UsageDailyRollup.completion_tokens),
+                func.sum(UsageDailyRollup.cost),
+            )
+            .where(col(UsageDailyRollup.workspace_id) == _str(workspace_id), col(UsageDailyRollup.day) >= since)
+            .group_by(UsageDailyRollup.day)
+            .order_by(UsageDailyRollup.day)
+        )
+        with Session(self.engine) as session:
+            rows = session.exec(statement).all()
+        return [{"day": day.isoformat(), **_Totals(*values).as_dict()} for day, *values in rows]
+
+    def breakdown(self, workspace_id: UUID | None, by: str, days: int = 30) -> list[dict[str, Any]]:
+        """按 model / model_config_id / assistant_id / principal 维度汇总最近 N 天的用量（按费用降序）。"""
+        if by not in {"model", "model_config_id", "assistant_id", "principal"}:
+            raise ValueError(f"Unknown breakdown dimension '{by}'")
+        dimension = getattr(UsageDailyRollup, by)
+        since = datetime.now(UTC).date() - timedelta(days=days - 1)
+        statement = (
+            select(
+                dimension,
+                func.sum(UsageDailyRollup.requests),
+                func.sum(UsageDailyRollup.prompt_tokens),
+                func.sum(UsageDailyRollup.completion_tokens),
+                func.sum(UsageDailyRollup.cost),
+            )
+            .where(col(UsageDailyRollup.workspace_id) == _str(workspace_id), col(UsageDailyRollup.day) >= since)
+            .group_by(dimension)
+            .order_by(func.sum(UsageDailyRollup.cost).desc())
+        )
+        with Session(self.engine) as session:
+            rows = session.exec(statement).all()
+        return [{by: key or None, **_Totals(*values).as_dict()} for key, *values in rows]
+
+    def over_budget(
+        self,
+        workspace_id: UUID | None,
+        principal: str,
+        workspace_budget: float | None = None,
+        principal_budget: float | None = None,
+        workspace_tokens: int | None = None,
+        principal_tokens: int | None = None,
+    ) -> str | None:
+        """超出当日预算（费用或 token）时返回原因，否则返回 None。"""
+        if workspace_budget is not None or workspace_tokens is not None:
+            spent = self.spend(workspace_id)
+            if workspace_budget is not None and spent["cost"] >= workspace_budget:
+                return "workspace daily budget exhausted"
+            if workspace_tokens is not None and spent["total_tokens"] >= workspace_tokens:
+                return "workspace daily token budget exhausted"
+        if principal and (principal_budget is not None or principal_tokens is not None):
+            spent = self.spend(workspace_id, principal)
+            if principal_budget is not None and spent["cost"] >= principal_budget:
+                return "daily budget exhausted"
+            if principal_tokens is not None and spent["total_tokens"] >= principal_tokens:
+                return "daily token budget exhausted"
+        return None
+
+
+def _uuid(value: Any) -> UUID | None:
+    if not value:
+        return None
+    try:
+        return value if isinstance(value, UUID) else UUID(str(value))
+    except ValueError:
+        return None
+
+
+def _str(value: UUID | None) -> str:
+    return str(value) if value else ""
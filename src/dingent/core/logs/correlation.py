@@ -0,0 +1,49 @@
+"""
+Correlation id for a single chat run.
+
+The id lives in a ContextVar, so it follows the request through awaits and
+into the tasks LangGraph spawns for nodes and tools. The loguru patcher
+installed by `LogManager` stamps it onto every log record.
+"""
+
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from uuid import uuid4
+
+_correlation_id: ContextVar[str | None] = ContextVar("dingent_correlation_id", default=None)
+
+
+def get_correlation_id() -> str | None:
+    return _correlation_id.get()
+
+
+def new_correlation_id() -> str:
+    """与客户端 run_id 规范化后的格式一致（带连字符的 UUID 字符串）。"""
+    return str(uuid4())
+
+
+def bind_correlation_id(correlation_id: str | None = None) -> Token:
+    """为当前上下文设置 correlation id（未指定时自动生成），返回可用于 reset 的 token。"""
+    return _correlation_id.set(correlation_id or new_correlation_id())
+
+
+def reset_correlation_id(token: Token) -> None:
+    _correlation_id.reset(token)
+
+
+@contextmanager
+def correlation_scope(correlation_id: str | None = None) -> Iterator[str]:
+    token = bind_correlation_id(correlation_id)
+    try:
+        yield _correlation_id.get() or ""
+    finally:
+        _correlation_id.reset(token)
+
+
+def patch_record(record) -> None:
+    """loguru patcher：未显式传入 correlation_id 的日志自动带上当前 run 的 id。"""
+    if "correlation_id" not in record["extra"]:
+        correlation_id = _correlation_id.get()
+        if correlation_id is not None:
+            record["extra"]["correlation_id"] = correlation_id
@@ -2,14 +2,27 @@
 Enhanced logging manager with structured logging support for dashboard display.
 """
 
+import asyncio
+import json
 import threading
-from collections import deque
+import time
 from dataclasses import asdict, dataclass
 from datetime import datetime
+from pathlib import Path
 from typing import Any
 
 from loguru import logger
 
+from dingent.core.config import settings
+from dingent.core.paths import paths
+
+from .correlation import patch_record
+from .log_stats import Granularity, LogStats
+from .log_store import LogStore
+
+# 共享日志库时，统计最多每隔这么多秒从库中重新聚合一次
+_SHARED_STATS_REFRESH_SECONDS = 5.0
+
 
 @dataclass
 class LogEntry:
@@ -22,6 +35,22 @@ class LogEntry:
     function: str
     context: dict[str, Any] | None = None
     correlation_id: str | None = None
+    id: int | None = None
+
+    @classmethod
+    def from_row(cls, row: tuple) -> "LogEntry":
+        """Build an entry from a `LogStore` row."""
+        id_, ts, level, module, function, message, context, correlation_id = row
+        return cls(
+            timestamp=datetime.fromtimestamp(ts).astimezone(),
+            level=level,
+            message=message,
+            module=module,
+            function=function,
+            context=json.loads(context) if context else None,
+            correlation_id=correlation_id,
+            id=id_,
+        )
 
     def to_dict(self) -> dict[str, Any]:
         """Convert log entry to dictionary."""
@@ -30,27 +59,86 @@ class LogEntry:
         return data
 
 
+class LogSubscription:
+    """
+    A live-tail subscriber with server-side filtering.
+
+    Entries are handed over from the loguru sink thread with
+    `call_soon_threadsafe` and put into a bounded queue; when the consumer is
+    too slow the entry is dropped and counted instead of blocking the sink.
+    """
+
+    def __init__(self, loop: asyncio.AbstractEventLoop, level: str | None = None, module: str | None = None, search: str | None = None, max_queue: int = 1000):
+        self.level = level.upper() if level else None
+        self.module = module.lower() if module else None
+        self.search = search.lower() if search else None
+        self.queue: asyncio.Queue[LogEntry] = asyncio.Queue(maxsize=max_queue)
+        self.dropped = 0
+        self.closed = False
+        self._loop = loop
+
+    def matches(self, entry: LogEntry) -> bool:
+        if self.level and entry.level != self.level:
+            return False
+        if self.module and self.module not in entry.module.lower():
+            return False
+        if self.search and self.search not in entry.message.lower():
+            return False
+        return True
+
+    def offer(self, entry: LogEntry) -> None:
+        """Called from the sink thread; never blocks."""
+        if self.closed or not self.matches(entry):
+            return
+        try:
+            self._loop.call_soon_threadsafe(self._put, entry)
+        except RuntimeError:
+            # 事件循环已关闭
+            self.closed = True
+
+    def _put(self, entry: LogEntry) -> None:
+        try:
+            self.queue.put_nowait(entry)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+
 class LogManager:
     """
     Enhanced logging manager that captures structured logs for dashboard display.
 
     Features:
-    - In-memory log storage with configurable retention
+    - Persistent, indexed log storage (SQLite + FTS5) with configurable retention
     - Structured logging with context and correlation IDs
     - Thread-safe operations
     - Dashboard integration ready
     """
 
-    def __init__(self, max_logs: int = 1000):
+    def __init__(self, max_logs: int | None = None, db_path: str | Path | None = None, retention_days: float | None = None, shared_store: bool | None = None):
         """
         Initialize the log manager.
 
         Args:
-            max_logs: Maximum number of logs to keep in memory
+            max_logs: Maximum number of logs to retain (defaults to settings.LOG_RETENTION_MAX_ENTRIES)
+            db_path: SQLite file for the log store (defaults to paths.log_db_path, ":memory:" for tests)
+            retention_days: Drop logs older than this many days (defaults to settings.LOG_RETENTION_DAYS)
+            shared_store: Other processes write to the same store, so stats are re-aggregated from it
+                (defaults to settings.LOG_SHARED_STORE)
         """
-        self.max_logs = max_logs
-        self._logs: deque[LogEntry] = deque(maxlen=max_logs)
+        self.max_logs = max_logs if max_logs is not None else settings.LOG_RETENTION_MAX_ENTRIES
+        self.shared_store = shared_store if shared_store is not None else settings.LOG_SHARED_STORE
+        self._stats_seeded_at = time.monotonic()
+        self._stats = LogStats()
+        self._store = LogStore(
+            db_path if db_path is not None else paths.log_db_path,
+            max_entries=self.max_logs,
+            retention_days=retention_days if retention_days is not None else settings.LOG_RETENTION_DAYS,
+            on_prune=self._stats.remove,
+        )
+        self._stats.seed(self._store)
         self._lock = threading.RLock()
+        self._subscribers: set[LogSubscription] = set()
+        self._sink_id: int | None = None
         self._setup_loguru_handler()
 
     def _setup_loguru_handler(self):
@@ -73,78 +161,114 @@ class LogManager:
                 # Avoid infinite recursion by using basic print
                 print(f"Error in log sink: {e}")
 
+        # Stamp the current run's correlation id onto every record (all sinks)
+        logger.configure(patcher=patch_record)
+
         # Add custom sink to loguru
-        logger.add(log_sink, level="DEBUG", format="{message}")
+        self._sink_id = logger.add(log_sink, level="DEBUG", format="{message}")
 
     def _add_log_entry(self, entry: LogEntry):
         """Thread-safe addition of log entry."""
         with self._lock:
-            self._logs.append(entry)
+            # 只是入队，由存储的写入线程落库；实时订阅者收到的条目因此还没有 id
+            self._store.append(entry.timestamp, entry.level, entry.module, entry.function, entry.message, entry.context, entry.correlation_id)
+            self._stats.add(entry.level, entry.module, entry.timestamp.timestamp())
+            subscribers = tuple(self._subscribers)
+        for subscriber in subscribers:
+            subscriber.offer(entry)
+
+    def subscribe(self, level: str | None = None, module: str | None = None, search: str | None = None, max_queue: int = 1000) -> LogSubscription:
+        """
+        Register a live-tail subscriber. Must be called from the event loop that consumes it.
+        """
+        subscription = LogSubscription(asyncio.get_running_loop(), level=level, module=module, search=search, max_queue=max_queue)
+        with self._lock:
+            self._subscribers.add(subscription)
+        return subscription
 
-    def get_logs(self, level: str | None = None, module: str | None = None, limit: int | None = None, search: str | None = None) -> list[LogEntry]:
+    def unsubscribe(self, subscription: LogSubscription) -> None:
+        subscription.closed = True
+        with self._lock:
+            self._subscribers.discard(subscription)
+
+    def get_logs(
+        self,
+        level: str | None = None,
+        module: str | None = None,
+        limit: int | None = None,
+        search: str | None = None,
+        correlation_id: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        before_id: int | None = None,
+        offset: int = 0,
+    ) -> list[LogEntry]:
         """
-        Retrieve logs with optional filtering.
+        Retrieve logs with optional filtering, newest first.
 
         Args:
             level: Filter by log level (DEBUG, INFO, WARNING, ERROR, CRITICAL)
-            module: Filter by module name
+            module: Filter by module name (case-insensitive substring)
             limit: Maximum number of logs to return
-            search: Search term in message content
+            search: Search term in message content (case-insensitive substring)
+            correlation_id: Only logs carrying this correlation id
+            since: Only logs at or after this time
+            until: Only logs at or before this time
+            before_id: Keyset pagination cursor, only logs with a smaller id
+            offset: Number of matching logs to skip
 
         Returns:
             List of matching log entries
         """
-        with self._lock:
-            logs = list(self._logs)
-
-        # Apply filters
-        if level:
-            logs = [log for log in logs if log.level == level.upper()]
-
-        if module:
-            logs = [log for log in logs if module.lower() in log.module.lower()]
-
-        if search:
-            search_lower = search.lower()
-            logs = [log for log in logs if search_lower in log.message.lower()]
-
-        # Sort by timestamp (newest first)
-        logs.sort(key=lambda x: x.timestamp, reverse=True)
-
-        # Apply limit
-        if limit:
-            logs = logs[:limit]
-
-        return logs
+        rows = self._store.query(
+            level=level,
+            module=module,
+            search=search,
+            correlation_id=correlation_id,
+            since=since,
+            until=until,
+            before_id=before_id,
+            limit=limit or None,
+            offset=offset,
+        )
+        return [LogEntry.from_row(row) for row in rows]
 
     def get_log_stats(self) -> dict[str, Any]:
-        """Get logging statistics for dashboard display."""
+        """Get logging statistics for dashboard display (served from incremental counters)."""
+        self._refresh_shared_stats()
+        return self._stats.snapshot()
+
+    def _refresh_shared_stats(self) -> None:
+        # 增量计数只看得到本进程写入的日志；共享日志库时定期用聚合查询校正
+        if not self.shared_store or time.monotonic() - self._stats_seeded_at < _SHARED_STATS_REFRESH_SECONDS:
+            return
         with self._lock:
-            logs = list(self._logs)
-
-        if not logs:
-            return {"total_logs": 0, "by_level": {}, "by_module": {}, "oldest_timestamp": None, "newest_timestamp": None}
-
-        # Count by level
-        by_level = {}
-        by_module = {}
+            self._stats.seed(self._store)
+            self._stats_seeded_at = time.monotonic()
 
-        for log in logs:
-            by_level[log.level] = by_level.get(log.level, 0) + 1
-            by_module[log.module] = by_module.get(log.module, 0) + 1
+    def get_log_rate(self, granularity: Granularity = "minute", limit: int | None = None) -> list[dict[str, Any]]:
+        """
+        Log counts per time bucket, oldest first, for a rate-over-time chart.
 
-        return {
-            "total_logs": len(logs),
-            "by_level": by_level,
-            "by_module": by_module,
-            "oldest_timestamp": min(log.timestamp for log in logs).isoformat(),
-            "newest_timestamp": max(log.timestamp for log in logs).isoformat(),
-        }
+        Args:
+            granularity: "minute" (last 24h kept) or "hour" (last 7 days kept)
+            limit: Only return the most recent N buckets
+        """
+        self._refresh_shared_stats()
+        return self._stats.histogram(granularity, limit)
 
     def clear_logs(self):
         """Clear all stored logs."""
         with self._lock:
-            self._logs.clear()
+            self._store.clear()
+            self._stats.clear()
+
+    def close(self):
+        """Detach the loguru sink and close the log store."""
+        if self._sink_id is not None:
+            logger.remove(self._sink_id)
+            self._sink_id = None
+        self._store.close()
 
     def log_with_context(self, level: str, message: str, context: dict[str, Any] | None = None, correlation_id: str | None = None):
         """
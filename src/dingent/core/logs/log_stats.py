@@ -0,0 +1,138 @@
+"""
+Incrementally maintained log statistics.
+
+Counters are updated on every append and decremented when the store prunes
+old rows, so reading the stats never touches the log table.
+"""
+
+import threading
+from collections import Counter
+from collections.abc import Iterable
+from datetime import datetime
+from typing import Any, Literal
+
+Granularity = Literal["minute", "hour"]
+
+_BUCKET_SECONDS: dict[str, int] = {"minute": 60, "hour": 3600}
+
+
+class LogStats:
+    """
+    Per-level / per-module counters plus time-bucketed histograms.
+
+    Args:
+        minute_buckets: Number of per-minute buckets kept (default: one day)
+        hour_buckets: Number of per-hour buckets kept (default: one week)
+    """
+
+    def __init__(self, minute_buckets: int = 24 * 60, hour_buckets: int = 7 * 24):
+        self._lock = threading.Lock()
+        self._limits = {"minute": minute_buckets, "hour": hour_buckets}
+        self._reset()
+
+    def _reset(self) -> None:
+        self.total = 0
+        self.by_level: Counter[str] = Counter()
+        self.by_module: Counter[str] = Counter()
+        self.oldest_ts: float | None = None
+        self.newest_ts: float | None = None
+        # bucket 起始时间（epoch 秒）-> 按级别计数
+        self._histograms: dict[str, dict[int, Counter[str]]] = {"minute": {}, "hour": {}}
+
+    def seed(self, store) -> None:
+        """Initialise the counters from an existing `LogStore` with aggregate queries."""
+        with self._lock:
+            self._reset()
+            for level, module, count in store.summary():
+                self.total += count
+                self.by_level[level] += count
+                self.by_module[module] += count
+            self.oldest_ts, self.newest_ts = store.time_bounds()
+            if self.newest_ts is None:
+                return
+            for granularity, size in _BUCKET_SECONDS.items():
+                since = self.newest_ts - size * self._limits[granularity]
+                buckets = self._histograms[granularity]
+                for start, level, count in store.bucket_counts(size, since):
+                    buckets.setdefault(start, Counter())[level] += count
+                self._trim(granularity)
+
+    def add(self, level: str, module: str, ts: float) -> None:
+        with self._lock:
+            self.total += 1
+            self.by_level[level] += 1
+            self.by_module[module] += 1
+            if self.oldest_ts is None or ts < self.oldest_ts:
+                self.oldest_ts = ts
+            if self.newest_ts is None or ts > self.newest_ts:
+                self.newest_ts = ts
+            for granularity, size in _BUCKET_SECONDS.items():
+                buckets = self._histograms[granularity]
+                start = int(ts // size) * size
+                bucket = buckets.get(start)
+                if bucket is None:
+                    bucket = buckets[start] = Counter()
+                    self._trim(granularity)
+                bucket[level] += 1
+
+    def _trim(self, granularity: str) -> None:
+        buckets = self._histograms[granularity]
+        overflow = len(buckets) - self._limits[granularity]
+        if overflow > 0:
+            for start in sorted(buckets)[:overflow]:
+                del buckets[start]
+
+    def remove(self, rows: Iterable[tuple[str, str, float]], oldest_ts: float | None) -> None:
+        """
+        Account for pruned rows.
+
+        Args:
+            rows: (level, module, ts) of every deleted row
+            oldest_ts: Timestamp of the oldest remaining row, as reported by the store
+        """
+        with self._lock:
+            for level, module, ts in rows:
+                self.total -= 1
+                _decrement(self.by_level, level)
+                _decrement(self.by_module, module)
+                for granularity, size in _BUCKET_SECONDS.items():
+                    bucket = self._histograms[granularity].get(int(ts // size) * size)
+                    if bucket is not None:
+                        _decrement(bucket, level)
+            self.oldest_ts = oldest_ts
+            if self.total <= 0:
+                self._reset()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._reset()
+
+    def snapshot(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "total_logs": self.total,
+                "by_level": dict(self.by_level),
+                "by_module": dict(self.by_module),
+                "oldest_timestamp": _iso(self.oldest_ts),
+                "newest_timestamp": _iso(self.newest_ts),
+            }
+
+    def histogram(self, granularity: Granularity = "minute", limit: int | None = None) -> list[dict[str, Any]]:
+        """按时间升序返回最近的 bucket：[{"start": iso, "total": n, "by_level": {...}}]。"""
+        if granularity not in _BUCKET_SECONDS:
+            raise ValueError(f"Unknown granularity '{granularity}'")
+        with self._lock:
+            items = sorted(self._histograms[granularity].items())
+        if limit:
+            items = items[-limit:]
+        return [{"start": _iso(start), "total": sum(bucket.values()), "by_level": dict(bucket)} for start, bucket in items if bucket]
+
+
+def _decrement(counter: Counter[str], key: str) -> None:
+    counter[key] -= 1
+    if counter[key] <= 0:
+        del counter[key]
+
+
+def _iso(ts: float | None) -> str | None:
+    return datetime.fromtimestamp(ts).astimezone().isoformat() if ts is not None else None
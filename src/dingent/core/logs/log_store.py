@@ -0,0 +1,295 @@
+"""
+SQLite-backed, append-only store for structured log entries.
+
+Entries are kept in a plain table indexed by level, module, time and
+correlation id. Message search goes through an FTS5 index (trigram tokenizer,
+so substring semantics are preserved) when the SQLite build supports it, and
+falls back to LIKE otherwise.
+"""
+
+import json
+import queue
+import sqlite3
+import threading
+import time
+from collections.abc import Callable
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS logs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    ts REAL NOT NULL,
+    level TEXT NOT NULL,
+    module TEXT NOT NULL,
+    function TEXT NOT NULL,
+    message TEXT NOT NULL,
+    context TEXT,
+    correlation_id TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_logs_ts ON logs (ts);
+CREATE INDEX IF NOT EXISTS ix_logs_level_id ON logs (level, id);
+CREATE INDEX IF NOT EXISTS ix_logs_module_id ON logs (module, id);
+CREATE INDEX IF NOT EXISTS ix_logs_correlation_id ON logs (correlation_id) WHERE correlation_id IS NOT NULL;
+"""
+
+_FTS_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS logs_fts USING fts5(message, content='logs', content_rowid='id', tokenize='trigram');
+CREATE TRIGGER IF NOT EXISTS logs_ai AFTER INSERT ON logs BEGIN
+    INSERT INTO logs_fts(rowid, message) VALUES (new.id, new.message);
+END;
+CREATE TRIGGER IF NOT EXISTS logs_ad AFTER DELETE ON logs BEGIN
+    INSERT INTO logs_fts(logs_fts, rowid, message) VALUES ('delete', old.id, old.message);
+END;
+"""
+
+_COLUMNS = "id, ts, level, module, function, message, context, correlation_id"
+
+
+class LogStore:
+    """
+    Thread-safe log store on a single SQLite connection.
+
+    `append` never touches the database: entries are put on a bounded queue
+    and a background writer thread inserts whatever has queued up (at most
+    `commit_every` rows) in one short `BEGIN IMMEDIATE ... COMMIT`
+    transaction, so the write lock is only held while a batch is written and
+    a caller that logs never waits for another connection (e.g. another
+    process on the same file). The writer waits up to `busy_timeout` seconds
+    for such a connection; when the queue holds `max_pending` entries new
+    ones are dropped and counted in `dropped`. Queries go through the same
+    connection after the queue has been written, so they always see the
+    latest entries; the aggregates that seed `LogStats` do not wait for it.
+    Retention is enforced every `prune_every` inserts, by entry count and by
+    age; `on_prune` receives the (level, module, ts) of the deleted rows and
+    the oldest remaining timestamp.
+    """
+
+    def __init__(
+        self,
+        path: str | Path = ":memory:",
+        max_entries: int = 100_000,
+        retention_days: float | None = None,
+        commit_every: int = 200,
+        prune_every: int = 1000,
+        busy_timeout: float = 5.0,
+        max_pending: int = 10_000,
+        on_prune: Callable[[list[tuple[str, str, float]], float | None], None] | None = None,
+    ):
+        self.path = str(path)
+        self.max_entries = max_entries
+        self.retention_days = retention_days
+        self.commit_every = commit_every
+        self.prune_every = prune_every
+        self.on_prune = on_prune
+        self.dropped = 0
+
+        self._lock = threading.RLock()
+        # timeout 即 busy_timeout：其它连接持有写锁时等待而不是立即报 "database is locked"
+        self._conn = sqlite3.connect(self.path, timeout=busy_timeout, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL;")
+        # WAL 下 NORMAL 只在断电时可能丢失最后一批，进程崩溃不会丢已提交的数据
+        self._conn.execute("PRAGMA synchronous=NORMAL;")
+        self._conn.executescript(_SCHEMA)
+        self.has_fts = self._try_enable_fts()
+
+        self._inserts_since_prune = 0
+
+        self._queue: queue.Queue[tuple | None] = queue.Queue(maxsize=max_pending)
+        self._writer = threading.Thread(target=self._write_loop, name="log-store-writer", daemon=True)
+        self._writer.start()
+
+    def _try_enable_fts(self) -> bool:
+        try:
+            self._conn.executescript(_FTS_SCHEMA)
+            return True
+        except sqlite3.OperationalError:
+            # SQLite 未编译 FTS5 或不支持 trigram 分词器，退化为 LIKE 搜索
+            return False
+
+    # ------------------------------------------------------------------
+    # Writes
+    # ------------------------------------------------------------------
+    def append(self, timestamp: datetime, level: str, module: str, function: str, message: str, context: dict[str, Any] | None, correlation_id: str | None) -> None:
+        """将一条日志放入写入队列；从不等待数据库锁，队列已满时丢弃并计数。"""
+        context_json = json.dumps(context, default=str, ensure_ascii=False) if context else None
+        try:
+            self._queue.put_nowait((timestamp.timestamp(), level, module, function, message, context_json, correlation_id))
+        except queue.Full:
+            self.dropped += 1
+
+    def _write_loop(self) -> None:
+        """后台写入：取出队列中已有的日志（至多 commit_every 条），在一个短事务中写入。"""
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.commit_every:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            rows = [row for row in batch if row is not None]
+            try:
+                if rows:
+                    self._write(rows)
+            except sqlite3.Error as e:
+                self.dropped += len(rows)
+                # 不能经由 loguru 报告：日志 sink 正是本存储
+                print(f"Error writing log batch: {e}")
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+            if len(rows) != len(batch):
+                return
+
+    def _write(self, rows: list[tuple]) -> None:
+        with self._lock:
+            # IMMEDIATE：开始时即获取写锁（必要时按 busy_timeout 等待），避免批次中途升级写锁失败
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.executemany(
+                    "INSERT INTO logs (ts, level, module, function, message, context, correlation_id) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    rows,
+                )
+                self._inserts_since_prune += len(rows)
+                if self._inserts_since_prune >= self.prune_every:
+                    self._prune()
+                self._conn.execute("COMMIT")
+            except BaseException:
+                if self._conn.in_transaction:
+                    self._conn.execute("ROLLBACK")
+                raise
+
+    def flush(self) -> None:
+        """等待队列中的日志全部写入。"""
+        self._queue.join()
+
+    def _prune(self) -> list[tuple[str, str, float]]:
+        """按条数与保留天数清理旧日志，返回被删除行的 (level, module, ts)。"""
+        self._inserts_since_prune = 0
+        conditions, params = [], []
+        if self.max_entries > 0:
+            conditions.append("id <= (SELECT MAX(id) FROM logs) - ?")
+            params.append(self.max_entries)
+        if self.retention_days:
+            conditions.append("ts < ?")
+            params.append(time.time() - self.retention_days * 86400)
+        if not conditions:
+            return []
+        rows = self._conn.execute(f"DELETE FROM logs WHERE {' OR '.join(conditions)} RETURNING level, module, ts", params).fetchall()
+        if rows and self.on_prune:
+            self.on_prune(rows, self._conn.execute("SELECT MIN(ts) FROM logs").fetchone()[0])
+        return rows
+
+    def prune(self) -> list[tuple[str, str, float]]:
+        with self._lock:
+            return self._prune()
+
+    def clear(self) -> None:
+        self.flush()
+        with self._lock:
+            self._conn.execute("DELETE FROM logs")
+
+    def close(self) -> None:
+        """写完队列中的日志后关闭连接。"""
+        self._queue.put(None)
+        self._writer.join()
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # Reads
+    # ------------------------------------------------------------------
+    def query(
+        self,
+        level: str | None = None,
+        module: str | None = None,
+        search: str | None = None,
+        correlation_id: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        before_id: int | None = None,
+        limit: int | None = None,
+        offset: int = 0,
+    ) -> list[tuple]:
+        """
+        按条件查询，结果按 id 倒序（即最新在前）。
+
+        翻页优先使用 before_id（键集分页），offset 仅用于兼容简单场景。
+        """
+        where, params = self._filters(level, module, search, correlation_id, since, until, before_id)
+        sql = f"SELECT {_COLUMNS} FROM logs{where} ORDER BY id DESC"
+        if limit is not None or offset:
+            sql += " LIMIT ? OFFSET ?"
+            params += [limit if limit is not None else -1, offset]
+        self.flush()
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def count(self, **filters: Any) -> int:
+        where, params = self._filters(**filters)
+        self.flush()
+        with self._lock:
+            return self._conn.execute(f"SELECT COUNT(*) FROM logs{where}", params).fetchone()[0]
+
+    def summary(self) -> list[tuple[str, str, int]]:
+        """(level, module, count)，用于启动时初始化统计。"""
+        with self._lock:
+            return self._conn.execute("SELECT level, module, COUNT(*) FROM logs GROUP BY level, module").fetchall()
+
+    def bucket_counts(self, bucket_seconds: int, since: float) -> list[tuple[int, str, int]]:
+        """(bucket 起始时间, level, count)，按时间升序。"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT CAST(ts / ? AS INTEGER) * ?, level, COUNT(*) FROM logs WHERE ts >= ? GROUP BY 1, 2 ORDER BY 1",
+                (bucket_seconds, bucket_seconds, since),
+            ).fetchall()
+
+    def time_bounds(self) -> tuple[float | None, float | None]:
+        with self._lock:
+            return self._conn.execute("SELECT MIN(ts), MAX(ts) FROM logs").fetchone()
+
+    def _filters(
+        self,
+        level: str | None = None,
+        module: str | None = None,
+        search: str | None = None,
+        correlation_id: str | None = None,
+        since: datetime | None = None,
+        until: datetime | None = None,
+        before_id: int | None = None,
+    ) -> tuple[str, list[Any]]:
+        conditions: list[str] = []
+        params: list[Any] = []
+        if level:
+            conditions.append("level = ?")
+            params.append(level.upper())
+        if module:
+            conditions.append("module LIKE ? ESCAPE '\\'")
+            params.append(f"%{_escape_like(module)}%")
+        if correlation_id:
+            conditions.append("correlation_id = ?")
+            params.append(correlation_id)
+        if since:
+            conditions.append("ts >= ?")
+            params.append(since.timestamp())
+        if until:
+            conditions.append("ts <= ?")
+            params.append(until.timestamp())
+        if before_id:
+            conditions.append("id < ?")
+            params.append(before_id)
+        if search:
+            if self.has_fts and len(search) >= 3:
+                # trigram 分词下，带引号的短语即为大小写不敏感的子串匹配
+                conditions.append("id IN (SELECT rowid FROM logs_fts WHERE logs_fts MATCH ?)")
+                params.append('"' + search.replace('"', '""') + '"')
+            else:
+                conditions.append("message LIKE ? ESCAPE '\\'")
+                params.append(f"%{_escape_like(search)}%")
+        where = f" WHERE {' AND '.join(conditions)}" if conditions else ""
+        return where, params
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
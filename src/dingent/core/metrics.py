@@ -0,0 +1,128 @@
+"""
+Prometheus metrics exposed on `/metrics`.
+
+Everything is registered on a dedicated `REGISTRY` so the exposition only
+contains Dingent's own series (plus process stats). Values that already live
+elsewhere (DB pool counters, plugin runtime status) are read at scrape time by
+custom collectors instead of being mirrored on every change.
+
+With several workers (`PROMETHEUS_MULTIPROC_DIR` set before the workers start,
+see `dingent.server.workers`) counters and histograms are written to shared
+files and aggregated at scrape time; the scrape-time collectors then report
+the answering worker only, and process stats are omitted.
+"""
+
+import collections
+import os
+from collections.abc import Iterable
+from typing import Any
+
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram, ProcessCollector, generate_latest, multiprocess
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily, Metric
+
+from dingent.core.db.pool import pool_metrics
+
+REGISTRY = CollectorRegistry()
+ProcessCollector(registry=REGISTRY)
+
+_LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+_STREAM_BUCKETS = (0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0, 1800.0)
+_SIZE_BUCKETS = tuple(float(256 * 4**i) for i in range(9))  # 256B .. 16MiB
+
+# --- 对话 ---
+CHAT_RUNS_STARTED = Counter("dingent_chat_runs_started_total", "Chat runs started", ["workflow"], registry=REGISTRY)
+CHAT_RUNS_FINISHED = Counter("dingent_chat_runs_finished_total", "Chat runs finished, by outcome (ok / error / cancelled)", ["workflow", "outcome"], registry=REGISTRY)
+CHAT_RUNS_REJECTED = Counter("dingent_chat_runs_rejected_total", "Chat runs refused before starting, by reason (rate_limit / budget)", ["reason"], registry=REGISTRY)
+SSE_STREAM_SECONDS = Histogram("dingent_sse_stream_duration_seconds", "Lifetime of server-sent event streams", ["endpoint"], buckets=_STREAM_BUCKETS, registry=REGISTRY)
+
+# --- LLM（来自 litellm 回调） ---
+LLM_CALL_SECONDS = Histogram("dingent_llm_call_duration_seconds", "LLM call latency", ["model_config", "model", "outcome"], buckets=_LATENCY_BUCKETS, registry=REGISTRY)
+LLM_TOKENS = Counter("dingent_llm_tokens_total", "LLM tokens, by kind (prompt / completion)", ["model_config", "model", "kind"], registry=REGISTRY)
+LLM_COST = Counter("dingent_llm_cost_usd_total", "LLM cost reported by litellm", ["model_config", "model"], registry=REGISTRY)
+
+# --- MCP 工具 ---
+TOOL_CALL_SECONDS = Histogram("dingent_tool_call_duration_seconds", "MCP tool call latency", ["plugin", "tool"], buckets=_LATENCY_BUCKETS, registry=REGISTRY)
+TOOL_CALL_ERRORS = Counter("dingent_tool_call_errors_total", "MCP tool calls that raised", ["plugin", "tool"], registry=REGISTRY)
+
+# --- 图构建与 checkpoint ---
+GRAPH_BUILD_SECONDS = Histogram("dingent_graph_build_duration_seconds", "Time to build a workflow graph", ["workflow"], buckets=_LATENCY_BUCKETS, registry=REGISTRY)
+CHECKPOINT_WRITE_BYTES = Histogram("dingent_checkpoint_write_bytes", "Serialized size of checkpoint blobs and pending writes", buckets=_SIZE_BUCKETS, registry=REGISTRY)
+
+
+class _DatabasePoolCollector:
+    """连接池当前占用（来自 engine.pool）与累计借出统计（来自 pool_metrics）。"""
+
+    def collect(self) -> Iterable[Metric]:
+        from dingent.core.db.session import engine
+
+        pool = engine.pool
+        for name, attr, doc in (
+            ("dingent_db_pool_size", "size", "Configured pool size"),
+            ("dingent_db_pool_checked_out", "checkedout", "Connections currently checked out"),
+            ("dingent_db_pool_overflow", "overflow", "Overflow connections currently open"),
+        ):
+            if hasattr(pool, attr):
+                yield GaugeMetricFamily(name, doc, value=getattr(pool, attr)())
+
+        snapshot = pool_metrics.snapshot()
+        yield CounterMetricFamily("dingent_db_pool_checkouts", "Connection checkouts", value=snapshot["checkouts"])
+        yield CounterMetricFamily("dingent_db_pool_waits", "Checkouts that had to wait for a free connection", value=snapshot["waits"])
+        yield CounterMetricFamily("dingent_db_pool_checkout_seconds", "Total time spent checking out connections", value=snapshot["checkout_seconds_total"])
+
+
+class _PluginRuntimeCollector:
+    """按状态统计已启动的插件运行时；插件管理器在 lifespan 中绑定。"""
+
+    def __init__(self):
+        self.plugin_manager: Any = None
+
+    def collect(self) -> Iterable[Metric]:
+        family = GaugeMetricFamily("dingent_plugin_runtimes", "Plugin runtimes, by status", labels=["status"])
+        runtimes = getattr(self.plugin_manager, "_active_runtimes", None) or {}
+        counts = collections.Counter(runtime.status for runtime in list(runtimes.values()))
+        for status in ("active", "inactive", "error"):
+            family.add_metric([status], counts.get(status, 0))
+        yield family
+
+
+_plugin_collector = _PluginRuntimeCollector()
+REGISTRY.register(_DatabasePoolCollector())
+REGISTRY.register(_plugin_collector)
+
+
+def bind_plugin_manager(plugin_manager: Any) -> None:
+    _plugin_collector.plugin_manager = plugin_manager
+
+
+def instrument_checkpointer(checkpointer: Any) -> None:
+    """记录 checkpointer 每次序列化写入的字节数。"""
+    serde = checkpointer.serde
+    dumps_typed = serde.dumps_typed
+
+    def observed_dumps_typed(obj: Any) -> tuple[str, bytes]:
+        type_, data = dumps_typed(obj)
+        CHECKPOINT_WRITE_BYTES.observe(len(data))
+        return type_, data
+
+    serde.dumps_typed = observed_dumps_typed
+
+
+_multiprocess_registry: CollectorRegistry | None = None
+
+
+def _scrape_registry() -> CollectorRegistry:
+    global _multiprocess_registry
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    if _multiprocess_registry is None:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_DatabasePoolCollector())
+        registry.register(_plugin_collector)
+        _multiprocess_registry = registry
+    return _multiprocess_registry
+
+
+def render_metrics() -> tuple[bytes, str]:
+    """返回 (exposition 文本, Content-Type)。"""
+    return generate_latest(_scrape_registry()), CONTENT_TYPE_LATEST
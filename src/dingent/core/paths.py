@@ -52,6 +52,22 @@ class AppPaths:
     def sqlite_path(self) -> Path:
         return self.db_dir / "dingent.sqlite"
 
+    @property
+    def log_db_path(self) -> Path:
+        return self.log_root / "logs.sqlite"
+
+    @property
+    def rate_limit_db_path(self) -> Path:
+        return self.runtime_dir / "ratelimit.sqlite"
+
+    @property
+    def market_index_path(self) -> Path:
+        return self.cache_root / "market" / "index.json"
+
+    @property
+    def plugin_manifest_cache_path(self) -> Path:
+        return self.cache_root / "plugin_manifests.json"
+
     @property
     def env_file(self) -> Path:
         return self.config_root / ".env"
@@ -0,0 +1,148 @@
+"""
+Staged, checksum-verified installation of market items.
+
+A download is a list of `RemoteFile`s (path relative to the item root plus the
+git blob sha of its content). Files are fetched concurrently, verified against
+their blob sha, written into a staging directory next to the destination and
+only then swapped into place with `os.replace`, so a failed or interrupted
+download never leaves a half-written plugin behind. Verified blobs are kept in
+a content-addressed cache until the install succeeds, which makes a retried
+download resume instead of starting over.
+"""
+
+import asyncio
+import hashlib
+import os
+import shutil
+import tempfile
+import uuid
+from collections.abc import Awaitable, Callable, Iterable
+from dataclasses import dataclass
+from pathlib import Path
+
+# 暂存目录：与插件目录同一文件系统，保证 os.replace 是原子的；
+# 暂存内容位于其子目录中，插件扫描不会把它当作插件
+STAGING_DIR_NAME = ".staging"
+
+
+class ChecksumError(Exception):
+    """下载内容与远端声明的 blob sha 不一致。"""
+
+
+@dataclass(frozen=True)
+class RemoteFile:
+    # 相对条目根目录的 POSIX 路径
+    path: str
+    # git blob sha1（sha1(b"blob <size>\0" + content)）
+    sha: str
+    size: int | None = None
+
+
+def git_blob_sha(data: bytes) -> str:
+    return hashlib.sha1(b"blob %d\0" % len(data) + data).hexdigest()
+
+
+class BlobCache:
+    """按 blob sha 存放已校验的文件内容，用于断点续传。"""
+
+    def __init__(self, root: Path):
+        self.root = root
+
+    def _path(self, sha: str) -> Path:
+        return self.root / sha[:2] / sha
+
+    def get(self, sha: str) -> bytes | None:
+        try:
+            data = self._path(sha).read_bytes()
+        except OSError:
+            return None
+        return data if git_blob_sha(data) == sha else None
+
+    def put(self, sha: str, data: bytes) -> None:
+        path = self._path(sha)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(f".{sha}.{uuid.uuid4().hex}")
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def discard(self, shas: Iterable[str]) -> None:
+        for sha in shas:
+            self._path(sha).unlink(missing_ok=True)
+
+
+def _swap_into_place(staging: Path, final_dir: Path) -> None:
+    """用暂存目录替换目标目录；替换失败时恢复旧目录。"""
+    backup = None
+    if final_dir.exists():
+        backup = staging.parent / f"{final_dir.name}.old-{uuid.uuid4().hex}"
+        os.replace(final_dir, backup)
+    try:
+        os.replace(staging, final_dir)
+    except BaseException:
+        if backup is not None:
+            os.replace(backup, final_dir)
+        raise
+    if backup is not None:
+        shutil.rmtree(backup, ignore_errors=True)
+
+
+def _write_file(root: Path, relative: str, data: bytes) -> None:
+    dest = (root / relative).resolve()
+    # 防止远端路径中的 ".." 写到暂存目录之外
+    if not dest.is_relative_to(root.resolve()):
+        raise ValueError(f"Refusing to write outside of the staging directory: {relative}")
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    dest.write_bytes(data)
+
+
+async def install_files(
+    files: list[RemoteFile],
+    fetch: Callable[[RemoteFile], Awaitable[bytes]],
+    final_dir: Path,
+    cache: BlobCache,
+    concurrency: int = 8,
+) -> Path:
+    """
+    并发下载并校验 `files`，写入暂存目录后原子替换到 `final_dir`。
+
+    Args:
+        files: 需要下载的文件清单
+        fetch: 读取单个文件内容的协程
+        final_dir: 安装目标目录（已存在时整体替换）
+        cache: 已校验 blob 的缓存，重试时跳过已下载的文件
+        concurrency: 同时进行的下载数
+
+    Raises:
+        ChecksumError: 任一文件内容与其 blob sha 不符
+    """
+    staging_root = final_dir.parent / STAGING_DIR_NAME
+    staging_root.mkdir(parents=True, exist_ok=True)
+    staging = Path(tempfile.mkdtemp(dir=staging_root, prefix=f"{final_dir.name}-"))
+    semaphore = asyncio.Semaphore(max(concurrency, 1))
+
+    async def install_one(file: RemoteFile) -> None:
+        async with semaphore:
+            data = await asyncio.to_thread(cache.get, file.sha)
+            if data is None:
+                data = await fetch(file)
+                if git_blob_sha(data) != file.sha:
+                    raise ChecksumError(f"Checksum mismatch for '{file.path}'")
+                await asyncio.to_thread(cache.put, file.sha, data)
+            await asyncio.to_thread(_write_file, staging, file.path, data)
+
+    try:
+        # TaskGroup：任一文件失败即取消其余下载
+        async with asyncio.TaskGroup() as group:
+            for file in files:
+                group.create_task(install_one(file))
+        await asyncio.to_thread(_swap_into_place, staging, final_dir)
+    except BaseExceptionGroup as eg:
+        shutil.rmtree(staging, ignore_errors=True)
+        # 向调用方抛出第一个具体错误，而不是异常组
+        raise eg.exceptions[0] from eg
+    except BaseException:
+        shutil.rmtree(staging, ignore_errors=True)
+        raise
+
+    cache.discard(file.sha for file in files)
+    return final_dir
@@ -0,0 +1,85 @@
+"""
+Local snapshot of the market catalogue.
+
+The market repository is crawled once into a single JSON file under
+`paths.cache_root` (metadata, one entry per item and the README files fetched
+so far). Listing and search are served from this snapshot; the backend only
+asks the remote whether anything changed (ETag / If-Modified-Since) once the
+snapshot is older than `MARKET_INDEX_TTL`, and rebuilds it when the revision
+moved.
+"""
+
+import json
+import os
+import tempfile
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+INDEX_FORMAT = 1
+
+# 参与搜索的字段
+_SEARCH_FIELDS = ("id", "name", "description", "author")
+
+
+@dataclass
+class MarketIndex:
+    # 远端版本标识：GitHub 上为 commit sha，本地目录为文件签名
+    revision: str | None = None
+    etag: str | None = None
+    last_modified: str | None = None
+    checked_at: float = 0.0
+    metadata: dict[str, Any] = field(default_factory=dict)
+    # 每一项至少包含 id 与 category，其余为 pyproject.toml / plugin.toml 中的元数据
+    items: list[dict[str, Any]] = field(default_factory=list)
+    # "<category>/<id>" -> README 内容；空字符串表示远端没有 README
+    readmes: dict[str, str] = field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: Path) -> "MarketIndex | None":
+        """读取快照；文件不存在、损坏或格式版本不匹配时返回 None。"""
+        try:
+            data = json.loads(path.read_text(encoding="utf-8"))
+        except (OSError, ValueError):
+            return None
+        if not isinstance(data, dict) or data.pop("format", None) != INDEX_FORMAT:
+            return None
+        try:
+            return cls(**data)
+        except TypeError:
+            return None
+
+    def save(self, path: Path) -> None:
+        """原子写入：先写临时文件再替换，读者不会看到半个文件。"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=".index-", suffix=".json")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump({"format": INDEX_FORMAT, **asdict(self)}, f, ensure_ascii=False)
+            os.replace(tmp, path)
+        except BaseException:
+            Path(tmp).unlink(missing_ok=True)
+            raise
+
+    def is_fresh(self, ttl: float, now: float | None = None) -> bool:
+        return (now if now is not None else time.time()) - self.checked_at < ttl
+
+    def entries(self, categories: list[str] | None = None, query: str | None = None) -> list[dict[str, Any]]:
+        """
+        按分类过滤并搜索快照中的条目。
+
+        查询按空白拆分为多个词，每个词都需要（不区分大小写地）出现在
+        id / name / description / author 或任一 tag 中。
+        """
+        terms = query.lower().split() if query else []
+        result = []
+        for entry in self.items:
+            if categories is not None and entry.get("category") not in categories:
+                continue
+            if terms:
+                haystack = " ".join([*(str(entry.get(k) or "") for k in _SEARCH_FIELDS), *map(str, entry.get("tags") or [])]).lower()
+                if not all(term in haystack for term in terms):
+                    continue
+            result.append(entry)
+        return result
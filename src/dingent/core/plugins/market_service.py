@@ -1,6 +1,8 @@
 from pathlib import Path
 from typing import Any
 
+from packaging.version import InvalidVersion, Version
+
 from dingent.core.logs.log_manager import LogManager
 from dingent.core.plugins.schemas import PluginRead
 from dingent.server.api.schemas import MarketBackend, MarketItem, MarketItemCategory, MarketMetadata
@@ -20,23 +22,45 @@ class MarketService:
         self,
         category: MarketItemCategory,
         installed_plugins: list[PluginRead] | None = None,
+        query: str | None = None,
     ) -> list[MarketItem]:
         """
-        Orchestrates fetching items. Converts local objects to a hashable tuple for the backend cache.
-        """
-        installed_map = {}
+        Fetches the (cached) remote catalogue and overlays the local installation state.
 
-        if installed_plugins:
-            for p in installed_plugins:
-                # Handle both Pydantic models and dicts
-                pid = getattr(p, "registry_id", None) or (p.get("registry_id") if isinstance(p, dict) else None)
-                ver = getattr(p, "version", "") or (p.get("version") if isinstance(p, dict) else "")
-                if pid:
-                    installed_map[str(pid)] = str(ver)
-
-        installed_tuple = tuple(sorted(installed_map.items()))
+        The backend cache never depends on what is installed locally, so installing or
+        removing a plugin does not force a refetch. `query` filters the catalogue by
+        id / name / description / author / tags.
+        """
+        items = await self._backend.list_items(category, query=query)
+        return self._overlay_installed(items, self._installed_versions(installed_plugins))
 
-        return await self._backend.list_items(category, installed_tuple)
+    @staticmethod
+    def _installed_versions(installed_plugins: list[PluginRead] | None) -> dict[str, str]:
+        installed_map = {}
+        for p in installed_plugins or []:
+            # Handle both Pydantic models and dicts
+            pid = getattr(p, "registry_id", None) or (p.get("registry_id") if isinstance(p, dict) else None)
+            ver = getattr(p, "version", "") or (p.get("version") if isinstance(p, dict) else "")
+            if pid:
+                installed_map[str(pid)] = str(ver)
+        return installed_map
+
+    @staticmethod
+    def _overlay_installed(items: list[MarketItem], installed_map: dict[str, str]) -> list[MarketItem]:
+        """Returns copies of `items` with is_installed / installed_version / update_available filled in."""
+        result = []
+        for item in items:
+            local_version = installed_map.get(item.id)
+            if not local_version:
+                result.append(item)
+                continue
+            update_available = False
+            try:
+                update_available = Version(item.version or "0.0.0") > Version(local_version)
+            except InvalidVersion:
+                pass
+            result.append(item.model_copy(update={"is_installed": True, "installed_version": local_version, "update_available": update_available}))
+        return result
 
     async def get_item_readme(self, item_id: str, category: MarketItemCategory) -> str | None:
         return await self._backend.get_readme(item_id, category)
@@ -59,15 +83,16 @@ class MarketService:
             target_dir.mkdir(parents=True, exist_ok=True)
 
             # 1. Download Files
-            await self._backend.download_item(item_id, category, target_dir)
+            # (staged + checksum-verified, swapped into place atomically)
+            installed_dir = await self._backend.download_item(item_id, category, target_dir)
 
             # 2. Post-Download Installation Logic
-            await self._post_install_hook(item_id, category, target_dir)
+            await self._post_install_hook(item_id, category, installed_dir)
 
             return {
                 "success": True,
                 "message": f"Successfully installed {item_id}",
-                "installed_path": str(target_dir),
+                "installed_path": str(installed_dir),
             }
 
         except Exception as e:
@@ -1,5 +1,6 @@
 import logging
 import shutil
+from pathlib import Path
 
 from fastmcp.server.middleware import Middleware, MiddlewareContext
 
@@ -80,5 +81,9 @@ class PluginManager:
             removed = False
         return removed
 
+    def add_plugin_from_dir(self, plugin_dir: Path) -> PluginManifest | None:
+        """注册单个新安装的插件目录，无需全量重新扫描。"""
+        return self.registry.add_manifest_from_dir(plugin_dir)
+
     async def reload_plugins(self):
         self.registry.reload_plugins()
@@ -1,9 +1,71 @@
 from __future__ import annotations
 
+import asyncio
+import hashlib
+import inspect
+import json
+import os
+import tempfile
+import threading
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any
 
 from .schemas import PluginManifest
 
+MANIFEST_CACHE_FORMAT = 1
+_MANIFEST_FILES = ("plugin.toml", "pyproject.toml")
+
+
+@dataclass
+class PluginDelta:
+    """一次扫描相对上一次的变化（插件 ID）。"""
+
+    added: set[str] = field(default_factory=set)
+    removed: set[str] = field(default_factory=set)
+    modified: set[str] = field(default_factory=set)
+
+    @property
+    def changed_ids(self) -> set[str]:
+        return self.added | self.removed | self.modified
+
+    def __bool__(self) -> bool:
+        return bool(self.added or self.removed or self.modified)
+
+
+@dataclass
+class _CacheEntry:
+    # plugin.toml / pyproject.toml 的 (mtime_ns, size)；不存在的文件为 None
+    signature: tuple
+    # 两个文件内容的摘要：mtime 变了但内容没变（touch / 复制）时无需重新解析
+    digest: str
+    # 合并后的 manifest 字段；解析失败时为 None
+    meta: dict[str, Any] | None
+    manifest: PluginManifest | None = None
+
+
+def _signature(plugin_dir: Path) -> tuple:
+    sig = []
+    for name in _MANIFEST_FILES:
+        try:
+            st = (plugin_dir / name).stat()
+            sig.append((st.st_mtime_ns, st.st_size))
+        except FileNotFoundError:
+            sig.append(None)
+    return tuple(sig)
+
+
+def _digest(plugin_dir: Path) -> str:
+    h = hashlib.sha256()
+    for name in _MANIFEST_FILES:
+        path = plugin_dir / name
+        h.update(name.encode() + b"\0")
+        if path.is_file():
+            h.update(path.read_bytes())
+        h.update(b"\0")
+    return h.hexdigest()
+
 
 class PluginRegistry:
     """
@@ -11,12 +73,22 @@ class PluginRegistry:
     - 启动时扫描插件目录并维护一份内存中的 PluginManifest 索引。
     - 只负责“发现、缓存、查询、刷新、增删 Manifest”，不涉及插件生命周期和文件删除。
     - 不关心用户/请求。
+
+    每个插件目录按 plugin.toml / pyproject.toml 的 mtime、大小及内容摘要缓存解析结果，
+    未变化的插件在重新扫描时不会再解析 TOML；传入 `cache_path` 时缓存会持久化，
+    重启后同样只需 stat。
+
+    目录监听在线程中执行 reload_plugins，市场安装在事件循环中调用 add_manifest_from_dir：
+    所有修改索引和缓存的操作都持有同一把锁，整体替换索引时不会丢掉刚加入的插件。
     """
 
-    def __init__(self, plugin_dir: Path, log_manager):
+    def __init__(self, plugin_dir: Path, log_manager, cache_path: Path | None = None):
         self.plugin_dir = plugin_dir
         self.log_manager = log_manager
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
         self._manifests: dict[str, PluginManifest] = {}
+        self._cache: dict[str, _CacheEntry] = self._load_cache()
         self.reload_plugins()  # 首次加载
 
     # ---------- 查询接口 ----------
@@ -29,10 +101,16 @@ class PluginRegistry:
         return self._manifests.get(plugin_id)
 
     # ---------- 刷新 / 增量更新 ----------
-    def reload_plugins(self) -> None:
+    def reload_plugins(self) -> PluginDelta:
         """
-        全量刷新：扫描目录→构建临时字典→原子替换。
+        增量刷新：扫描目录→只解析有变化的插件→构建临时字典→原子替换。
+        返回相对上一次扫描新增、删除和修改的插件 ID。
         """
+        with self._lock:
+            return self._reload_plugins()
+
+    def _reload_plugins(self) -> PluginDelta:
+        old_index = self._manifests
 
         if not self.plugin_dir.is_dir():
             self.log_manager.log_with_context(
@@ -41,11 +119,14 @@ class PluginRegistry:
                 context={"dir": str(self.plugin_dir)},
             )
             self._manifests = {}
-            return
+            self._cache = {}
+            return PluginDelta(removed=set(old_index))
 
         new_index: dict[str, PluginManifest] = {}
+        new_cache: dict[str, _CacheEntry] = {}
+        parsed = 0
 
-        for plugin_path in self.plugin_dir.iterdir():
+        for plugin_path in sorted(self.plugin_dir.iterdir()):
             if not plugin_path.is_dir():
                 self.log_manager.log_with_context(
                     "debug",
@@ -63,23 +144,78 @@ class PluginRegistry:
                 )
                 continue
 
-            try:
-                manifest = PluginManifest.from_toml(toml_path)
+            entry, was_parsed = self._load_entry(plugin_path)
+            parsed += was_parsed
+            new_cache[str(plugin_path)] = entry
+            if entry.manifest is not None:
                 # 简单防重：后发现的同 ID 会覆盖先前同 ID
-                new_index[manifest.id] = manifest
-            except Exception as e:
-                self.log_manager.log_with_context(
-                    "error",
-                    f"Failed to load plugin from '{str(toml_path)}': {e}",
-                )
+                new_index[entry.manifest.id] = entry.manifest
 
         # 原子替换
         self._manifests = new_index
+        cache_changed = parsed > 0 or new_cache.keys() != self._cache.keys()
+        self._cache = new_cache
+        if cache_changed:
+            self._save_cache()
+
+        delta = PluginDelta(
+            added=new_index.keys() - old_index.keys(),
+            removed=old_index.keys() - new_index.keys(),
+            # 未变化的插件沿用同一个 manifest 对象
+            modified={pid for pid in new_index.keys() & old_index.keys() if new_index[pid] is not old_index[pid]},
+        )
         self.log_manager.log_with_context(
             "info",
-            "Plugin registry reloaded. Total discovered: {count}",
-            context={"count": len(self._manifests)},
+            "Plugin registry reloaded. Total discovered: {count}, parsed: {parsed}",
+            context={"count": len(self._manifests), "parsed": parsed},
         )
+        return delta
+
+    def _load_entry(self, plugin_path: Path) -> tuple[_CacheEntry, bool]:
+        """返回该目录的缓存项，以及是否真的解析了 TOML。"""
+        cached = self._cache.get(str(plugin_path))
+        signature = _signature(plugin_path)
+        digest = None
+        if cached is not None and cached.signature != signature:
+            digest = _digest(plugin_path)
+            if cached.digest == digest:
+                cached.signature = signature
+            else:
+                cached = None
+        if cached is not None and self._materialize(cached, plugin_path):
+            return cached, False
+
+        toml_path = plugin_path / "plugin.toml"
+        digest = digest or _digest(plugin_path)
+        try:
+            meta = PluginManifest.read_meta(toml_path)
+            manifest = PluginManifest.from_meta(meta, plugin_path)
+        except Exception as e:
+            self.log_manager.log_with_context(
+                "error",
+                f"Failed to load plugin from '{str(toml_path)}': {e}",
+            )
+            # 失败结果同样缓存，文件修改之前不再重复解析
+            return _CacheEntry(signature, digest, None), True
+        return _CacheEntry(signature, digest, meta, manifest), True
+
+    def _materialize(self, entry: _CacheEntry, plugin_path: Path) -> bool:
+        """
+        从持久化缓存恢复的条目只有 meta，这里构建 manifest（仅校验，不读 TOML）。
+        缓存的 meta 不再能通过校验时（如升级后 PluginManifest 变化）返回 False，由调用方从磁盘重新解析。
+        """
+        if entry.manifest is not None or entry.meta is None:
+            return True
+        try:
+            entry.manifest = PluginManifest.from_meta(entry.meta, plugin_path)
+            return True
+        except Exception as e:
+            self.log_manager.log_with_context(
+                "warning",
+                "Cached manifest for '{path}' is no longer valid, re-reading plugin.toml: {error}",
+                context={"path": str(plugin_path), "error": str(e)},
+            )
+            return False
 
     def add_manifest_from_dir(self, plugin_dir: Path) -> PluginManifest | None:
         """
@@ -96,8 +232,12 @@ class PluginRegistry:
             return None
 
         try:
-            manifest = PluginManifest.from_toml(toml_path)
-            self._manifests[manifest.id] = manifest
+            meta = PluginManifest.read_meta(toml_path)
+            manifest = PluginManifest.from_meta(meta, plugin_dir)
+            with self._lock:
+                self._manifests[manifest.id] = manifest
+                self._cache[str(plugin_dir)] = _CacheEntry(_signature(plugin_dir), _digest(plugin_dir), meta, manifest)
+                self._save_cache()
             self.log_manager.log_with_context(
                 "info",
                 "Plugin '{id}' added to registry from '{dir}'.",
@@ -118,9 +258,12 @@ class PluginRegistry:
         - 不做文件系统删除，不做 shutdown 等生命周期操作。
         - 返回是否实际移除。
         """
-        existed = plugin_id in self._manifests
+        with self._lock:
+            manifest = self._manifests.pop(plugin_id, None)
+            if manifest is not None and manifest._plugin_path is not None:
+                self._cache.pop(str(manifest._plugin_path), None)
+        existed = manifest is not None
         if existed:
-            self._manifests.pop(plugin_id, None)
             self.log_manager.log_with_context(
                 "info",
                 "Plugin '{id}' removed from registry.",
@@ -133,3 +276,60 @@ class PluginRegistry:
                 context={"id": plugin_id},
             )
         return existed
+
+    # ---------- 文件监听 ----------
+    async def watch(self, on_change: Callable[[PluginDelta], Awaitable[None] | None], debounce_ms: int = 1000) -> None:
+        """
+        监听插件目录（inotify / FSEvents，经由 watchfiles），每批文件变化后增量刷新，
+        有实际变化时调用 `on_change(delta)`。未安装 watchfiles 时直接返回。
+        """
+        try:
+            from watchfiles import awatch
+        except ImportError:
+            self.log_manager.log_with_context("warning", "watchfiles is not installed; plugin directory watching is disabled.")
+            return
+
+        self.plugin_dir.mkdir(parents=True, exist_ok=True)
+        async for _changes in awatch(self.plugin_dir, debounce=debounce_ms, recursive=True):
+            delta = await asyncio.to_thread(self.reload_plugins)
+            if not delta:
+                continue
+            self.log_manager.log_with_context(
+                "info",
+                "Plugin directory changed: added={added}, removed={removed}, modified={modified}",
+                context={"added": sorted(delta.added), "removed": sorted(delta.removed), "modified": sorted(delta.modified)},
+            )
+            try:
+                result = on_change(delta)
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as e:
+                self.log_manager.log_with_context("error", "Plugin change handler failed: {error}", context={"error": str(e)})
+
+    # ---------- 持久化缓存 ----------
+    def _load_cache(self) -> dict[str, _CacheEntry]:
+        if self.cache_path is None:
+            return {}
+        try:
+            data = json.loads(self.cache_path.read_text(encoding="utf-8"))
+            if data.get("format") != MANIFEST_CACHE_FORMAT:
+                return {}
+            return {path: _CacheEntry(tuple(tuple(s) if s is not None else None for s in e["signature"]), e["digest"], e["meta"]) for path, e in data["entries"].items()}
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def _save_cache(self) -> None:
+        if self.cache_path is None:
+            return
+        data = {
+            "format": MANIFEST_CACHE_FORMAT,
+            "entries": {path: {"signature": e.signature, "digest": e.digest, "meta": e.meta} for path, e in self._cache.items()},
+        }
+        try:
+            self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp = tempfile.mkstemp(dir=self.cache_path.parent, prefix=".manifests-", suffix=".json")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                json.dump(data, f, default=str)
+            os.replace(tmp, self.cache_path)
+        except OSError as e:
+            self.log_manager.log_with_context("warning", "Could not write plugin manifest cache: {error}", context={"error": str(e)})
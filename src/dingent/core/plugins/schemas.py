@@ -42,6 +42,11 @@ class PluginManifest(PluginBase):
 
     @classmethod
     def from_toml(cls, toml_path: Path) -> "PluginManifest":
+        return cls.from_meta(cls.read_meta(toml_path), toml_path.parent)
+
+    @classmethod
+    def read_meta(cls, toml_path: Path) -> dict[str, Any]:
+        """读取 plugin.toml（以及同目录的 pyproject.toml）并合并为构造 manifest 所需的字段。"""
         if not toml_path.is_file():
             raise FileNotFoundError(f"'plugin.toml' not found at '{toml_path}'")
 
@@ -57,9 +62,11 @@ class PluginManifest(PluginBase):
 
         plugin_info = toml.load(toml_path)
         plugin_meta = plugin_info.get("plugin", {})
-        final_meta = base_meta | plugin_meta
+        return base_meta | plugin_meta
 
-        manifest = cls(**final_meta)
+    @classmethod
+    def from_meta(cls, meta: dict[str, Any], plugin_dir: Path) -> "PluginManifest":
+        manifest = cls(**meta)
         manifest._plugin_path = plugin_dir
         return manifest
 
@@ -0,0 +1,127 @@
+"""
+Token-bucket rate limiting.
+
+A bucket holds up to `burst` tokens and refills at `rate_per_minute / 60`
+tokens per second; a request takes one token or is refused with the number of
+seconds until one is available. Bucket state lives in-process by default. With
+`RATE_LIMIT_BACKEND = "sqlite"` it is kept in a small SQLite file instead, so
+several worker processes on the same host share the same limits.
+"""
+
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from pathlib import Path
+from typing import Protocol
+
+from dingent.core.config import settings
+from dingent.core.paths import paths
+
+
+def _refill(tokens: float, updated: float, now: float, rate_per_second: float, burst: float) -> float:
+    return min(burst, tokens + (now - updated) * rate_per_second)
+
+
+class BucketStore(Protocol):
+    def take(self, key: str, rate_per_second: float, burst: float, cost: float = 1.0) -> float:
+        """扣减令牌；成功返回 0，否则返回需要等待的秒数。"""
+        ...
+
+
+class InMemoryBucketStore:
+    """进程内的桶状态；最久未使用的桶在超过 max_keys 时被丢弃（等同于重新装满）。"""
+
+    def __init__(self, max_keys: int = 100_000):
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, rate_per_second: float, burst: float, cost: float = 1.0) -> float:
+        now = time.monotonic()
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate_per_second, burst)
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate_per_second
+            self._buckets[key] = (tokens, now)
+            while len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+            return retry_after
+
+
+class SqliteBucketStore:
+    """多进程共享的桶状态（同一台机器上的 worker 共用一个 SQLite 文件）。"""
+
+    def __init__(self, path: str | Path):
+        self.path = str(path)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL)")
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=5.0, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL;")
+            conn.execute("PRAGMA synchronous=OFF;")
+            self._local.conn = conn
+        return conn
+
+    def take(self, key: str, rate_per_second: float, burst: float, cost: float = 1.0) -> float:
+        # 使用墙钟时间：monotonic 在不同进程间不可比
+        now = time.time()
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+            tokens = _refill(row[0], row[1], now, rate_per_second, burst) if row else burst
+            retry_after = 0.0
+            if tokens >= cost:
+                tokens -= cost
+            else:
+                retry_after = (cost - tokens) / rate_per_second
+            conn.execute(
+                "INSERT INTO buckets (key, tokens, updated) VALUES (?, ?, ?) ON CONFLICT(key) DO UPDATE SET tokens = excluded.tokens, updated = excluded.updated",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return retry_after
+
+
+class RateLimiter:
+    """
+    Named token-bucket limits on top of a `BucketStore`.
+
+    Args:
+        store: Where bucket state is kept
+    """
+
+    def __init__(self, store: BucketStore):
+        self.store = store
+
+    def hit(self, key: str, per_minute: float, burst: int) -> float:
+        """
+        Take one token from the bucket `key`.
+
+        Returns:
+            0 when allowed, otherwise the seconds until the next token is available.
+            A non-positive `per_minute` disables the limit.
+        """
+        if per_minute <= 0:
+            return 0.0
+        return self.store.take(key, per_minute / 60.0, float(max(burst, 1)))
+
+
+@lru_cache
+def get_rate_limiter() -> RateLimiter:
+    if settings.RATE_LIMIT_BACKEND == "sqlite":
+        return RateLimiter(SqliteBucketStore(paths.rate_limit_db_path))
+    return RateLimiter(InMemoryBucketStore())
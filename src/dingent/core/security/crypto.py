@@ -1,4 +1,8 @@
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 from functools import lru_cache
 
 from cryptography.fernet import Fernet, InvalidToken
@@ -8,6 +12,76 @@ from dingent.core.config import settings  # 引入配置
 from dingent.core.paths import paths
 
 
+class DecryptionCache:
+    """
+    解密结果的有界内存缓存 (LRU + TTL)。
+
+    - Key 为密文的 SHA-256 摘要，不在内存中保留密文本身。
+    - 明文以 bytearray 保存，条目被淘汰、过期或清空时先覆写为 0 再丢弃。
+    - max_entries <= 0 时禁用缓存。
+    """
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 300.0):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self._entries: OrderedDict[bytes, tuple[float, bytearray]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def _digest(token: str) -> bytes:
+        return hashlib.sha256(token.encode()).digest()
+
+    @staticmethod
+    def _zeroise(buf: bytearray) -> None:
+        buf[:] = bytes(len(buf))
+
+    def get(self, token: str) -> str | None:
+        if self.max_entries <= 0:
+            return None
+        key = self._digest(token)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            expires_at, buf = entry
+            if expires_at <= time.monotonic():
+                self._evict(key)
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return buf.decode()
+
+    def put(self, token: str, plaintext: str) -> None:
+        if self.max_entries <= 0:
+            return
+        key = self._digest(token)
+        with self._lock:
+            if key in self._entries:
+                self._evict(key)
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, bytearray(plaintext.encode()))
+            while len(self._entries) > self.max_entries:
+                self._evict(next(iter(self._entries)))
+
+    def clear(self) -> None:
+        """清零并丢弃全部条目。"""
+        with self._lock:
+            for key in list(self._entries):
+                self._evict(key)
+            self.hits = 0
+            self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _evict(self, key: bytes) -> None:
+        _, buf = self._entries.pop(key)
+        self._zeroise(buf)
+
+
 class UserSecretManager:
     def __init__(self):
         # 初始化时直接获取密钥
@@ -17,6 +91,11 @@ class UserSecretManager:
         except ValueError:
             logger.critical("Invalid Master Key format! Please check your env or key file.")
             raise
+        # 同一密文在每次加载行时都会被解密（插件配置、API Key），缓存解密结果
+        self._cache = DecryptionCache(
+            max_entries=settings.DECRYPT_CACHE_MAX_ENTRIES,
+            ttl_seconds=settings.DECRYPT_CACHE_TTL_SECONDS,
+        )
 
     def _load_or_create_key(self) -> bytes:
         """
@@ -53,11 +132,20 @@ class UserSecretManager:
     def decrypt(self, token: str | None) -> str | None:
         if token is None:
             return None
+        cached = self._cache.get(token)
+        if cached is not None:
+            return cached
         try:
-            return self._fernet.decrypt(token.encode()).decode()
+            plaintext = self._fernet.decrypt(token.encode()).decode()
         except InvalidToken:
             logger.error("Decryption failed: Invalid Token. Did the master key change?")
             return None
+        self._cache.put(token, plaintext)
+        return plaintext
+
+    @property
+    def cache(self) -> DecryptionCache:
+        return self._cache
 
 
 @lru_cache
@@ -0,0 +1,202 @@
+"""
+Lightweight span recorder for per-run latency breakdowns.
+
+The default recorder is a no-op. With `TRACING_ENABLED` spans are kept by an
+in-process exporter (sliding-window percentiles per stage plus a per-run
+breakdown keyed by correlation id). With `TRACING_OTEL` every span is also
+mirrored to OpenTelemetry when `opentelemetry-api` is importable, so an
+external collector sees the same stages.
+"""
+
+from __future__ import annotations
+
+import functools
+import inspect
+import threading
+import time
+from collections import OrderedDict, defaultdict, deque
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager, nullcontext
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any
+
+from dingent.core.config import settings
+from dingent.core.logs.correlation import get_correlation_id
+
+
+@dataclass
+class SpanRecord:
+    name: str
+    start_time: float
+    duration_ms: float
+    correlation_id: str | None = None
+    status: str = "ok"
+    attributes: dict[str, Any] = field(default_factory=dict)
+
+
+class InProcessExporter:
+    """
+    Keeps recent spans in memory.
+
+    Args:
+        window_seconds: Sliding window used for the per-stage percentiles
+        max_spans_per_stage: Upper bound of samples kept per stage
+        max_runs: Number of recent runs whose breakdown is kept
+    """
+
+    def __init__(self, window_seconds: float = 900.0, max_spans_per_stage: int = 5000, max_runs: int = 500):
+        self.window_seconds = window_seconds
+        self.max_runs = max_runs
+        self._lock = threading.Lock()
+        self._stages: defaultdict[str, deque[tuple[float, float]]] = defaultdict(lambda: deque(maxlen=max_spans_per_stage))
+        self._runs: OrderedDict[str, list[SpanRecord]] = OrderedDict()
+
+    def export(self, span: SpanRecord) -> None:
+        with self._lock:
+            self._stages[span.name].append((span.start_time + span.duration_ms / 1000, span.duration_ms))
+            if span.correlation_id:
+                spans = self._runs.get(span.correlation_id)
+                if spans is None:
+                    spans = self._runs[span.correlation_id] = []
+                    while len(self._runs) > self.max_runs:
+                        self._runs.popitem(last=False)
+                spans.append(span)
+
+    def stage_percentiles(self, window_seconds: float | None = None) -> dict[str, dict[str, float]]:
+        """每个阶段在滑动窗口内的 count / p50 / p95 / p99 / max（毫秒）。"""
+        cutoff = time.time() - (window_seconds or self.window_seconds)
+        with self._lock:
+            samples = {name: [d for end, d in values if end >= cutoff] for name, values in self._stages.items()}
+        result = {}
+        for name, durations in samples.items():
+            if not durations:
+                continue
+            durations.sort()
+            result[name] = {
+                "count": len(durations),
+                "p50": _percentile(durations, 0.50),
+                "p95": _percentile(durations, 0.95),
+                "p99": _percentile(durations, 0.99),
+                "max": durations[-1],
+            }
+        return result
+
+    def run_breakdown(self, correlation_id: str) -> dict[str, Any] | None:
+        """单次 run 的各阶段耗时汇总与原始 span 列表。"""
+        with self._lock:
+            spans = list(self._runs.get(correlation_id, []))
+        if not spans:
+            return None
+        totals: dict[str, dict[str, float]] = {}
+        for span in spans:
+            stage = totals.setdefault(span.name, {"count": 0, "total_ms": 0.0})
+            stage["count"] += 1
+            stage["total_ms"] += span.duration_ms
+        return {
+            "correlation_id": correlation_id,
+            "stages": totals,
+            "spans": [
+                {"name": s.name, "start_time": s.start_time, "duration_ms": s.duration_ms, "status": s.status, "attributes": s.attributes}
+                for s in sorted(spans, key=lambda s: s.start_time)
+            ],
+        }
+
+    def recent_runs(self, limit: int = 50) -> list[str]:
+        with self._lock:
+            return list(self._runs)[-limit:][::-1]
+
+
+class SpanRecorder:
+    """
+    Records spans. Without an exporter (the default) `span()` returns a shared
+    null context, so instrumented code pays almost nothing.
+    """
+
+    def __init__(self, exporter: InProcessExporter | None = None, otel_tracer: Any = None):
+        self.exporter = exporter
+        self._otel_tracer = otel_tracer
+        self._noop = nullcontext()
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None or self._otel_tracer is not None
+
+    def span(self, name: str, **attributes: Any):
+        if not self.enabled:
+            return self._noop
+        return self._span(name, attributes)
+
+    @contextmanager
+    def _span(self, name: str, attributes: dict[str, Any]) -> Iterator[None]:
+        correlation_id = get_correlation_id()
+        otel_cm = self._otel_tracer.start_as_current_span(name, attributes=_otel_attributes(attributes, correlation_id)) if self._otel_tracer else nullcontext()
+        start_time = time.time()
+        start = time.perf_counter()
+        status = "ok"
+        with otel_cm:
+            try:
+                yield
+            except BaseException:
+                status = "error"
+                raise
+            finally:
+                if self.exporter is not None:
+                    duration_ms = (time.perf_counter() - start) * 1000
+                    # 允许在 span 内部才绑定 correlation id（如 get_agent_context）
+                    correlation_id = correlation_id or get_correlation_id()
+                    self.exporter.export(SpanRecord(name, start_time, duration_ms, correlation_id, status, attributes))
+
+
+@lru_cache
+def get_span_recorder() -> SpanRecorder:
+    if not settings.TRACING_ENABLED:
+        return SpanRecorder()
+    otel_tracer = None
+    if settings.TRACING_OTEL:
+        try:
+            from opentelemetry import trace
+
+            otel_tracer = trace.get_tracer("dingent")
+        except ImportError:
+            otel_tracer = None
+    return SpanRecorder(InProcessExporter(window_seconds=settings.TRACING_WINDOW_SECONDS), otel_tracer)
+
+
+def span(name: str, **attributes: Any):
+    """`with span("stage"):` using the process-wide recorder."""
+    return get_span_recorder().span(name, **attributes)
+
+
+def traced(name: str, **attributes: Any) -> Callable:
+    """Decorator version of `span` for sync and async callables."""
+
+    def decorator(func: Callable) -> Callable:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with span(name, **attributes):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def _percentile(sorted_values: list[float], q: float) -> float:
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * q))]
+
+
+def _otel_attributes(attributes: dict[str, Any], correlation_id: str | None) -> dict[str, Any]:
+    out = {k: v if isinstance(v, str | bool | int | float) else str(v) for k, v in attributes.items()}
+    if correlation_id:
+        out["dingent.correlation_id"] = correlation_id
+    return out
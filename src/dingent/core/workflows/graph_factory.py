@@ -12,7 +12,9 @@ from langgraph.graph import END, START, StateGraph
 from langgraph.graph.state import CompiledStateGraph
 from langgraph_swarm import create_swarm
 
+from dingent.core import metrics
 from dingent.core.assistants.assistant_factory import AssistantFactory
+from dingent.core.tracing import span
 from dingent.core.workflows.schemas import ExecutableWorkflow
 from dingent.engine import create_assistant_graphs
 from dingent.engine.agents.state import MainState
@@ -39,16 +41,24 @@ class GraphFactory:
     async def build(
         self,
         workflow: ExecutableWorkflow,
-        llm: BaseChatModel,
+        llm: BaseChatModel | Callable[[Any], BaseChatModel],
         checkpointer: Any,
         log_method: Callable,
         assistant_id_map: dict[str, Any] | None = None,  # Map assistant names to IDs
     ) -> GraphArtifact:
-        """构建完整的 Swarm 运行图"""
+        """
+        构建完整的 Swarm 运行图。
+
+        llm 可以是单个模型实例，也可以是 assistant_id -> 模型 的解析函数（配合 assistant_id_map 使用）。
+        """
         stack = AsyncExitStack()
 
         try:
-            return await self._build_full(workflow, stack, llm, checkpointer, log_method, assistant_id_map)
+            with (
+                span("graph.build", workflow=workflow.name, assistants=len(workflow.assistant_configs)),
+                metrics.GRAPH_BUILD_SECONDS.labels(workflow.name).time(),
+            ):
+                return await self._build_full(workflow, stack, llm, checkpointer, log_method, assistant_id_map)
         except Exception:
             # 如果构建过程出错，确保 stack 被释放
             await stack.aclose()
@@ -58,7 +68,7 @@ class GraphFactory:
         self,
         workflow: ExecutableWorkflow,
         stack: AsyncExitStack,
-        llm: BaseChatModel,
+        llm: BaseChatModel | Callable[[Any], BaseChatModel],
         checkpointer: Any,
         log_method: Callable,
         assistant_id_map: dict[str, Any] | None = None,
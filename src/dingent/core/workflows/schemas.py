@@ -40,7 +40,9 @@ class WorkflowNodeCreate(WorkflowNodeBase):
     is_start_node: bool = False
     type: str = "assistant"
     id: str = Field(
-        description="节点在前端，用于识别edge连接的节点，数据库中的id是自动生成的UUID，不使用此字段。",
+        description=(
+            "节点在前端的 id，edge 通过它引用节点。replace_workflow(diff=True) 时与已有节点的数据库 id 相同则原地更新该节点并保留其 id，否则（及非 diff 模式）为节点生成新的 UUID。"
+        ),
     )
     assistant_id: UUID | None = None
 
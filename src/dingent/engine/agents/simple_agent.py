@@ -8,6 +8,10 @@ from langgraph.graph import END, StateGraph
 from langgraph.graph.state import CompiledStateGraph, RunnableConfig
 from langgraph.types import Command
 
+from dingent.core.llms.usage_ledger import usage_metadata
+from dingent.core.logs.correlation import get_correlation_id
+from dingent.core.tracing import span
+
 from .messages import ActivityMessage
 from .state import SimpleAgentState
 
@@ -262,7 +266,19 @@ def build_simple_react_agent(
             input_messages = filtered_messages
 
         print(f"[Agent: {name}] Invoking model with messages: {input_messages}")
-        response = await llm.bind_tools(tools).ainvoke(input_messages)
+        # correlation id 同时作为 LiteLLM 的 metadata（供其回调/日志使用）和 LangChain run metadata
+        # 计费主体（工作空间 / 用户 / 助手）同样经 metadata 传给 LiteLLM 的用量回调
+        metadata = usage_metadata(name)
+        correlation_id = get_correlation_id()
+        if correlation_id:
+            metadata["correlation_id"] = correlation_id
+        with span("llm.call", agent=name):
+            if metadata:
+                # 绑定的 metadata 会整体覆盖客户端 model_kwargs 中的 metadata，这里合并保留
+                metadata = {**((getattr(llm, "model_kwargs", None) or {}).get("metadata") or {}), **metadata}
+                response = await llm.bind_tools(tools, metadata=metadata).ainvoke(input_messages, config={"metadata": metadata})
+            else:
+                response = await llm.bind_tools(tools).ainvoke(input_messages)
         print(f"[Agent: {name}] Model Response: {response}")
 
         return {
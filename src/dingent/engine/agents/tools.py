@@ -8,7 +8,9 @@ from langgraph.types import Command
 from mcp.types import TextContent
 from pydantic import BaseModel, Field, create_model
 
+from dingent.core import metrics
 from dingent.core.plugins.schemas import RunnableTool
+from dingent.core.tracing import span
 
 # --- 动态 Pydantic 模型构建 (优化版) ---
 JSON_TYPE_MAP = {
@@ -62,10 +64,15 @@ def mcp_tool_wrapper(runnable_tool: RunnableTool, log_method: Callable) -> Struc
             if not plugin_config:
                 tool_args.pop("plugin_config", None)
 
-            response_raw = await runnable_tool.run(tool_args)
+            with (
+                span("tool.call", tool=tool_def.name, plugin=runnable_tool.plugin_id),
+                metrics.TOOL_CALL_SECONDS.labels(runnable_tool.plugin_id, tool_def.name).time(),
+            ):
+                response_raw = await runnable_tool.run(tool_args)
 
             log_method("info", f"Tool Call Result: {response_raw}", context={"tool": tool_def.name, "id": tool_call_id})
         except Exception as e:
+            metrics.TOOL_CALL_ERRORS.labels(runnable_tool.plugin_id, tool_def.name).inc()
             error_msg = f"{type(e).__name__}: {e}"
             log_method("error", f"Error: {error_msg}", context={"tool": tool_def.name, "id": tool_call_id})
             # 出错时返回普通消息，保持流程继续
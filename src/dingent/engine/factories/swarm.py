@@ -2,6 +2,8 @@ from collections.abc import Callable
 from contextlib import AsyncExitStack, asynccontextmanager
 from uuid import UUID
 
+from langchain_core.language_models import BaseChatModel
+
 from dingent.core.assistants.assistant_factory import AssistantFactory
 from dingent.core.utils import normalize_agent_name
 from dingent.core.workflows.schemas import ExecutableWorkflow
@@ -44,16 +46,16 @@ async def create_assistant_graphs(
             ]
 
             # Resolve LLM for this specific assistant
-            if callable(llm_or_resolver) and assistant_id_map:
+            if isinstance(llm_or_resolver, BaseChatModel):
+                # Legacy: direct LLM instance
+                llm = llm_or_resolver
+            elif assistant_id_map:
                 # Use resolver function with assistant ID
                 assistant_id = assistant_id_map.get(name)
                 llm = llm_or_resolver(assistant_id) if assistant_id else llm_or_resolver(None)
-            elif callable(llm_or_resolver):
+            else:
                 # Resolver without assistant IDs - use workflow-level resolution
                 llm = llm_or_resolver(None)
-            else:
-                # Legacy: direct LLM instance
-                llm = llm_or_resolver
 
             # 构建 Agent
             agent = build_simple_react_agent(
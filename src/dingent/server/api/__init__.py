@@ -1,9 +1,37 @@
+import os
+
+from fastapi import Request, Response, status
+
+from dingent.core.config import settings
+
 from .routers import api_router
 
 
 @api_router.get("/health")
 def health():
+    """存活探针：进程能处理请求即返回 200。"""
     return {"status": "ok"}
 
 
+@api_router.get("/health/ready")
+def readiness(request: Request, response: Response):
+    """
+    就绪探针：后台初始化（CopilotKit / LangGraph）完成且未进入优雅关闭时返回 200，
+    否则返回 503，负载均衡不应向该实例转发新的对话。
+    """
+    if settings.DRAIN_FILE and os.path.exists(settings.DRAIN_FILE):
+        state = "draining"
+    else:
+        copilot_ready = getattr(request.app.state, "copilot_ready", None)
+        if copilot_ready is None or not copilot_ready.done():
+            state = "starting"
+        elif copilot_ready.cancelled() or copilot_ready.exception() is not None:
+            state = "failed"
+        else:
+            state = "ready"
+    if state != "ready":
+        response.status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    return {"status": state}
+
+
 __all__ = ["api_router"]
@@ -1,4 +1,4 @@
-from typing import Annotated
+from typing import TYPE_CHECKING, Annotated
 from uuid import UUID
 
 from fastapi import Depends, Header, Path, Request, status
@@ -11,6 +11,7 @@ from dingent.core.db.crud import assistant as crud_assistant
 from dingent.core.db.crud.user import get_user
 from dingent.core.db.models import User, Workspace, WorkspaceMember
 from dingent.core.db.session import engine
+from dingent.core.llms.analytics_manager import AnalyticsManager
 from dingent.core.logs.log_manager import LogManager
 from dingent.core.plugins.plugin_manager import PluginManager
 from dingent.core.workspaces.schemas import UserRead
@@ -20,6 +21,10 @@ from dingent.server.services.user_workspace_service import UserWorkspaceService
 from dingent.server.services.workspace_assistant_service import WorkspaceAssistantService
 from dingent.server.services.workspace_workflow_service import WorkspaceWorkflowService
 
+if TYPE_CHECKING:
+    # overview_service → market_service → server.api.schemas → ... → dependencies，运行时导入会成环
+    from dingent.server.services.overview_service import OverviewService
+
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token")
 oauth2_scheme_optional = OAuth2PasswordBearer(tokenUrl="api/v1/auth/token", auto_error=False)
 
@@ -194,11 +199,18 @@ def get_workspace_workflow_service(
     )
 
 
-def get_analytics_manager():
+def get_analytics_manager(request: Request) -> AnalyticsManager:
     """
-    Dependency to get the analyticsManager
+    Dependency to get the AnalyticsManager
     """
-    return None
+    return request.app.state.analytics_manager
+
+
+def get_overview_service(request: Request) -> "OverviewService":
+    """
+    Dependency to get the cached dashboard OverviewService.
+    """
+    return request.app.state.overview_service
 
 
 def get_market_service(
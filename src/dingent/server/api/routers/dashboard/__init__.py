@@ -7,6 +7,7 @@ from .market import router as market_router
 from .overview import router as overview_router
 from .plugins import router as plugins_router
 from .settings import router as settings_router
+from .traces import router as traces_router
 from .workflows import router as workflows_router
 
 api_router = APIRouter(prefix="", tags=["dashboard"])
@@ -19,3 +20,4 @@ api_router.include_router(logs_router)
 api_router.include_router(market_router)
 api_router.include_router(overview_router)
 api_router.include_router(llms_router)
+api_router.include_router(traces_router)
@@ -6,6 +6,7 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 
 from dingent.core.db.models import LLMModelConfig, Workspace
+from dingent.core.llms.resolver import invalidate_model_cache
 from dingent.server.api.dependencies import get_current_workspace, get_db_session
 from dingent.server.api.schemas import LLMModelConfigCreate, LLMModelConfigRead, LLMModelConfigUpdate, TestConnectionRequest, TestConnectionResponse
 
@@ -45,6 +46,7 @@ async def create_model(
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
+    invalidate_model_cache()
 
     return LLMModelConfigRead(**db_obj.model_dump(), has_api_key=encrypted_key is not None)
 
@@ -76,6 +78,8 @@ async def update_model(
     session.add(db_obj)
     session.commit()
     session.refresh(db_obj)
+    # 配置内容变化后旧客户端不再可用，连同解析结果一起丢弃
+    invalidate_model_cache(model_id)
 
     return LLMModelConfigRead(**db_obj.model_dump(), has_api_key=db_obj.encrypted_api_key is not None)
 
@@ -92,6 +96,7 @@ async def delete_model(
 
     session.delete(db_obj)
     session.commit()
+    invalidate_model_cache(model_id)
     return {"ok": True}
 
 
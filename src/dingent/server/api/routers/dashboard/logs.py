@@ -1,5 +1,13 @@
-from fastapi import APIRouter, Depends, HTTPException
+import asyncio
+import json
+import time
+from datetime import datetime
+from typing import Literal
 
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+
+from dingent.core import metrics
 from dingent.core.logs.log_manager import LogManager
 from dingent.server.api.dependencies import (
     get_log_manager,
@@ -9,25 +17,87 @@ router = APIRouter(prefix="/logs", tags=["Logs"])
 
 
 @router.get("")
-async def logs(
+def logs(
     level: str | None = None,
     module: str | None = None,
-    limit: int | None = None,
+    limit: int = Query(200, ge=1, le=1000),
     search: str | None = None,
+    correlation_id: str | None = None,
+    since: datetime | None = None,
+    until: datetime | None = None,
+    before_id: int | None = Query(None, description="翻页游标：上一页最后一条日志的 id"),
+    offset: int = Query(0, ge=0),
     log_manager: LogManager = Depends(get_log_manager),
 ):
     try:
-        entries = log_manager.get_logs(level=level, module=module, limit=limit, search=search)
+        entries = log_manager.get_logs(
+            level=level,
+            module=module,
+            limit=limit,
+            search=search,
+            correlation_id=correlation_id,
+            since=since,
+            until=until,
+            before_id=before_id,
+            offset=offset,
+        )
         return [e.to_dict() for e in entries]
     except Exception:
         return []
 
 
 @router.get("/stats")
-async def log_stats(
+def log_stats(
     log_manager: LogManager = Depends(get_log_manager),
 ):
     try:
         return log_manager.get_log_stats()
     except Exception:
         raise HTTPException(status_code=404)
+
+
+@router.get("/stats/rate")
+def log_rate(
+    granularity: Literal["minute", "hour"] = "minute",
+    limit: int | None = Query(None, ge=1),
+    log_manager: LogManager = Depends(get_log_manager),
+):
+    """按分钟/小时统计的日志数量，用于绘制日志速率曲线。"""
+    return log_manager.get_log_rate(granularity, limit)
+
+
+@router.get("/stream")
+async def stream_logs(
+    request: Request,
+    level: str | None = None,
+    module: str | None = None,
+    search: str | None = None,
+    heartbeat: float = Query(15.0, gt=0, le=300),
+    log_manager: LogManager = Depends(get_log_manager),
+):
+    """
+    实时日志 (SSE)。过滤在服务端完成；客户端消费过慢时丢弃新日志，并通过 `dropped` 事件告知丢弃总数。
+    """
+
+    async def event_generator():
+        # 在生成器内订阅：响应体从未开始迭代（客户端在发送前断开）时不会留下无人退订的订阅者
+        subscription = log_manager.subscribe(level=level, module=module, search=search)
+        reported_dropped = 0
+        started = time.monotonic()
+        try:
+            while not await request.is_disconnected():
+                try:
+                    entry = await asyncio.wait_for(subscription.queue.get(), timeout=heartbeat)
+                except TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if subscription.dropped != reported_dropped:
+                    reported_dropped = subscription.dropped
+                    yield f"event: dropped\ndata: {json.dumps({'dropped': reported_dropped})}\n\n"
+                event_id = f"id: {entry.id}\n" if entry.id is not None else ""
+                yield f"{event_id}data: {json.dumps(entry.to_dict(), default=str, ensure_ascii=False)}\n\n"
+        finally:
+            log_manager.unsubscribe(subscription)
+            metrics.SSE_STREAM_SECONDS.labels("logs").observe(time.monotonic() - started)
+
+    return StreamingResponse(event_generator(), media_type="text/event-stream", headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
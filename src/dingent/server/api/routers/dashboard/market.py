@@ -1,21 +1,33 @@
+import asyncio
+from pathlib import Path
+from typing import TYPE_CHECKING
+
 from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
 
-from dingent.core.plugins.market_service import MarketItemCategory, MarketService
 from dingent.core.plugins.plugin_manager import PluginManager
 from dingent.server.api.dependencies import (
+    get_db_session,
     get_market_service,
+    get_overview_service,
     get_plugin_manager,
     get_user_plugin_service,
 )
-from dingent.server.api.schemas import MarketDownloadRequest, MarketDownloadResponse, MarketItem, MarketMetadata
+from dingent.server.api.schemas import MarketDownloadRequest, MarketDownloadResponse, MarketItem, MarketItemCategory, MarketMetadata
+from dingent.server.services.overview_service import OverviewService
+from dingent.server.services.plugin_sync_service import PluginSyncService
 from dingent.server.services.user_plugin_service import UserPluginService
 
+if TYPE_CHECKING:
+    # market_service 导入 dingent.server.api.schemas，其包初始化会加载本路由；运行时导入会成环
+    from dingent.core.plugins.market_service import MarketService
+
 router = APIRouter(prefix="/market", tags=["Market"])
 
 
 @router.get("/metadata", response_model=MarketMetadata)
 async def get_market_metadata(
-    market_service: MarketService = Depends(get_market_service),
+    market_service: "MarketService" = Depends(get_market_service),
 ):
     return await market_service.get_market_metadata()
 
@@ -23,18 +35,20 @@ async def get_market_metadata(
 @router.get("/items", response_model=list[MarketItem])
 async def get_market_items(
     category: str,
-    market_service: MarketService = Depends(get_market_service),
+    q: str | None = None,
+    market_service: "MarketService" = Depends(get_market_service),
     plugin_service: UserPluginService = Depends(get_user_plugin_service),
 ):
     """
     category: 'plugin', 'assistant', 'workflow', or 'all'
+    q: optional search terms, matched against the local market index
     """
     try:
         cat_enum = MarketItemCategory(category)
         # 获取本地已安装插件用于对比版本
         local_plugins = plugin_service.get_visible_plugins()
 
-        return await market_service.get_market_items(cat_enum, installed_plugins=local_plugins)
+        return await market_service.get_market_items(cat_enum, installed_plugins=local_plugins, query=q)
     except ValueError:
         raise HTTPException(status_code=400, detail=f"Invalid category: {category}")
     except Exception as e:
@@ -44,8 +58,10 @@ async def get_market_items(
 @router.post("/download", response_model=MarketDownloadResponse)
 async def download_market_item(
     request: MarketDownloadRequest,
-    market_service: MarketService = Depends(get_market_service),
+    market_service: "MarketService" = Depends(get_market_service),
     plugin_manager: PluginManager = Depends(get_plugin_manager),
+    overview_service: OverviewService = Depends(get_overview_service),
+    session: Session = Depends(get_db_session),
 ):
     try:
         cat_enum = MarketItemCategory(request.category)
@@ -54,10 +70,13 @@ async def download_market_item(
         if not result["success"]:
             raise HTTPException(status_code=400, detail=result["message"])
 
-        # 如果是插件，触发一次刷新
+        # 如果是插件，只注册新安装的目录并同步这一个插件，无需全量扫描
         if cat_enum == MarketItemCategory.PLUGIN:
-            plugin_manager.list_visible_plugins()
-            await plugin_manager.reload_plugins()
+            manifest = plugin_manager.add_plugin_from_dir(Path(result["installed_path"]))
+            if manifest is not None:
+                # 与后台同步共用一把锁，放到线程中等待，不阻塞事件循环
+                await asyncio.to_thread(PluginSyncService(db_session=session, registry=plugin_manager.registry).sync, {manifest.id})
+            overview_service.invalidate("plugins", "market")
         return MarketDownloadResponse(**result)
     except ValueError:
         raise HTTPException(status_code=400, detail="Invalid category")
@@ -67,7 +86,7 @@ async def download_market_item(
 async def get_readme(
     item_id: str,
     category: str,
-    market_service: MarketService = Depends(get_market_service),
+    market_service: "MarketService" = Depends(get_market_service),
 ):
     try:
         cat_enum = MarketItemCategory(category)
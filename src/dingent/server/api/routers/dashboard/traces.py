@@ -0,0 +1,31 @@
+from fastapi import APIRouter, HTTPException, Query
+
+from dingent.core.tracing import get_span_recorder
+
+router = APIRouter(prefix="/traces", tags=["Traces"])
+
+
+@router.get("/stages")
+async def stage_latencies(window_seconds: float | None = Query(None, gt=0, description="统计窗口（秒），默认使用 TRACING_WINDOW_SECONDS")):
+    """各阶段（graph.build / llm.call / tool.call / checkpoint.* 等）的耗时分位数。"""
+    recorder = get_span_recorder()
+    if recorder.exporter is None:
+        return {"enabled": False, "stages": {}}
+    return {"enabled": True, "window_seconds": window_seconds or recorder.exporter.window_seconds, "stages": recorder.exporter.stage_percentiles(window_seconds)}
+
+
+@router.get("/runs")
+async def recent_runs(limit: int = Query(50, ge=1, le=500)):
+    recorder = get_span_recorder()
+    if recorder.exporter is None:
+        return {"enabled": False, "runs": []}
+    return {"enabled": True, "runs": recorder.exporter.recent_runs(limit)}
+
+
+@router.get("/runs/{correlation_id}")
+async def run_breakdown(correlation_id: str):
+    recorder = get_span_recorder()
+    breakdown = recorder.exporter.run_breakdown(correlation_id) if recorder.exporter is not None else None
+    if breakdown is None:
+        raise HTTPException(status_code=404, detail=f"No spans recorded for run '{correlation_id}'")
+    return breakdown
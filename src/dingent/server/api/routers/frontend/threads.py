@@ -1,7 +1,10 @@
+import asyncio
+import math
+import time
 import uuid
 from dataclasses import dataclass
 from datetime import UTC, datetime
-from typing import Annotated, Any, cast
+from typing import TYPE_CHECKING, Annotated, Any, cast
 
 from ag_ui.core.types import RunAgentInput
 from ag_ui.encoder import EventEncoder
@@ -9,8 +12,14 @@ from fastapi import APIRouter, Depends, Header, HTTPException, Request
 from fastapi.responses import StreamingResponse
 from sqlmodel import col, delete, select
 
+from dingent.core import metrics
+from dingent.core.config import settings
 from dingent.core.db.crud.workflow import get_workflow_by_name
 from dingent.core.db.models import Conversation, Workflow
+from dingent.core.llms.usage_ledger import UsageScope, bind_usage_scope, usage_scope
+from dingent.core.logs.correlation import bind_correlation_id, correlation_scope, new_correlation_id
+from dingent.core.ratelimit import get_rate_limiter
+from dingent.core.tracing import span, traced
 
 # from dingent.core.managers.llm_manager import get_llm_service
 from dingent.core.workflows.presets import get_fallback_workflow_spec
@@ -22,14 +31,18 @@ from dingent.server.api.dependencies import (
     DbSession,
     get_visitor_id,
 )
-from dingent.server.copilot.agents import DingLangGraphAGUIAgent
 from dingent.server.services.copilotkit_service import CopilotKitSdk
 
+if TYPE_CHECKING:
+    from dingent.server.copilot.agents import DingLangGraphAGUIAgent
+
 router = APIRouter(prefix="/chat", tags=["chat"])
 
 
-def get_copilot_sdk(request: Request) -> CopilotKitSdk:
-    return request.app.state.copilot_sdk
+async def get_copilot_sdk(request: Request) -> CopilotKitSdk:
+    # SDK 在 lifespan 中后台初始化；启动后的第一个对话请求可能需要等它完成。
+    # shield：请求被取消时不能连带取消初始化任务
+    return await asyncio.shield(request.app.state.copilot_ready)
 
 
 CopilotSDK = Annotated[CopilotKitSdk, Depends(get_copilot_sdk)]
@@ -42,11 +55,13 @@ class AgentContext:
     """
 
     session: DbSession
-    agent: DingLangGraphAGUIAgent
+    agent: "DingLangGraphAGUIAgent"
     conversation: Conversation
     encoder: EventEncoder
     input_data: RunAgentInput
     assistant_plugin_configs: dict[str, dict] | None
+    correlation_id: str
+    usage: UsageScope
 
 
 def update_conversation_title(conversation: Conversation, input_data: RunAgentInput, max_length: int = 50) -> None:
@@ -62,12 +77,70 @@ def update_conversation_title(conversation: Conversation, input_data: RunAgentIn
         conversation.title = cast(str, input_data.messages[0].content)[:max_length]
 
 
+def enforce_chat_limits(request: Request, workspace_id: uuid.UUID, usage: UsageScope) -> None:
+    """按工作空间 / 用户 / 游客（及其 IP）做令牌桶限流，再检查当日预算；超出时抛出 429。"""
+    if settings.RATE_LIMIT_ENABLED:
+        limiter = get_rate_limiter()
+        limits = [(f"ws:{workspace_id}", settings.RATE_LIMIT_WORKSPACE_PER_MINUTE, settings.RATE_LIMIT_WORKSPACE_BURST)]
+        if usage.user_id:
+            limits.append((f"user:{usage.user_id}", settings.RATE_LIMIT_USER_PER_MINUTE, settings.RATE_LIMIT_USER_BURST))
+        else:
+            if usage.visitor_id:
+                limits.append((f"visitor:{workspace_id}:{usage.visitor_id}", settings.RATE_LIMIT_VISITOR_PER_MINUTE, settings.RATE_LIMIT_VISITOR_BURST))
+            client_host = request.client.host if request.client else "unknown"
+            limits.append((f"ip:{workspace_id}:{client_host}", settings.RATE_LIMIT_GUEST_IP_PER_MINUTE, settings.RATE_LIMIT_GUEST_IP_BURST))
+        # 最具体的桶先扣：被拒绝时不消耗更大范围（工作空间）的额度
+        for key, per_minute, burst in reversed(limits):
+            retry_after = limiter.hit(key, per_minute, burst)
+            if retry_after:
+                metrics.CHAT_RUNS_REJECTED.labels("rate_limit").inc()
+                raise HTTPException(
+                    status_code=429,
+                    detail="Too many requests, please retry later.",
+                    headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+                )
+
+    analytics_manager = getattr(request.app.state, "analytics_manager", None)
+    if analytics_manager is not None:
+        reason = analytics_manager.check_budget(workspace_id, usage.principal)
+        if reason:
+            metrics.CHAT_RUNS_REJECTED.labels("budget").inc()
+            raise HTTPException(status_code=429, detail=reason)
+
+
+def run_correlation_id(run_id: str | None) -> str:
+    """
+    客户端提供的 run_id 是合法 UUID 时沿用（规范化后与前端的 run 一一对应），
+    否则在服务端生成：任意字符串会被写进日志并透传给插件进程。
+    """
+    try:
+        return str(uuid.UUID(run_id)) if run_id else new_correlation_id()
+    except ValueError:
+        return new_correlation_id()
+
+
+async def check_chat_run_limits(
+    request: Request,
+    user: CurrentUserOptional,
+    workspace: CurrentWorkspaceAllowGuest,
+    visitor_id: str | None = Header(None, alias="X-Visitor-ID"),
+) -> None:
+    """
+    只用于 run：connect 在每次打开 / 重连会话时都会调用，不能消耗对话额度。
+    先于 get_agent_context 执行，在查库、构建图之前拒绝。
+    """
+    usage = UsageScope(workspace_id=workspace.id, user_id=user.id if user else None, visitor_id=None if user else visitor_id)
+    # SQLite 令牌桶（BEGIN IMMEDIATE）和预算的用量查询都会阻塞，放到线程中执行
+    await asyncio.to_thread(enforce_chat_limits, request, workspace.id, usage)
+
+
 async def get_workflow_spec(workflow: Workflow | None) -> ExecutableWorkflow:
     if not workflow or not workflow.to_spec().start_node:
         return get_fallback_workflow_spec()
     return workflow.to_spec()
 
 
+@traced("agent.context")
 async def get_agent_context(
     agent_id: str,
     input_data: RunAgentInput,
@@ -78,6 +151,12 @@ async def get_agent_context(
     workspace: CurrentWorkspaceAllowGuest,
     visitor_id: str | None = Header(None, alias="X-Visitor-ID"),
 ) -> AgentContext:
+    # 本次 run 的 correlation id：日志、MCP 工具调用、LLM 调用都会带上它
+    correlation_id = run_correlation_id(input_data.run_id)
+    bind_correlation_id(correlation_id)
+
+    usage = UsageScope(workspace_id=workspace.id, user_id=user.id if user else None, visitor_id=None if user else visitor_id)
+
     # --- A. 验证 thread_id ---
     try:
         thread_uuid = uuid.UUID(input_data.thread_id)
@@ -139,17 +218,23 @@ async def get_agent_context(
         raise HTTPException(status_code=404, detail=f"Workflow '{agent_id}' not found")
 
     # Use context-aware model resolution with cascading strategy
-    from dingent.core.llms.service import get_llm_for_context
+    from dingent.core.llms.service import get_llm_for_context, get_llms_for_assistants
 
     workflow_id = workflow.id if workflow else None
-    llm = get_llm_for_context(
-        session=session,
-        workflow_id=workflow_id,
-        workspace_id=workspace.id,
-    )
-
     spec = await get_workflow_spec(workflow)
-    agent = await sdk.resolve_agent(spec, llm)
+
+    # 每个子 Agent 使用自己的模型配置（一次批量解析，客户端来自连接池）
+    assistant_id_map = {name: config.id for name, config in spec.assistant_configs.items()}
+    usage.assistant_ids = assistant_id_map
+    bind_usage_scope(usage)
+    with span("llm.resolve"):
+        default_llm = get_llm_for_context(session=session, workflow_id=workflow_id, workspace_id=workspace.id)
+        llms = get_llms_for_assistants(session, assistant_id_map.values(), workflow_id=workflow_id, workspace_id=workspace.id)
+
+    def resolve_llm(assistant_id: uuid.UUID | None):
+        return llms.get(assistant_id, default_llm) if assistant_id else default_llm
+
+    agent = await sdk.resolve_agent(spec, resolve_llm, assistant_id_map)
 
     # --- D. 准备 Encoder ---
     accept_header = request.headers.get("accept")
@@ -166,6 +251,8 @@ async def get_agent_context(
         encoder=encoder,
         input_data=input_data,
         assistant_plugin_configs=assistant_plugin_configs,
+        correlation_id=correlation_id,
+        usage=usage,
     )
 
 
@@ -179,20 +266,38 @@ async def get_agents(
     return sdk.list_agents_for_user(user, session, workspace.id)
 
 
-@router.post("/agent/{agent_id}/run")
+@router.post("/agent/{agent_id}/run", dependencies=[Depends(check_chat_run_limits)])
 async def run(
     ctx: AgentContext = Depends(get_agent_context),
 ):
+    workflow_name = ctx.agent.name
+
     async def event_generator():
-        async for event in ctx.agent.run(
-            ctx.input_data,
-            extra_config={
-                "configurable": {
-                    "assistant_plugin_configs": ctx.assistant_plugin_configs,
-                },
-            },
-        ):
-            yield ctx.encoder.encode(cast(Any, event))
+        metrics.CHAT_RUNS_STARTED.labels(workflow_name).inc()
+        started = time.monotonic()
+        outcome = "ok"
+        try:
+            # StreamingResponse 可能在其他 task 中迭代，这里显式恢复 correlation id
+            with correlation_scope(ctx.correlation_id), usage_scope(ctx.usage):
+                async for event in ctx.agent.run(
+                    ctx.input_data,
+                    extra_config={
+                        "configurable": {
+                            "assistant_plugin_configs": ctx.assistant_plugin_configs,
+                        },
+                    },
+                ):
+                    yield ctx.encoder.encode(cast(Any, event))
+        except (asyncio.CancelledError, GeneratorExit):
+            # 客户端断开
+            outcome = "cancelled"
+            raise
+        except Exception:
+            outcome = "error"
+            raise
+        finally:
+            metrics.CHAT_RUNS_FINISHED.labels(workflow_name, outcome).inc()
+            metrics.SSE_STREAM_SECONDS.labels("chat_run").observe(time.monotonic() - started)
 
     # Update conversation title if needed
     update_conversation_title(ctx.conversation, ctx.input_data)
@@ -201,7 +306,7 @@ async def run(
     ctx.session.add(ctx.conversation)
     ctx.session.commit()
 
-    return StreamingResponse(event_generator(), media_type=ctx.encoder.get_content_type())
+    return StreamingResponse(event_generator(), media_type=ctx.encoder.get_content_type(), headers={"X-Correlation-ID": ctx.correlation_id})
 
 
 @router.post("/agent/{agent_id}/connect")
@@ -209,8 +314,9 @@ async def connect(
     ctx: AgentContext = Depends(get_agent_context),
 ):
     async def event_generator():
-        async for event in ctx.agent.get_thread_messages(ctx.input_data.thread_id, ctx.input_data.run_id):
-            yield ctx.encoder.encode(cast(Any, event))
+        with metrics.SSE_STREAM_SECONDS.labels("chat_connect").time():
+            async for event in ctx.agent.get_thread_messages(ctx.input_data.thread_id, ctx.input_data.run_id):
+                yield ctx.encoder.encode(cast(Any, event))
 
     return StreamingResponse(event_generator(), media_type=ctx.encoder.get_content_type())
 
@@ -1,17 +1,30 @@
 import asyncio
+import hashlib
 import os
+import time
 import uuid
+from abc import ABC, abstractmethod
+from collections.abc import Awaitable, Callable
+from contextlib import AbstractAsyncContextManager, asynccontextmanager
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Protocol
+from typing import TYPE_CHECKING, Any, Protocol
+from urllib.parse import urlparse
+from urllib.request import url2pathname
 
-import fsspec
 import toml
-from async_lru import alru_cache
-from packaging.version import InvalidVersion, Version
 from pydantic import BaseModel, Field, model_validator
 
+from dingent.core.config import settings
+from dingent.core.paths import paths
+from dingent.core.plugins.market_download import BlobCache, RemoteFile, git_blob_sha, install_files
+from dingent.core.plugins.market_index import MarketIndex
+
+if TYPE_CHECKING:
+    # fsspec 只在构建索引 / 读取 README 时才需要，启动时不导入
+    from fsspec import AbstractFileSystem
+
 # --- Admin Response Models ---
 
 
@@ -140,18 +153,23 @@ class MarketItem(BaseModel):
 
 class MarketBackend(Protocol):
     async def get_metadata(self) -> MarketMetadata: ...
-    async def list_items(
-        self,
-        category: MarketItemCategory,
-        installed_map_tuple: tuple[tuple[str, str], ...],
-    ) -> list[MarketItem]: ...
+    async def list_items(self, category: MarketItemCategory, query: str | None = None) -> list[MarketItem]:
+        """远端目录中的条目；不含本地安装状态（由 MarketService 按请求叠加）。"""
+        ...
+
     async def get_readme(self, item_id: str, category: MarketItemCategory) -> str | None: ...
-    async def download_item(self, item_id: str, category: MarketItemCategory, target_dir: Path) -> None: ...
+    async def download_item(self, item_id: str, category: MarketItemCategory, target_dir: Path) -> Path:
+        """安装到 target_dir/<item_id> 并返回该目录。"""
+        ...
 
 
-class GitHubMarketBackend:
+class _IndexedMarketBackend(ABC):
     """
-    使用 fsspec 重构的市场后端。
+    基于本地索引快照（MarketIndex）的市场后端。
+
+    列表、搜索与元数据都从 `paths.cache_root` 下的快照读取；快照超过 TTL 后
+    才询问远端版本是否变化，只有变化时才重新抓取整个目录。远端不可用时继续
+    使用旧快照。子类提供文件系统与版本探测。
     """
 
     # 目录映射
@@ -161,113 +179,117 @@ class GitHubMarketBackend:
         MarketItemCategory.WORKFLOW: "workflows",
     }
 
-    def __init__(self, log_manager):
+    def __init__(self, log_manager, index_path: Path, ttl: float):
         self._log_manager = log_manager
-
-        # 初始化 GitHub 文件系统
-        # 这里的 username/token 用于解决 API 限流问题
-        self.fs = fsspec.filesystem("github", org=MARKET_REPO_OWNER, repo=MARKET_REPO_NAME, sha=MARKET_BRANCH, username=os.getenv("GITHUB_USER"), token=os.getenv("GITHUB_TOKEN"))
+        self.index_path = index_path
+        self.ttl = ttl
+        self._index: MarketIndex | None = None
+        self._blob_cache = BlobCache(index_path.parent / "blobs")
+        self._catalogue: tuple[MarketIndex, dict[tuple[str, str], MarketItem]] | None = None
+        self._lock = asyncio.Lock()
+
+    # --- 子类实现 ---
+
+    @abstractmethod
+    def _filesystem(self, revision: str | None) -> "AbstractFileSystem":
+        """返回指向市场仓库根目录（指定版本）的 fsspec 文件系统。"""
+
+    @abstractmethod
+    async def _probe(self, index: MarketIndex | None) -> MarketIndex | None:
+        """
+        询问远端版本。未变化时返回 None；否则返回只填写了 revision / etag /
+        last_modified 的新索引，由调用方补全内容。
+        """
+
+    @abstractmethod
+    async def _list_files(self, revision: str | None, remote_path: str) -> list[RemoteFile]:
+        """列出条目下的全部文件（相对路径 + git blob sha）。"""
+
+    @abstractmethod
+    def _open_fetcher(self, revision: str | None, remote_path: str) -> AbstractAsyncContextManager[Callable[[RemoteFile], Awaitable[bytes]]]:
+        """返回一个异步上下文，产出读取单个文件内容的协程函数。"""
 
     # --- 核心辅助：将 fsspec 的同步操作转为异步 ---
     async def _run_fs(self, func, *args, **kwargs):
         """在线程池中运行 fsspec 的同步操作，避免阻塞 Event Loop"""
         return await asyncio.to_thread(func, *args, **kwargs)
 
-    # --- API 实现 ---
-
-    @alru_cache(maxsize=1)
-    async def get_metadata(self) -> MarketMetadata:
+    def _repo_dir(self, category: MarketItemCategory) -> str:
+        return self.CATEGORY_DIR_MAP.get(category, f"{category.value}s")
+
+    # --- 索引维护 ---
+
+    async def get_index(self) -> MarketIndex:
+        """返回当前快照，必要时先检查远端并重建。"""
+        async with self._lock:
+            if self._index is None:
+                self._index = await self._run_fs(MarketIndex.load, self.index_path)
+            index = self._index
+            if index is not None and index.is_fresh(self.ttl):
+                return index
+
+            try:
+                fresh = await self._probe(index)
+                if fresh is None and index is not None:
+                    index.checked_at = time.time()
+                else:
+                    fresh = fresh or MarketIndex()
+                    await self._build(fresh)
+                    self._index = index = fresh
+                    self._log_manager.log_with_context("info", "Market index rebuilt", context={"revision": fresh.revision, "items": len(fresh.items)})
+                await self._run_fs(index.save, self.index_path)
+            except Exception as e:
+                self._log_manager.log_with_context("warning", "Market index refresh failed, serving cached snapshot", context={"error": str(e)})
+                # 失败后同样等待一个 TTL 再重试，避免每个请求都访问远端
+                if index is None:
+                    self._index = index = MarketIndex()
+                index.checked_at = time.time()
+            return index
+
+    async def _build(self, index: MarketIndex) -> None:
+        fs = self._filesystem(index.revision)
+        index.checked_at = time.time()
+        index.metadata = await self._run_fs(self._read_metadata, fs)
+        categories = [c for c in MarketItemCategory if c != MarketItemCategory.ALL]
+        results = await asyncio.gather(*(self._crawl_category(fs, cat) for cat in categories))
+        index.items = [entry for entries in results for entry in entries]
+        index.readmes = {}
+
+    def _read_metadata(self, fs: "AbstractFileSystem") -> dict[str, Any]:
         try:
-            # 直接读取文件内容，就像读本地文件一样
-            if await self._run_fs(self.fs.exists, "market.json"):
-                content = await self._run_fs(self.fs.cat_file, "market.json")
-                return MarketMetadata.model_validate_json(content)
+            if fs.exists("market.json"):
+                return MarketMetadata.model_validate_json(fs.cat_file("market.json")).model_dump()
         except Exception as e:
             self._log_manager.log_with_context("error", "Metadata parse error", context={"error": str(e)})
+        return {}
 
-        return MarketMetadata(version="0.0.0", updated_at="", categories={})
-
-    async def get_readme(self, item_id: str, category: MarketItemCategory) -> str | None:
-        repo_dir = self.CATEGORY_DIR_MAP.get(category, f"{category.value}s")
-        path = f"{repo_dir}/{item_id}/README.md"
-
-        try:
-            if await self._run_fs(self.fs.exists, path):
-                # fsspec 默认读取为 bytes，需要 decode
-                content_bytes = await self._run_fs(self.fs.cat_file, path)
-                return content_bytes.decode("utf-8")
-        except Exception:
-            pass  # File not found or error
-        return None
-
-    async def download_item(self, item_id: str, category: MarketItemCategory, target_dir: Path) -> None:
-        repo_dir = self.CATEGORY_DIR_MAP.get(category, f"{category.value}s")
-        remote_path = f"{repo_dir}/{item_id}"
-
-        # 确保目标目录存在
-        target_dir.mkdir(parents=True, exist_ok=True)
-
-        try:
-            await self._run_fs(self.fs.get, remote_path, str(target_dir), recursive=True)
-        except Exception as e:
-            self._log_manager.log_with_context("error", "fsspec download failed", context={"remote": remote_path, "error": str(e)})
-            raise
-
-    # --- 列表获取逻辑 ---
-
-    async def list_items(
-        self,
-        category: MarketItemCategory,
-        installed_map_tuple: tuple[tuple[str, str], ...],
-    ) -> list[MarketItem]:
-        categories = [c for c in MarketItemCategory if c != MarketItemCategory.ALL] if category == MarketItemCategory.ALL else [category]
-
-        tasks = [self._process_category(cat, installed_map_tuple) for cat in categories]
-        results = await asyncio.gather(*tasks)
-        return [item for sublist in results for item in sublist]
-
-    @alru_cache(maxsize=16)
-    async def _process_category(self, category: MarketItemCategory, installed_map_tuple: tuple[tuple[str, str], ...]) -> list[MarketItem]:
-        repo_dir = self.CATEGORY_DIR_MAP.get(category, f"{category.value}s")
-        installed_map = dict(installed_map_tuple)
-
+    async def _crawl_category(self, fs: "AbstractFileSystem", category: MarketItemCategory) -> list[dict[str, Any]]:
+        repo_dir = self._repo_dir(category)
         try:
-            # fs.ls 列出目录内容
-            # detail=False 返回路径列表 ['owner/repo/plugins/plugin-a', ...]
-            paths = await self._run_fs(self.fs.ls, repo_dir, detail=False)
+            # detail=False 返回路径列表，例如 "plugins/plugin-a"
+            paths = await self._run_fs(fs.ls, repo_dir, detail=False)
         except FileNotFoundError:
             return []
 
-        items = []
+        tasks = []
         for path in paths:
-            # fsspec 返回的 path 通常是完整的，需要取最后一部分作为 ID
-            # 这里的 path 可能是 "plugins/plugin-a"
             item_id = path.rstrip("/").split("/")[-1]
-
             # 过滤掉非文件夹（如果 fs.ls 返回了文件）
             if "." in item_id:
                 continue
-
-            # 获取详情 (并发处理)
-            items.append(self._fetch_item_details(category, item_id, path, installed_map.get(item_id)))
+            tasks.append(self._read_entry(fs, category, item_id, f"{repo_dir}/{item_id}"))
 
         # 并发读取所有 items 的配置文件
-        return [i for i in await asyncio.gather(*items) if i is not None]
+        return [entry for entry in await asyncio.gather(*tasks) if entry is not None]
 
-    async def _fetch_item_details(self, category: MarketItemCategory, item_id: str, remote_path: str, local_version: str | None) -> MarketItem | None:
+    async def _read_entry(self, fs: "AbstractFileSystem", category: MarketItemCategory, item_id: str, remote_path: str) -> dict[str, Any] | None:
         try:
             meta = {}
-
-            # 定义需要读取的配置文件路径
             configs_to_read = []
             if category == MarketItemCategory.PLUGIN:
                 configs_to_read = [f"{remote_path}/pyproject.toml", f"{remote_path}/plugin.toml"]
 
-            # 并发读取配置文件内容
-            read_tasks = [self._run_fs(self._safe_read_toml, p) for p in configs_to_read]
-            config_contents = await asyncio.gather(*read_tasks)
-
-            # 合并配置
+            config_contents = await asyncio.gather(*(self._run_fs(self._safe_read_toml, fs, p) for p in configs_to_read))
             for data in config_contents:
                 if not data:
                     continue
@@ -275,45 +297,241 @@ class GitHubMarketBackend:
                 meta.update(data.get("project", {}))  # pyproject standard
                 meta.update(data.get("plugin", data))  # plugin.toml custom structure
 
-            # 如果没有读到任何配置，回退到默认值
-            remote_version = str(meta.get("version", "0.0.0"))
-
-            # 版本比较
-            update_available = False
-            if local_version:
-                try:
-                    update_available = Version(remote_version) > Version(local_version)
-                except InvalidVersion:
-                    pass
-
-            return MarketItem(
-                id=item_id,
-                name=meta.get("name", item_id),
-                description=meta.get("description"),
-                version=remote_version,
-                author=meta.get("author") or (meta.get("authors", [{}])[0].get("name") if "authors" in meta else None),
-                category=category,
-                tags=meta.get("tags", []),
-                license=str(meta.get("license", {}).get("text", "Unknown")),
-                is_installed=bool(local_version),
-                installed_version=local_version,
-                update_available=update_available,
-            )
-
+            license_ = meta.get("license")
+            return {
+                "id": item_id,
+                "category": category.value,
+                "name": meta.get("name", item_id),
+                "description": meta.get("description"),
+                "version": str(meta.get("version", "0.0.0")),
+                "author": meta.get("author") or (meta.get("authors", [{}])[0].get("name") if "authors" in meta else None),
+                "tags": meta.get("tags", []),
+                "license": str(license_.get("text", "Unknown")) if isinstance(license_, dict) else str(license_ or "Unknown"),
+            }
         except Exception as e:
             self._log_manager.log_with_context("warning", "Item details error", context={"id": item_id, "error": str(e)})
             return None
 
-    def _safe_read_toml(self, path: str) -> dict | None:
+    @staticmethod
+    def _safe_read_toml(fs: "AbstractFileSystem", path: str) -> dict | None:
         """同步辅助函数：安全读取并解析 TOML"""
         try:
-            if self.fs.exists(path):
-                content = self.fs.cat_file(path)
-                return toml.loads(content.decode("utf-8"))
+            if fs.exists(path):
+                return toml.loads(fs.cat_file(path).decode("utf-8"))
         except Exception:
             pass
         return None
 
+    # --- API 实现 ---
+
+    async def get_metadata(self) -> MarketMetadata:
+        index = await self.get_index()
+        if index.metadata:
+            return MarketMetadata.model_validate(index.metadata)
+        return MarketMetadata(version="0.0.0", updated_at="", categories={})
+
+    async def list_items(self, category: MarketItemCategory, query: str | None = None) -> list[MarketItem]:
+        index = await self.get_index()
+        catalogue = self._catalogue_for(index)
+        categories = None if category == MarketItemCategory.ALL else [category.value]
+        return [catalogue[(entry["category"], entry["id"])] for entry in index.entries(categories, query)]
+
+    def _catalogue_for(self, index: MarketIndex) -> dict[tuple[str, str], MarketItem]:
+        # 解析后的条目按快照版本缓存，与本地安装状态无关，安装 / 卸载插件不会使其失效
+        if self._catalogue is None or self._catalogue[0] is not index:
+            self._catalogue = (index, {(entry["category"], entry["id"]): MarketItem(**entry) for entry in index.items})
+        return self._catalogue[1]
+
+    async def get_readme(self, item_id: str, category: MarketItemCategory) -> str | None:
+        index = await self.get_index()
+        key = f"{category.value}/{item_id}"
+        if key not in index.readmes:
+            fs = self._filesystem(index.revision)
+            path = f"{self._repo_dir(category)}/{item_id}/README.md"
+            content = ""
+            try:
+                if await self._run_fs(fs.exists, path):
+                    # fsspec 默认读取为 bytes，需要 decode
+                    content = (await self._run_fs(fs.cat_file, path)).decode("utf-8")
+            except Exception:
+                # 读取失败不写入快照，下次再试
+                return None
+            index.readmes[key] = content
+            await self._run_fs(index.save, self.index_path)
+        return index.readmes[key] or None
+
+    async def download_item(self, item_id: str, category: MarketItemCategory, target_dir: Path) -> Path:
+        index = await self.get_index()
+        remote_path = f"{self._repo_dir(category)}/{item_id}"
+        final_dir = target_dir / item_id
+
+        # 确保目标目录存在
+        target_dir.mkdir(parents=True, exist_ok=True)
+
+        try:
+            # 与快照同一版本，保证下载的内容与列表中展示的一致
+            files = await self._list_files(index.revision, remote_path)
+            if not files:
+                raise FileNotFoundError(f"Market item '{remote_path}' not found")
+            async with self._open_fetcher(index.revision, remote_path) as fetch:
+                await install_files(files, fetch, final_dir, self._blob_cache, concurrency=settings.MARKET_DOWNLOAD_CONCURRENCY)
+        except Exception as e:
+            self._log_manager.log_with_context("error", "Market download failed", context={"remote": remote_path, "error": str(e)})
+            raise
+        return final_dir
+
+
+class GitHubMarketBackend(_IndexedMarketBackend):
+    """
+    GitHub 上的 dingent-hub 仓库。
+
+    版本探测只请求分支最新 commit 的 sha（带 If-None-Match / If-Modified-Since，
+    未变化时返回 304，不计入 API 限流）；目录内容通过 fsspec 按该 sha 读取。
+    """
+
+    def __init__(self, log_manager, index_path: Path | None = None, ttl: float | None = None):
+        super().__init__(
+            log_manager,
+            index_path or paths.market_index_path,
+            settings.MARKET_INDEX_TTL if ttl is None else ttl,
+        )
+        # 这里的 username/token 用于解决 API 限流问题
+        self._username = os.getenv("GITHUB_USER")
+        self._token = os.getenv("GITHUB_TOKEN")
+
+    def _filesystem(self, revision: str | None) -> "AbstractFileSystem":
+        import fsspec
+
+        return fsspec.filesystem("github", org=MARKET_REPO_OWNER, repo=MARKET_REPO_NAME, sha=revision or MARKET_BRANCH, username=self._username, token=self._token)
+
+    async def _probe(self, index: MarketIndex | None) -> MarketIndex | None:
+        import aiohttp
+
+        url = f"{GITHUB_API_BASE}/repos/{MARKET_REPO_OWNER}/{MARKET_REPO_NAME}/commits/{MARKET_BRANCH}"
+        headers = {"Accept": "application/vnd.github.sha"}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        if index is not None and index.revision:
+            if index.etag:
+                headers["If-None-Match"] = index.etag
+            if index.last_modified:
+                headers["If-Modified-Since"] = index.last_modified
+
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, headers=headers, timeout=aiohttp.ClientTimeout(total=10)) as resp:
+                if resp.status == 304:
+                    return None
+                resp.raise_for_status()
+                sha = (await resp.text()).strip()
+                etag, last_modified = resp.headers.get("ETag"), resp.headers.get("Last-Modified")
+
+        if index is not None and index.revision == sha:
+            index.etag, index.last_modified = etag, last_modified
+            return None
+        return MarketIndex(revision=sha, etag=etag, last_modified=last_modified)
+
+    def _api_headers(self) -> dict[str, str]:
+        headers = {"Accept": "application/vnd.github+json"}
+        if self._token:
+            headers["Authorization"] = f"Bearer {self._token}"
+        return headers
+
+    async def _list_files(self, revision: str | None, remote_path: str) -> list[RemoteFile]:
+        import aiohttp
+
+        # "<rev>:<path>" 形式的 tree-ish 只返回条目子树，一次 API 请求即可拿到所有文件及其 blob sha
+        url = f"{GITHUB_API_BASE}/repos/{MARKET_REPO_OWNER}/{MARKET_REPO_NAME}/git/trees/{revision or MARKET_BRANCH}:{remote_path}"
+        async with aiohttp.ClientSession() as session:
+            async with session.get(url, params={"recursive": "1"}, headers=self._api_headers(), timeout=aiohttp.ClientTimeout(total=30)) as resp:
+                if resp.status == 404:
+                    return []
+                resp.raise_for_status()
+                tree = await resp.json()
+        if tree.get("truncated"):
+            raise RuntimeError(f"Tree listing for '{remote_path}' was truncated by GitHub")
+        return [RemoteFile(path=e["path"], sha=e["sha"], size=e.get("size")) for e in tree.get("tree", []) if e.get("type") == "blob"]
+
+    @asynccontextmanager
+    async def _open_fetcher(self, revision: str | None, remote_path: str):
+        import aiohttp
+
+        # 文件内容走 raw 内容地址，不占用 API 限额；完整性由 blob sha 校验保证
+        base = GITHUB_CONTENT_BASE.format(owner=MARKET_REPO_OWNER, repo=MARKET_REPO_NAME, branch=revision or MARKET_BRANCH)
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120)) as session:
+
+            async def fetch(file: RemoteFile) -> bytes:
+                async with session.get(f"{base}/{remote_path}/{file.path}") as resp:
+                    resp.raise_for_status()
+                    return await resp.read()
+
+            yield fetch
+
+
+class LocalMarketBackend(_IndexedMarketBackend):
+    """
+    本地目录形式的市场仓库（MARKET_SOURCE=file:///path/to/hub），用于离线环境与测试。
+
+    版本为目录内所有文件 (路径, 大小, mtime) 的摘要。
+    """
+
+    def __init__(self, root: str | Path, log_manager, index_path: Path | None = None, ttl: float | None = None):
+        super().__init__(
+            log_manager,
+            index_path or paths.market_index_path,
+            settings.MARKET_INDEX_TTL if ttl is None else ttl,
+        )
+        self.root = Path(root).resolve()
+
+    def _filesystem(self, revision: str | None) -> "AbstractFileSystem":
+        import fsspec
+        from fsspec.implementations.dirfs import DirFileSystem
+
+        return DirFileSystem(path=self.root.as_posix(), fs=fsspec.filesystem("file"))
+
+    def _signature(self) -> str:
+        digest = hashlib.sha256()
+        for dirpath, dirnames, filenames in os.walk(self.root):
+            dirnames.sort()
+            for name in sorted(filenames):
+                path = Path(dirpath, name)
+                stat = path.stat()
+                digest.update(f"{path.relative_to(self.root).as_posix()}\0{stat.st_size}\0{stat.st_mtime_ns}\n".encode())
+        return digest.hexdigest()
+
+    async def _probe(self, index: MarketIndex | None) -> MarketIndex | None:
+        revision = await self._run_fs(self._signature)
+        if index is not None and index.revision == revision:
+            return None
+        return MarketIndex(revision=revision)
+
+    def _walk_files(self, remote_path: str) -> list[RemoteFile]:
+        base = self.root / remote_path
+        if not base.is_dir():
+            return []
+        return [
+            RemoteFile(path=path.relative_to(base).as_posix(), sha=git_blob_sha(path.read_bytes()), size=path.stat().st_size) for path in sorted(base.rglob("*")) if path.is_file()
+        ]
+
+    async def _list_files(self, revision: str | None, remote_path: str) -> list[RemoteFile]:
+        return await self._run_fs(self._walk_files, remote_path)
+
+    @asynccontextmanager
+    async def _open_fetcher(self, revision: str | None, remote_path: str):
+        base = self.root / remote_path
+
+        async def fetch(file: RemoteFile) -> bytes:
+            return await self._run_fs((base / file.path).read_bytes)
+
+        yield fetch
+
+
+def create_market_backend(log_manager, source: str | None = None) -> MarketBackend:
+    """按 MARKET_SOURCE 选择市场后端：file:// 为本地目录，否则为 GitHub。"""
+    source = source if source is not None else settings.MARKET_SOURCE
+    if source and source.startswith("file://"):
+        return LocalMarketBackend(url2pathname(urlparse(source).path), log_manager)
+    return GitHubMarketBackend(log_manager)
+
 
 # 模型相关
 
@@ -1,9 +1,11 @@
 from contextlib import asynccontextmanager
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Response
 from fastapi.middleware.cors import CORSMiddleware
 
+from dingent.core.config import settings
 from dingent.core.context import initialize_app_context
+from dingent.core.metrics import render_metrics
 
 from .api import api_router
 
@@ -43,4 +45,11 @@ def create_app() -> FastAPI:
 
     app.include_router(api_router, prefix="/api/v1")
 
+    if settings.METRICS_ENABLED:
+
+        @app.get("/metrics", include_in_schema=False)
+        def metrics():
+            content, content_type = render_metrics()
+            return Response(content=content, media_type=content_type)
+
     return app
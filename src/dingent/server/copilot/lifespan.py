@@ -1,42 +1,112 @@
-from contextlib import asynccontextmanager
+import asyncio
+from contextlib import AsyncExitStack, asynccontextmanager
 
 from fastapi import FastAPI
-from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
 from sqlmodel import Session
 
 from dingent.core.assistants.assistant_factory import AssistantFactory
-from dingent.core.db.session import engine
+from dingent.core.config import settings
+from dingent.core.db.session import create_db_and_tables, engine
+from dingent.core.llms.analytics_manager import AnalyticsManager
+from dingent.core.llms.usage_ledger import UsageLedger
 from dingent.core.logs.log_manager import LogManager
+from dingent.core.metrics import bind_plugin_manager, instrument_checkpointer
 from dingent.core.paths import paths
 from dingent.core.plugins.market_service import MarketService
 from dingent.core.plugins.plugin_manager import PluginManager
-from dingent.core.plugins.plugin_registry import PluginRegistry
-from dingent.core.workflows.graph_factory import GraphFactory
-from dingent.server.api.schemas import GitHubMarketBackend
+from dingent.core.plugins.plugin_registry import PluginDelta, PluginRegistry
+from dingent.core.tracing import traced
+from dingent.server.api.schemas import create_market_backend
 from dingent.server.services.copilotkit_service import CopilotKitSdk
+from dingent.server.services.overview_service import OverviewService
 from dingent.server.services.plugin_sync_service import PluginSyncService
 
 
 def _setup_global_services(app: FastAPI):
     """初始化核心服务并挂载到 app.state，返回项目根路径"""
 
-    # 1. 基础服务初始化
+    # 1. 基础服务初始化（多 worker 时表结构已由父进程初始化）
+    if settings.DB_INIT_ON_STARTUP:
+        create_db_and_tables()
     log_manager = LogManager()
-    plugin_registry = PluginRegistry(paths.plugins_dir, log_manager)
-    plugin_registry.reload_plugins()
+    # 构造时即完成首次扫描；未变化的插件直接使用持久化的 manifest 缓存
+    plugin_registry = PluginRegistry(paths.plugins_dir, log_manager, cache_path=paths.plugin_manifest_cache_path)
 
-    # 2. 数据库同步 (同步操作)
-    with Session(engine, expire_on_commit=False) as session:
-        PluginSyncService(db_session=session, registry=plugin_registry).sync()
-
-    # 3. 挂载到 App State
+    # 2. 挂载到 App State（插件的数据库同步在 lifespan 中后台进行，不阻塞启动）
     app.state.log_manager = log_manager
     app.state.plugin_registry = plugin_registry
     app.state.plugin_manager = PluginManager(plugin_registry, log_manager)
+    bind_plugin_manager(app.state.plugin_manager)
+
+    # 用量记账：litellm 回调 -> 队列 -> 批量写入明细与日汇总
+    ledger = UsageLedger(engine, batch_size=settings.USAGE_BATCH_SIZE, flush_interval=settings.USAGE_FLUSH_INTERVAL)
+    app.state.analytics_manager = AnalyticsManager(ledger)
 
-    market_backend = GitHubMarketBackend(log_manager)
+    market_backend = create_market_backend(log_manager)
     app.state.market_service = MarketService(paths.plugins_dir, log_manager, market_backend)
     app.state.assistant_factory = AssistantFactory(app.state.plugin_manager, app.state.log_manager)
+    app.state.overview_service = OverviewService(
+        app.state.plugin_manager,
+        log_manager,
+        app.state.market_service,
+        plugins_ttl=settings.OVERVIEW_PLUGINS_TTL,
+        logs_ttl=settings.OVERVIEW_LOGS_TTL,
+        market_ttl=settings.OVERVIEW_MARKET_TTL,
+    )
+
+
+def _sync_plugins(app: FastAPI, ids: set[str] | None = None) -> None:
+    """把注册表同步到数据库；ids 为 None 时全量同步（仍只写入摘要变化的插件）。"""
+    with Session(engine, expire_on_commit=False) as session:
+        PluginSyncService(db_session=session, registry=app.state.plugin_registry).sync(ids=ids)
+
+
+async def _watch_plugins(app: FastAPI) -> None:
+    """插件目录变化时只同步变化的插件，并让总览重新统计。"""
+
+    async def on_change(delta: PluginDelta) -> None:
+        await asyncio.to_thread(_sync_plugins, app, delta.changed_ids)
+        app.state.overview_service.invalidate("plugins", "market")
+
+    await app.state.plugin_registry.watch(on_change)
+
+
+def _import_copilot():
+    # LangGraph / CopilotKit / ag_ui 的导入耗时较长，在线程中完成以免阻塞事件循环
+    from langgraph.checkpoint.sqlite.aio import AsyncSqliteSaver
+
+    from dingent.core.workflows.graph_factory import GraphFactory
+    from dingent.server.copilot import agents  # noqa: F401
+
+    return AsyncSqliteSaver, GraphFactory
+
+
+async def _start_copilot(app: FastAPI, stack: AsyncExitStack) -> CopilotKitSdk:
+    AsyncSqliteSaver, GraphFactory = await asyncio.to_thread(_import_copilot)
+    checkpointer = await stack.enter_async_context(AsyncSqliteSaver.from_conn_string(paths.sqlite_path.as_posix()))
+    # HACK:
+    checkpointer.conn.is_alive = lambda: True
+    # 记录 checkpoint 写入耗时
+    checkpointer.aput = traced("checkpoint.put")(checkpointer.aput)
+    checkpointer.aput_writes = traced("checkpoint.put_writes")(checkpointer.aput_writes)
+    instrument_checkpointer(checkpointer)
+
+    # 初始化 SDK 并挂载
+    sdk = CopilotKitSdk(graph_factory=GraphFactory(app.state.assistant_factory), checkpointer=checkpointer)
+    app.state.copilot_sdk = sdk
+    print("--- CopilotKit Extension Initialized ---")
+    return sdk
+
+
+def _report_failure(log_manager: LogManager, level: str, message: str):
+    """后台任务失败时立即记录：这些任务只在关闭时以 return_exceptions=True 等待，异常不会自行暴露。"""
+
+    def callback(task: asyncio.Task) -> None:
+        if task.cancelled() or task.exception() is None:
+            return
+        log_manager.log_with_context(level, message, context={"error": repr(task.exception())})
+
+    return callback
 
 
 def create_extended_lifespan(original_lifespan):
@@ -49,19 +119,31 @@ def create_extended_lifespan(original_lifespan):
         async with original_lifespan(app):
             # Phase 1: Initialize Core Services
             _setup_global_services(app)
+            app.state.analytics_manager.ledger.start()
+            app.state.analytics_manager.register()
+            app.state.overview_service.start()
+            plugin_sync = asyncio.create_task(asyncio.to_thread(_sync_plugins, app))
+            plugin_sync.add_done_callback(_report_failure(app.state.log_manager, "error", "Startup plugin sync failed; the database may not match the plugin directory"))
+            plugin_watcher = asyncio.create_task(_watch_plugins(app)) if settings.PLUGIN_WATCH_ENABLED else None
 
-            async with AsyncSqliteSaver.from_conn_string(paths.sqlite_path.as_posix()) as checkpointer:
-                # HACK:
-                checkpointer.conn.is_alive = lambda: True
-                # 构建 SDK 需要的 factory
-                graph_factory = GraphFactory(app.state.assistant_factory)
+            # Phase 2: CopilotKit / LangGraph 在后台初始化，不阻塞 /health
+            copilot_stack = AsyncExitStack()
+            app.state.copilot_ready = asyncio.create_task(_start_copilot(app, copilot_stack))
+            app.state.copilot_ready.add_done_callback(_report_failure(app.state.log_manager, "critical", "CopilotKit initialization failed; chat endpoints are unavailable"))
 
-                # 初始化 SDK 并挂载
-                sdk = CopilotKitSdk(graph_factory=graph_factory, checkpointer=checkpointer)
-                app.state.copilot_sdk = sdk
+            yield
 
-                print("--- CopilotKit Extension Initialized ---")
-                yield
-                print("--- CopilotKit Extension Shutdown ---")
+            print("--- CopilotKit Extension Shutdown ---")
+            app.state.copilot_ready.cancel()
+            await asyncio.gather(app.state.copilot_ready, return_exceptions=True)
+            await copilot_stack.aclose()
+            if plugin_watcher is not None:
+                plugin_watcher.cancel()
+                await asyncio.gather(plugin_watcher, return_exceptions=True)
+            await asyncio.gather(plugin_sync, return_exceptions=True)
+            await app.state.overview_service.stop()
+            app.state.analytics_manager.unregister()
+            await app.state.analytics_manager.ledger.stop()
+            app.state.log_manager.close()
 
     return extended_lifespan_manager
@@ -1,4 +1,6 @@
 import os
+import tempfile
+from pathlib import Path
 
 import uvicorn
 
@@ -13,10 +15,17 @@ app.router.lifespan_context = extended_lifespan
 
 
 def start():
-    """Launches the Uvicorn server."""
+    """Launches the Uvicorn server (see `dingent serve` for the full production setup)."""
+    from .workers import prepare_workers
+
     port = int(os.getenv("PORT", "8000"))
+    workers = int(os.getenv("WEB_CONCURRENCY", "1"))
+    # worker 进程继承父进程的环境变量
+    os.environ.update(prepare_workers(workers, Path(tempfile.mkdtemp(prefix="dingent-workers-"))))
     uvicorn.run(
         "dingent.server.main:app",
         host="0.0.0.0",
         port=port,
+        workers=workers,
+        timeout_graceful_shutdown=30,
     )
@@ -1,17 +1,21 @@
 from __future__ import annotations
 
-from typing import Any
+from typing import TYPE_CHECKING, Any
 from uuid import UUID
 
 from fastapi import HTTPException
+from loguru import logger
 from sqlmodel import Session
 
 from dingent.core.db.crud.workflow import list_workflows_by_workspace
 from dingent.core.db.crud.workspace import get_specific_user_workspace, get_workspace_allow_guest
 from dingent.core.db.models import User
-from dingent.core.workflows.graph_factory import GraphFactory
 from dingent.core.workflows.schemas import ExecutableWorkflow
-from dingent.server.copilot.agents import DingLangGraphAGUIAgent
+
+if TYPE_CHECKING:
+    # 两者都会导入 LangGraph / CopilotKit，只在真正构建 Agent 时加载
+    from dingent.core.workflows.graph_factory import GraphFactory
+    from dingent.server.copilot.agents import DingLangGraphAGUIAgent
 
 
 def _truncate(obj: Any, limit: int = 2048) -> Any:
@@ -34,8 +38,16 @@ def _truncate(obj: Any, limit: int = 2048) -> Any:
 
 
 def fake_log_method(type, message: str, **kwargs: Any) -> None:
-    """A placeholder log method that does nothing."""
-    print(type, message, _truncate(kwargs))
+    """
+    Log method handed to graph building.
+
+    Goes through loguru (instead of print) so tool/handoff logs land in the
+    LogManager store and carry the current run's correlation id.
+    """
+    extra = dict(_truncate(kwargs.get("context") or {}))
+    if kwargs.get("correlation_id"):
+        extra["correlation_id"] = kwargs["correlation_id"]
+    logger.opt(depth=1).bind(**extra).log(type.upper(), _truncate(message))
 
 
 class CopilotKitSdk:
@@ -48,8 +60,10 @@ class CopilotKitSdk:
         self.graph_factory = graph_factory
         self.checkpointer = checkpointer
 
-    async def resolve_agent(self, workflow: ExecutableWorkflow, llm) -> DingLangGraphAGUIAgent:
-        graph_artifact = await self.graph_factory.build(workflow, llm, self.checkpointer, fake_log_method)
+    async def resolve_agent(self, workflow: ExecutableWorkflow, llm, assistant_id_map: dict[str, UUID] | None = None) -> DingLangGraphAGUIAgent:
+        from dingent.server.copilot.agents import DingLangGraphAGUIAgent
+
+        graph_artifact = await self.graph_factory.build(workflow, llm, self.checkpointer, fake_log_method, assistant_id_map)
         return DingLangGraphAGUIAgent(
             name=workflow.name,
             description=workflow.description or f"Agent for workflow '{workflow.name}'",
@@ -0,0 +1,199 @@
+import asyncio
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import TYPE_CHECKING, Any
+
+from dingent.core.logs.log_manager import LogManager
+from dingent.core.plugins.plugin_manager import PluginManager
+
+if TYPE_CHECKING:
+    from dingent.core.plugins.market_service import MarketService
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class _Section:
+    """一个可独立刷新的总览分区。"""
+
+    name: str
+    ttl: float
+    loader: Callable[[], Awaitable[dict[str, Any]]]
+    # 返回值变化即视为过期（例如日志总数），None 表示只按 TTL 刷新
+    change_key: Callable[[], Any] | None = None
+
+    value: dict[str, Any] | None = None
+    updated_at: float | None = None
+    stale_at: float = 0.0
+    last_key: Any = None
+    error: str | None = None
+    task: asyncio.Task | None = field(default=None, repr=False)
+
+    def is_due(self, now: float) -> bool:
+        if self.value is None or now >= self.stale_at:
+            return True
+        return self.change_key is not None and self.change_key() != self.last_key
+
+
+class OverviewService:
+    """
+    Dashboard 总览的缓存层。
+
+    每个分区（plugins / logs / market）各自缓存，并按自己的 TTL 在后台刷新；
+    日志分区在日志统计变化时也会提前刷新。`snapshot()` 只读取缓存并按需安排
+    后台刷新，从不等待任何加载器，因此总览接口是 O(1) 的。
+    """
+
+    def __init__(
+        self,
+        plugin_manager: PluginManager,
+        log_manager: LogManager,
+        market_service: "MarketService",
+        plugins_ttl: float = 30.0,
+        logs_ttl: float = 10.0,
+        market_ttl: float = 300.0,
+        recent_logs: int = 20,
+    ):
+        self.plugin_manager = plugin_manager
+        self.log_manager = log_manager
+        self.market_service = market_service
+        self.recent_logs = recent_logs
+        self._sections = {
+            "plugins": _Section("plugins", plugins_ttl, self._load_plugins),
+            "logs": _Section("logs", logs_ttl, self._load_logs, change_key=self._logs_change_key),
+            "market": _Section("market", market_ttl, self._load_market),
+        }
+        self._ticker: asyncio.Task | None = None
+
+    # ------------------------------------------------------------------
+    # Public API
+    # ------------------------------------------------------------------
+    def snapshot(self) -> dict[str, Any]:
+        """返回当前缓存的总览；过期或缺失的分区会在后台刷新，结果留给下一次请求。"""
+        self.refresh_due()
+        result: dict[str, Any] = {"workflows": {}}
+        meta: dict[str, Any] = {}
+        for name, section in self._sections.items():
+            result[name] = section.value
+            meta[name] = {
+                "updated_at": _iso(section.updated_at),
+                "stale_at": _iso(section.stale_at) if section.updated_at else None,
+                "refreshing": section.task is not None and not section.task.done(),
+                "error": section.error,
+            }
+        stale_points = [s.stale_at for s in self._sections.values() if s.updated_at]
+        result["stale_at"] = _iso(min(stale_points)) if stale_points else None
+        result["sections"] = meta
+        return result
+
+    def refresh_due(self) -> None:
+        now = time.time()
+        for section in self._sections.values():
+            if section.is_due(now):
+                self._schedule(section)
+
+    def invalidate(self, *names: str) -> None:
+        """让指定分区（默认全部）在下一次读取时刷新，例如安装 / 删除插件之后。"""
+        for name in names or self._sections:
+            section = self._sections.get(name)
+            if section is not None:
+                section.stale_at = 0.0
+                self._schedule(section)
+
+    async def refresh(self, *names: str) -> None:
+        """立即刷新并等待完成（启动预热 / 测试用）。"""
+        sections = [self._sections[n] for n in names] if names else list(self._sections.values())
+        await asyncio.gather(*(self._refresh(section) for section in sections))
+
+    def start(self, interval: float = 5.0) -> None:
+        """启动后台定时器：即使没有请求，过期分区也会被刷新。"""
+        if self._ticker is None:
+            self._ticker = asyncio.create_task(self._tick(interval))
+
+    async def stop(self) -> None:
+        tasks = [s.task for s in self._sections.values() if s.task is not None]
+        if self._ticker is not None:
+            tasks.append(self._ticker)
+            self._ticker = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    # ------------------------------------------------------------------
+    # Refresh machinery
+    # ------------------------------------------------------------------
+    async def _tick(self, interval: float) -> None:
+        while True:
+            self.refresh_due()
+            await asyncio.sleep(interval)
+
+    def _schedule(self, section: _Section) -> None:
+        # 每个分区同一时间只有一个刷新任务；任务引用保存在分区上，避免被 GC
+        if section.task is not None and not section.task.done():
+            return
+        try:
+            section.task = asyncio.get_running_loop().create_task(self._refresh(section))
+        except RuntimeError:
+            # 没有运行中的事件循环（同步调用场景），留给下一次读取
+            pass
+
+    async def _refresh(self, section: _Section) -> None:
+        key = section.change_key() if section.change_key else None
+        try:
+            section.value = await section.loader()
+            section.error = None
+        except Exception as e:
+            logger.warning("Overview section '%s' refresh failed: %s", section.name, e)
+            section.error = str(e)
+            if section.value is None:
+                section.value = {}
+        now = time.time()
+        section.updated_at = now
+        section.stale_at = now + section.ttl
+        section.last_key = key
+
+    # ------------------------------------------------------------------
+    # Loaders
+    # ------------------------------------------------------------------
+    def _installed_versions(self) -> dict[str, str]:
+        return {m.id: str(m.version) for m in self.plugin_manager.list_visible_plugins()}
+
+    async def _load_plugins(self) -> dict[str, Any]:
+        manifests = self.plugin_manager.list_visible_plugins()
+        items = [
+            {
+                "id": manifest.id,
+                "display_name": manifest.display_name,
+                "version": manifest.version,
+                "tool_count": len(getattr(manifest, "tools", None) or []),
+            }
+            for manifest in manifests
+        ]
+        return {"installed_total": len(manifests), "list": items}
+
+    def _logs_change_key(self) -> Any:
+        stats = self.log_manager.get_log_stats()
+        return stats.get("total_logs"), stats.get("newest_timestamp")
+
+    async def _load_logs(self) -> dict[str, Any]:
+        recent = await asyncio.to_thread(self.log_manager.get_logs, limit=self.recent_logs)
+        return {"recent": [e.to_dict() for e in recent], "stats": self.log_manager.get_log_stats()}
+
+    async def _load_market(self) -> dict[str, Any]:
+        # dingent.server.api 的包初始化会加载全部路由（其中包括本模块），因此在调用时再导入
+        from dingent.server.api.schemas import MarketItemCategory
+
+        metadata = await self.market_service.get_market_metadata()
+        installed = [{"registry_id": pid, "version": ver} for pid, ver in self._installed_versions().items()]
+        items = await self.market_service.get_market_items(MarketItemCategory.PLUGIN, installed_plugins=installed)
+        return {
+            "metadata": metadata.model_dump(),
+            "plugin_updates": sum(1 for item in items if item.update_available),
+        }
+
+
+def _iso(ts: float | None) -> str | None:
+    return datetime.fromtimestamp(ts).astimezone().isoformat() if ts else None
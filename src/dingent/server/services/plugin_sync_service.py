@@ -1,6 +1,12 @@
+import hashlib
+import json
 import logging
+import threading
 from typing import Any
+from uuid import uuid4
 
+from sqlalchemy import insert, update
+from sqlalchemy.exc import IntegrityError
 from sqlmodel import Session, select
 
 from dingent.core.db.models import Plugin
@@ -9,110 +15,109 @@ from dingent.core.plugins.schemas import PluginManifest
 
 logger = logging.getLogger(__name__)
 
+# 启动时的全量同步、插件目录监听和市场安装可能同时触发同步；同一进程内串行执行
+_sync_lock = threading.Lock()
+
+
+def manifest_hash(manifest: PluginManifest) -> str:
+    """参与同步的 manifest 字段的摘要；与数据库中 Plugin.schema_hash 相同即无需比较和写入。"""
+    payload = {
+        "display_name": manifest.display_name,
+        "description": manifest.description,
+        "version": str(manifest.version),
+        "config_schema": [c.model_dump() for c in manifest.config_schema] if manifest.config_schema else [],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode()).hexdigest()
+
 
 class PluginSyncService:
     """
     负责将文件系统中的插件状态 (通过 PluginRegistry 获取) 同步到数据库。
     并负责将自定义的配置字段列表转换为标准的 JSON Schema 存储。
+
+    每行记录保存 manifest 摘要（schema_hash）：摘要未变的插件既不转换 Schema 也不写库，
+    新增与更新分别用一条批量语句完成。
     """
 
     def __init__(self, db_session: Session, registry: PluginRegistry):
         self.db = db_session
         self.registry = registry
 
-    def sync(self) -> None:
-        """
-        执行完整的同步过程：新增、更新和删除。
+    def sync(self, ids: set[str] | None = None) -> dict[str, int]:
         """
-        logger.info("Starting database synchronization for plugins...")
+        执行同步过程：新增、更新和删除。
 
+        Args:
+            ids: 只同步这些插件 ID（例如注册表扫描得到的变化）；None 表示全量同步。
+
+        Returns:
+            新增 / 更新 / 删除的插件数量。
+        """
+        with _sync_lock:
+            try:
+                return self._sync(ids)
+            except IntegrityError:
+                # 另一个 worker 进程在读取与写入之间插入了相同的 registry_id：回滚后按最新状态重新计算差异
+                self.db.rollback()
+                logger.info("Plugin rows were inserted concurrently; retrying synchronization.")
+                return self._sync(ids)
+
+    def _sync(self, ids: set[str] | None) -> dict[str, int]:
         # 1. 获取期望状态 (Filesystem)
-        fs_manifests = self.registry.get_all_manifests()
-        fs_manifests_map: dict[str, PluginManifest] = {m.id: m for m in fs_manifests}
+        fs_map: dict[str, PluginManifest] = {m.id: m for m in self.registry.get_all_manifests() if ids is None or m.id in ids}
 
-        # 2. 获取当前状态 (Database)
-        db_plugins = self.db.exec(select(Plugin)).all()
-        db_plugins_map: dict[str, Plugin] = {p.registry_id: p for p in db_plugins}
+        # 2. 获取当前状态 (Database)：只读取主键与摘要
+        statement = select(Plugin.id, Plugin.registry_id, Plugin.schema_hash)
+        if ids is not None:
+            statement = statement.where(Plugin.registry_id.in_(sorted(ids)))
+        db_rows = {registry_id: (pk, digest) for pk, registry_id, digest in self.db.exec(statement).all()}
 
-        # 3. 同步处理
-        self._process_upserts(fs_manifests_map, db_plugins_map)
-        self._process_deletes(fs_manifests_map, db_plugins_map)
+        # 3. 计算差异
+        inserts: list[dict[str, Any]] = []
+        updates: list[dict[str, Any]] = []
+        for slug, manifest in fs_map.items():
+            digest = manifest_hash(manifest)
+            row = db_rows.get(slug)
+            if row is None:
+                inserts.append({"id": uuid4(), "registry_id": slug, "registry_name": "Local", **self._plugin_values(manifest, digest)})
+            elif row[1] != digest:
+                updates.append({"id": row[0], **self._plugin_values(manifest, digest)})
+        deleted = [slug for slug in db_rows if slug not in fs_map]
+
+        # 4. 批量写入
+        if inserts:
+            logger.info(f"New plugins found: {sorted(r['registry_id'] for r in inserts)}. Adding to database.")
+            self.db.execute(insert(Plugin), inserts)
+        if updates:
+            logger.info(f"Plugins changed on disk: {len(updates)}. Updating DB.")
+            self.db.execute(update(Plugin), updates)
+        if deleted:
+            self._process_deletes(deleted)
 
-        # 4. 提交事务
         self.db.commit()
-        logger.info("Plugin database synchronization complete.")
+        summary = {"inserted": len(inserts), "updated": len(updates), "deleted": len(deleted)}
+        logger.info(f"Plugin database synchronization complete: {summary}")
+        return summary
 
     # --------------------------------------------------------------------------
     # 核心逻辑流程
     # --------------------------------------------------------------------------
 
-    def _process_upserts(self, fs_map: dict[str, PluginManifest], db_map: dict[str, Plugin]):
-        """处理新增 (Insert) 和 更新 (Update)"""
-        for slug, manifest in fs_map.items():
-            db_plugin = db_map.get(slug)
-
-            # 预先计算标准的 JSON Schema，用于后续对比和赋值
-            # 假设 manifest.config_schema 是 Pydantic 模型列表
-            raw_fields = [c.model_dump() for c in manifest.config_schema] if manifest.config_schema else []
-            standard_schema = self._convert_to_json_schema(raw_fields)
-
-            if not db_plugin:
-                self._create_plugin(slug, manifest, standard_schema)
-            else:
-                self._update_plugin_if_needed(db_plugin, manifest, standard_schema)
-
-    def _process_deletes(self, fs_map: dict[str, PluginManifest], db_map: dict[str, Plugin]):
-        """处理删除 (Delete)"""
-        fs_slugs = set(fs_map.keys())
-        db_slugs = set(db_map.keys())
-        slugs_to_delete = db_slugs - fs_slugs
-
-        for slug in slugs_to_delete:
-            self._delete_plugin(db_map[slug])
-
-    # --------------------------------------------------------------------------
-    # CRUD 操作细节
-    # --------------------------------------------------------------------------
-
-    def _create_plugin(self, slug: str, manifest: PluginManifest, schema: dict[str, Any]):
-        """在数据库中创建新插件"""
-        logger.info(f"New plugin found: '{slug}'. Adding to database.")
-        new_plugin = Plugin(
-            registry_id=slug,
-            display_name=manifest.display_name,
-            description=manifest.description,
-            version=str(manifest.version),
-            config_schema=schema,  # 存储转换后的标准 Schema
-        )
-        self.db.add(new_plugin)
-
-    def _update_plugin_if_needed(self, db_plugin: Plugin, manifest: PluginManifest, new_schema: dict[str, Any]):
-        """检查并更新已存在的插件"""
-        updates = {}
-
-        # 检查基础字段变化
-        if db_plugin.version != str(manifest.version):
-            updates["version"] = str(manifest.version)
-        if db_plugin.description != manifest.description:
-            updates["description"] = manifest.description
-        if db_plugin.display_name != manifest.display_name:
-            updates["display_name"] = manifest.display_name
-
-        # [关键] 检查 Schema 是否变化
-        # 直接比较字典内容，如果开发者修改了配置定义，这里会触发更新
-        if db_plugin.config_schema != new_schema:
-            updates["config_schema"] = new_schema
+    def _plugin_values(self, manifest: PluginManifest, digest: str) -> dict[str, Any]:
+        raw_fields = [c.model_dump() for c in manifest.config_schema] if manifest.config_schema else []
+        return {
+            "display_name": manifest.display_name,
+            "description": manifest.description,
+            "version": str(manifest.version),
+            "config_schema": self._convert_to_json_schema(raw_fields),  # 存储转换后的标准 Schema
+            "schema_hash": digest,
+        }
 
-        if updates:
-            logger.info(f"Plugin '{db_plugin.registry_id}' has updates ({', '.join(updates.keys())}). Updating DB.")
-            for k, v in updates.items():
-                setattr(db_plugin, k, v)
-            self.db.add(db_plugin)
-
-    def _delete_plugin(self, db_plugin: Plugin):
-        """从数据库删除插件"""
-        logger.info(f"Plugin '{db_plugin.registry_id}' removed from filesystem. Deleting from database.")
-        self.db.delete(db_plugin)
+    def _process_deletes(self, slugs: list[str]):
+        """处理删除 (Delete)：逐条走 ORM，以便级联删除 AssistantPluginLink"""
+        for db_plugin in self.db.exec(select(Plugin).where(Plugin.registry_id.in_(slugs))).all():
+            logger.info(f"Plugin '{db_plugin.registry_id}' removed from filesystem. Deleting from database.")
+            self.db.delete(db_plugin)
 
     # --------------------------------------------------------------------------
     # Schema 转换工具 (核心改进)
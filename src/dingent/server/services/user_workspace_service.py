@@ -4,6 +4,7 @@ from fastapi import HTTPException
 from sqlmodel import Session, col, func, select
 
 from dingent.core.db.models import User, Workspace, WorkspaceMember
+from dingent.core.llms.resolver import invalidate_model_cache
 from dingent.core.types import WorkspaceRole
 from dingent.core.workspaces.schemas import WorkspaceCreate, WorkspaceInvite, WorkspaceMemberRead, WorkspaceRead, WorkspaceUpdate
 
@@ -122,6 +123,8 @@ class UserWorkspaceService:
         self.session.add(workspace)
         self.session.commit()
         self.session.refresh(workspace)
+        if payload.default_model_config_id is not None:
+            invalidate_model_cache()
 
         return self.get_workspace(slug)
 
@@ -9,6 +9,7 @@ from dingent.core.assistants.assistant_factory import AssistantFactory
 from dingent.core.assistants.schemas import AssistantCreate, AssistantRead, AssistantUpdate, PluginUpdateOnAssistant
 from dingent.core.db.crud import assistant as crud_assistant
 from dingent.core.db.models import Assistant
+from dingent.core.llms.resolver import invalidate_model_cache
 
 from .converters import _build_assistant_read
 
@@ -194,6 +195,8 @@ class WorkspaceAssistantService:
         # 4. 清除旧的缓存，因为配置可能已更改
         if assistant_id in self._runtimes:
             del self._runtimes[assistant_id]
+        if "model_config_id" in assistant_in.model_fields_set:
+            invalidate_model_cache()
 
         # 5. 尝试用新配置创建运行时实例
         runtime_assistant = None
@@ -9,6 +9,7 @@ from sqlmodel import Session, select
 
 from dingent.core.db.crud import workflow as crud_workflow
 from dingent.core.db.models import Workflow, WorkflowNode
+from dingent.core.llms.resolver import invalidate_model_cache
 from dingent.core.workflows.schemas import WorkflowCreate, WorkflowEdgeRead, WorkflowNodeCreate, WorkflowNodeRead, WorkflowRead, WorkflowReadBasic, WorkflowReplace, WorkflowUpdate
 from dingent.server.services.workspace_assistant_service import WorkspaceAssistantService
 
@@ -93,7 +94,8 @@ class WorkspaceWorkflowService:
             if crud_workflow.get_workflow_by_name(self.session, name=wf_create.name, workspace_id=self.workspace_id):
                 raise ValueError(f"Another workflow already uses the name '{wf_create.name}'.")
 
-        crud_workflow.replace_workflow(self.session, db_workflow=wf, wf_create=wf_create)
+        # 编辑器回传的节点 id 即数据库 id，使用 diff 模式只写入有变化的节点和边
+        crud_workflow.replace_workflow(self.session, db_workflow=wf, wf_create=wf_create, diff=True)
 
     def update_workflow(self, workflow_id: UUID, wf_update: WorkflowUpdate) -> WorkflowReadBasic:
         self._ensure_write_access()
@@ -107,6 +109,8 @@ class WorkspaceWorkflowService:
                 raise ValueError(f"Another workflow already uses the name '{wf_update.name}'.")
 
         updated = crud_workflow.update_workflow(self.session, db_workflow=wf, wf_update=wf_update)
+        if "model_config_id" in wf_update.model_fields_set:
+            invalidate_model_cache()
         return WorkflowReadBasic.model_validate(updated)
 
     def delete_workflow(self, workflow_id: UUID) -> bool:
@@ -0,0 +1,54 @@
+"""
+Preparation for running the backend in several worker processes.
+
+Every uvicorn worker is a separate process with its own copy of the
+process-local state. `prepare_workers` runs once in the parent, before the
+workers are spawned: it initializes the database schema (so the workers do
+not race on CREATE / ALTER TABLE and the default roles), refuses settings that
+silently stop working across processes, and returns the environment the
+workers need.
+
+What stays per worker:
+  - model resolution cache: edits made through another worker take effect
+    after `MODEL_CACHE_TTL_SECONDS`;
+  - log live tail (SSE): only shows the entries of the worker serving it; the
+    log store itself is shared (each worker writes it from its own writer
+    thread, so logging never waits on another worker's batch) and its
+    statistics are re-aggregated from it;
+  - /metrics: counters and histograms are aggregated over all workers
+    (prometheus multiprocess mode), DB pool and plugin runtime gauges are
+    those of the worker answering the scrape.
+"""
+
+from pathlib import Path
+
+from dingent.core.config import settings
+from dingent.core.db.session import create_db_and_tables
+
+
+class WorkerConfigError(ValueError):
+    """Settings that cannot work with more than one worker process."""
+
+
+def prepare_workers(workers: int, state_dir: Path) -> dict[str, str]:
+    """
+    在父进程中完成多 worker 启动前的准备，返回需要传给 worker 的环境变量。
+
+    Args:
+        workers: Number of worker processes
+        state_dir: Empty directory that lives as long as the workers (prometheus multiprocess files)
+    """
+    if workers > 1 and settings.RATE_LIMIT_ENABLED and settings.RATE_LIMIT_BACKEND != "sqlite":
+        # 进程内令牌桶在每个 worker 中各有一份，实际限额会放大为 N 倍
+        raise WorkerConfigError(
+            f"RATE_LIMIT_BACKEND={settings.RATE_LIMIT_BACKEND!r} is per process; set RATE_LIMIT_BACKEND=sqlite (or RATE_LIMIT_ENABLED=false) to run {workers} workers"
+        )
+
+    create_db_and_tables()
+    env = {"DB_INIT_ON_STARTUP": "false"}
+    if workers > 1:
+        metrics_dir = state_dir / "prometheus"
+        metrics_dir.mkdir(parents=True, exist_ok=True)
+        env["PROMETHEUS_MULTIPROC_DIR"] = str(metrics_dir)
+        env["LOG_SHARED_STORE"] = "true"
+    return env
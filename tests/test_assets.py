@@ -0,0 +1,59 @@
+"""
+Tests for the fingerprinted, incremental runtime asset extraction.
+"""
+
+import io
+import os
+import tarfile
+
+import pytest
+
+from dingent.cli import assets
+from dingent.cli.assets import AssetManager
+
+
+def _build_tar(path, files: dict[str, bytes], mtime=1_700_000_000):
+    with tarfile.open(path, "w:gz") as tar:
+        for name, data in files.items():
+            info = tarfile.TarInfo(name)
+            info.size = len(data)
+            info.mtime = mtime
+            info.mode = 0o755 if name == "node" else 0o644
+            tar.addfile(info, io.BytesIO(data))
+
+
+@pytest.mark.skipif(os.name == "nt", reason="symlink swap needs POSIX symlinks")
+def test_fast_path_incremental_extraction_and_swap(tmp_path, monkeypatch):
+    source = tmp_path / "runtime.tar.gz"
+    runtime = tmp_path / "runtime"
+    runtime.mkdir()
+    (runtime / "ratelimit.sqlite").write_bytes(b"keep me")
+    (runtime / "version.hash").write_text("legacy")
+    _build_tar(source, {"node": b"#!node v1", "frontend/server.js": b"v1", "frontend/static/app.js": b"big bundle"})
+    manager = AssetManager(runtime_dir=runtime, source_tar=source)
+
+    first = manager.prepare()
+    assert first["frontend_dir"] == runtime / "current" / "frontend"
+    assert (first["frontend_dir"] / "server.js").read_bytes() == b"v1"
+    assert os.access(first["node_bin"], os.X_OK)
+    assert not (runtime / "version.hash").exists()
+    assert (runtime / "ratelimit.sqlite").read_bytes() == b"keep me"
+    old_version = os.readlink(runtime / "current")
+
+    # 压缩包未变化：只 stat，不计算摘要
+    def fail(_path):
+        raise AssertionError("archive should not be hashed")
+
+    monkeypatch.setattr(assets, "_file_sha256", fail)
+    assert manager.prepare() == first
+    monkeypatch.undo()
+
+    static_inode = (runtime / "current" / "frontend/static/app.js").stat().st_ino
+    _build_tar(source, {"node": b"#!node v1", "frontend/server.js": b"v2", "frontend/static/app.js": b"big bundle"})
+    second = manager.prepare()
+
+    assert os.readlink(runtime / "current") != old_version
+    assert (second["frontend_dir"] / "server.js").read_bytes() == b"v2"
+    # 未变化的文件从上一版本硬链接复用，没有重新写入
+    assert (second["frontend_dir"] / "static/app.js").stat().st_ino == static_inode
+    assert sorted(p.name for p in (runtime / "versions").iterdir()) == sorted([os.path.basename(old_version), os.readlink(runtime / "current").split("/")[-1]])
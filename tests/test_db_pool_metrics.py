@@ -0,0 +1,32 @@
+"""
+Tests for the instrumented connection pool used by the application engine.
+"""
+
+import threading
+import time
+
+from sqlalchemy import create_engine, text
+
+from dingent.core.db.pool import InstrumentedQueuePool, pool_metrics
+
+
+def test_checkout_waits_are_counted(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=InstrumentedQueuePool, pool_size=1, max_overflow=0, pool_timeout=5)
+    pool_metrics.reset()
+
+    def work():
+        with engine.connect() as conn:
+            conn.execute(text("SELECT 1"))
+            time.sleep(0.05)
+
+    threads = [threading.Thread(target=work) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    snapshot = pool_metrics.snapshot()
+    assert snapshot["checkouts"] == 3
+    assert snapshot["waits"] == 2
+    assert snapshot["checkout_ms_max"] >= snapshot["checkout_ms_p50"] > 0
+    engine.dispose()
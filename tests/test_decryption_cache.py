@@ -0,0 +1,43 @@
+"""
+Tests for the bounded decryption cache used by `UserSecretManager`.
+"""
+
+from dingent.core.security.crypto import DecryptionCache
+
+
+def test_lru_eviction_zeroises_plaintext():
+    cache = DecryptionCache(max_entries=2, ttl_seconds=60)
+    cache.put("token-a", "secret-a")
+    evicted_buf = next(iter(cache._entries.values()))[1]
+    cache.put("token-b", "secret-b")
+    cache.put("token-c", "secret-c")
+
+    assert len(cache) == 2
+    assert cache.get("token-a") is None
+    assert cache.get("token-c") == "secret-c"
+    assert evicted_buf == bytearray(len("secret-a"))
+
+
+def test_ttl_expiry_and_clear(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("dingent.core.security.crypto.time.monotonic", lambda: now[0])
+    cache = DecryptionCache(max_entries=10, ttl_seconds=5)
+    cache.put("token", "secret")
+    assert cache.get("token") == "secret"
+
+    now[0] += 10
+    assert cache.get("token") is None
+    assert len(cache) == 0
+
+    cache.put("token", "secret")
+    buf = next(iter(cache._entries.values()))[1]
+    cache.clear()
+    assert len(cache) == 0
+    assert buf == bytearray(len("secret"))
+
+
+def test_disabled_cache_stores_nothing():
+    cache = DecryptionCache(max_entries=0)
+    cache.put("token", "secret")
+    assert cache.get("token") is None
+    assert len(cache) == 0
@@ -0,0 +1,51 @@
+"""
+Tests for the CLI output multiplexer used by `dingent run`.
+"""
+
+import asyncio
+import io
+import json
+
+import pytest
+
+from dingent.cli.log_mux import OutputMultiplexer
+
+
+def _reader(*chunks: bytes) -> asyncio.StreamReader:
+    reader = asyncio.StreamReader()
+    for chunk in chunks:
+        reader.feed_data(chunk)
+    reader.feed_eof()
+    return reader
+
+
+@pytest.mark.asyncio
+async def test_chunks_are_split_into_lines_and_written_as_json():
+    out = io.StringIO()
+    mux = OutputMultiplexer(json_lines=True, out=out)
+    mux.start()
+    mux.message("[green]✓ backend started[/green]")
+    seen = []
+    await mux.pump("backend", "magenta", _reader(b"first li", b"ne\r\nsecond [bold]line[/bold]\nno newline"), on_line=seen.append)
+    await mux.close()
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert records[0]["event"] == "✓ backend started"
+    assert [r["message"] for r in records[1:]] == ["first line", "second [bold]line[/bold]", "no newline"]
+    assert {r["service"] for r in records[1:]} == {"backend"}
+    assert seen == ["first line", "second [bold]line[/bold]", "no newline"]
+
+
+@pytest.mark.asyncio
+async def test_overload_drops_lines_and_reports_a_summary():
+    out = io.StringIO()
+    mux = OutputMultiplexer(json_lines=True, out=out, max_pending=3)
+    # 未启动渲染循环：模拟渲染跟不上输出
+    await mux.pump("backend", "magenta", _reader(b"".join(f"line {i}\n".encode() for i in range(10))))
+    mux.message("status messages are never dropped")
+    await mux.close()
+
+    records = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert [r.get("message") for r in records[:3]] == ["line 0", "line 1", "line 2"]
+    assert records[3]["event"] == "status messages are never dropped"
+    assert records[4] == {"ts": records[4]["ts"], "service": "backend", "dropped": 7}
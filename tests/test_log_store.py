@@ -0,0 +1,189 @@
+"""
+Tests for the SQLite-backed `LogManager` store.
+"""
+
+import asyncio
+import sqlite3
+import threading
+import time
+from datetime import datetime, timedelta
+
+import pytest
+from loguru import logger
+
+from dingent.core.logs.correlation import correlation_scope
+from dingent.core.logs.log_manager import LogManager
+from dingent.core.logs.log_store import LogStore
+
+
+@pytest.fixture
+def log_manager():
+    manager = LogManager(max_logs=50, db_path=":memory:", retention_days=0)
+    manager._store.prune_every = 10
+    yield manager
+    manager.close()
+
+
+def test_filters_search_and_pagination(log_manager: LogManager):
+    for i in range(30):
+        log_manager.log_with_context("info" if i % 3 else "error", f"request {i} finished", correlation_id=f"run-{i % 2}")
+
+    errors = log_manager.get_logs(level="error")
+    assert len(errors) == 10
+    assert all(e.level == "ERROR" for e in errors)
+
+    assert [e.message for e in log_manager.get_logs(search="REQUEST 29")] == ["request 29 finished"]
+    assert len(log_manager.get_logs(correlation_id="run-1")) == 15
+    assert log_manager.get_logs(module="test_log")[0].module == "test_log_store"
+
+    first_page = log_manager.get_logs(limit=10)
+    second_page = log_manager.get_logs(limit=10, before_id=first_page[-1].id)
+    assert first_page[0].message == "request 29 finished"
+    assert second_page[0].id == first_page[-1].id - 1
+
+    recent = log_manager.get_logs(since=datetime.now().astimezone() - timedelta(minutes=1))
+    assert len(recent) == 30
+
+
+def test_retention_and_stats(log_manager: LogManager):
+    for i in range(120):
+        logger.warning("noise {}", i)
+    # 清理由写入线程完成
+    log_manager._store.flush()
+
+    stats = log_manager.get_log_stats()
+    assert stats["total_logs"] <= 60
+    assert stats["by_level"] == {"WARNING": stats["total_logs"]}
+    assert log_manager.get_logs(limit=1)[0].message == "noise 119"
+
+    log_manager.clear_logs()
+    assert log_manager.get_log_stats()["total_logs"] == 0
+
+
+@pytest.mark.asyncio
+async def test_live_tail_filters_and_drops_overflow(log_manager: LogManager):
+    subscription = log_manager.subscribe(level="error", max_queue=2)
+
+    def emit():
+        for i in range(5):
+            logger.error("boom {}", i)
+            logger.info("ignored {}", i)
+
+    thread = threading.Thread(target=emit)
+    thread.start()
+    thread.join()
+    await asyncio.sleep(0)
+
+    received = [subscription.queue.get_nowait().message for _ in range(subscription.queue.qsize())]
+    assert received == ["boom 0", "boom 1"]
+    assert subscription.dropped == 3
+
+    log_manager.unsubscribe(subscription)
+    logger.error("after unsubscribe")
+    await asyncio.sleep(0)
+    assert subscription.queue.empty()
+
+
+def test_incremental_stats_track_pruning_and_reload(tmp_path):
+    db_path = tmp_path / "logs.sqlite"
+    manager = LogManager(max_logs=20, db_path=db_path, retention_days=0)
+    manager._store.prune_every = 5
+    for i in range(33):
+        (logger.error if i % 2 else logger.info)("event {}", i)
+    manager._store.flush()
+
+    stats = manager.get_log_stats()
+    assert stats["total_logs"] == manager._store.count()
+    assert sum(stats["by_level"].values()) == stats["total_logs"]
+    rate = manager.get_log_rate("minute")
+    assert sum(bucket["total"] for bucket in rate) == stats["total_logs"]
+    manager.close()
+
+    reopened = LogManager(db_path=db_path, retention_days=0)
+    assert reopened.get_log_stats() == stats
+    assert sum(bucket["total"] for bucket in reopened.get_log_rate("hour")) == stats["total_logs"]
+    reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_correlation_id_flows_into_log_records(log_manager: LogManager):
+    async def tool_call():
+        logger.info("tool call finished")
+
+    with correlation_scope("run-42"):
+        logger.info("run started")
+        await asyncio.create_task(tool_call())
+    logger.info("outside any run")
+
+    entries = log_manager.get_logs(correlation_id="run-42")
+    assert [e.message for e in entries] == ["tool call finished", "run started"]
+    assert log_manager.get_logs(limit=1)[0].correlation_id is None
+
+
+def test_append_never_waits_for_another_writer(tmp_path):
+    db_path = tmp_path / "logs.sqlite"
+    now = datetime.now().astimezone()
+    first = LogStore(db_path)
+    second = LogStore(db_path)
+    # 另一个进程正持有写锁
+    holder = sqlite3.connect(db_path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        for i in range(50):
+            first.append(now, "INFO", "worker_a", "f", f"from first {i}", None, None)
+            second.append(now, "INFO", "worker_b", "f", f"from second {i}", None, None)
+        assert time.monotonic() - started < 0.5
+
+        holder.execute("COMMIT")
+        first.flush()
+        second.flush()
+        reader = sqlite3.connect(db_path)
+        counts = dict(reader.execute("SELECT module, COUNT(*) FROM logs GROUP BY module").fetchall())
+        reader.close()
+        assert counts == {"worker_a": 50, "worker_b": 50}
+        assert first.dropped == second.dropped == 0
+    finally:
+        holder.close()
+        first.close()
+        second.close()
+
+
+def test_shared_store_stats_include_other_writers(tmp_path, monkeypatch):
+    from dingent.core.logs import log_manager as log_manager_module
+
+    monkeypatch.setattr(log_manager_module, "_SHARED_STATS_REFRESH_SECONDS", 0)
+    db_path = tmp_path / "logs.sqlite"
+    manager = LogManager(db_path=db_path, retention_days=0, shared_store=True)
+    other_worker = LogStore(db_path)
+    try:
+        other_worker.append(datetime.now().astimezone(), "ERROR", "worker_b", "f", "from another worker", None, None)
+        other_worker.flush()
+        assert manager.get_log_stats()["by_level"].get("ERROR") == 1
+    finally:
+        other_worker.close()
+        manager.close()
+
+
+def test_workers_sharing_a_log_store_do_not_block_each_other(tmp_path):
+    db_path = tmp_path / "logs.sqlite"
+    manager = LogManager(db_path=db_path, retention_days=0, shared_store=True)
+    other_worker = LogStore(db_path)
+    # 另一个 worker 正在写入一个批次
+    holder = sqlite3.connect(db_path, isolation_level=None)
+    holder.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.monotonic()
+        for i in range(20):
+            logger.info("handled request {}", i)
+            other_worker.append(datetime.now().astimezone(), "INFO", "worker_b", "f", f"other {i}", None, None)
+        assert time.monotonic() - started < 0.5
+
+        holder.execute("COMMIT")
+        other_worker.flush()
+        assert len(manager.get_logs(search="handled request")) == 20
+        assert len(manager.get_logs(module="worker_b")) == 20
+    finally:
+        holder.close()
+        other_worker.close()
+        manager.close()
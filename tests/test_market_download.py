@@ -0,0 +1,57 @@
+"""
+Tests for staged, checksum-verified market downloads.
+"""
+
+import pytest
+
+from dingent.core.plugins.market_download import STAGING_DIR_NAME, BlobCache, ChecksumError, RemoteFile, git_blob_sha, install_files
+
+FILES = {"plugin.toml": b'[plugin]\nname = "demo"\n', "src/main.py": b"print('hi')\n"}
+
+
+def _remote_files():
+    return [RemoteFile(path=path, sha=git_blob_sha(data)) for path, data in FILES.items()]
+
+
+@pytest.mark.asyncio
+async def test_install_replaces_existing_directory(tmp_path):
+    plugins = tmp_path / "plugins"
+    (plugins / "demo").mkdir(parents=True)
+    (plugins / "demo" / "stale.txt").write_text("old")
+
+    async def fetch(file):
+        return FILES[file.path]
+
+    installed = await install_files(_remote_files(), fetch, plugins / "demo", BlobCache(tmp_path / "blobs"))
+
+    assert sorted(p.relative_to(installed).as_posix() for p in installed.rglob("*") if p.is_file()) == ["plugin.toml", "src/main.py"]
+    assert list((plugins / STAGING_DIR_NAME).iterdir()) == []
+
+
+@pytest.mark.asyncio
+async def test_failed_download_keeps_old_version_and_resumes(tmp_path):
+    plugins = tmp_path / "plugins"
+    (plugins / "demo").mkdir(parents=True)
+    (plugins / "demo" / "plugin.toml").write_text("old")
+    cache = BlobCache(tmp_path / "blobs")
+    fetched = []
+
+    async def corrupt_main(file):
+        fetched.append(file.path)
+        return b"tampered" if file.path == "src/main.py" else FILES[file.path]
+
+    with pytest.raises(ChecksumError):
+        await install_files(_remote_files(), corrupt_main, plugins / "demo", cache, concurrency=1)
+    assert (plugins / "demo" / "plugin.toml").read_text() == "old"
+    assert list((plugins / STAGING_DIR_NAME).iterdir()) == []
+
+    # 重试时只下载上次未成功的文件
+    fetched.clear()
+
+    async def fetch(file):
+        fetched.append(file.path)
+        return FILES[file.path]
+
+    await install_files(_remote_files(), fetch, plugins / "demo", cache)
+    assert fetched == ["src/main.py"]
+    assert (plugins / "demo" / "src" / "main.py").read_bytes() == FILES["src/main.py"]
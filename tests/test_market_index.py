@@ -0,0 +1,95 @@
+"""
+Tests for the local market index snapshot and the file:// market backend.
+"""
+
+import pytest
+
+from dingent.core.plugins.market_index import MarketIndex
+
+
+class _FakeLogManager:
+    def log_with_context(self, *args, **kwargs):
+        pass
+
+
+def _make_hub(root):
+    root.mkdir()
+    (root / "market.json").write_text('{"version": "1.0.0", "updated_at": "2025-01-01", "categories": {"plugin": 2}}')
+    for item_id, version, desc in (("weather", "1.2.0", "Weather forecast tools"), ("sql-tools", "0.3.0", "Query databases")):
+        item = root / "plugins" / item_id
+        item.mkdir(parents=True)
+        (item / "plugin.toml").write_text(f'[plugin]\nname = "{item_id}"\nversion = "{version}"\ndescription = "{desc}"\ntags = ["demo"]\n')
+        (item / "README.md").write_text(f"# {item_id}")
+
+
+def test_index_roundtrip_and_search(tmp_path):
+    path = tmp_path / "index.json"
+    index = MarketIndex(
+        revision="abc",
+        etag='"e1"',
+        items=[
+            {"id": "weather", "category": "plugin", "name": "Weather", "description": "Forecasts", "tags": ["api"]},
+            {"id": "writer", "category": "assistant", "name": "Writer", "description": "Drafts text", "tags": []},
+        ],
+    )
+    index.save(path)
+
+    loaded = MarketIndex.load(path)
+    assert loaded == index
+    assert [e["id"] for e in loaded.entries(["plugin"])] == ["weather"]
+    assert [e["id"] for e in loaded.entries(query="API forecasts")] == ["weather"]
+    assert loaded.entries(query="weather drafts") == []
+
+    path.write_text("{broken")
+    assert MarketIndex.load(path) is None
+
+
+@pytest.mark.asyncio
+async def test_local_backend_serves_from_snapshot(tmp_path):
+    from dingent.server.api.schemas import LocalMarketBackend, MarketItemCategory
+
+    hub = tmp_path / "hub"
+    _make_hub(hub)
+    index_path = tmp_path / "cache" / "index.json"
+    backend = LocalMarketBackend(hub, _FakeLogManager(), index_path=index_path, ttl=0)
+
+    items = await backend.list_items(MarketItemCategory.PLUGIN)
+    assert {item.id for item in items} == {"weather", "sql-tools"}
+    assert not any(item.is_installed for item in items)
+    assert (await backend.get_metadata()).categories == {"plugin": 2}
+    assert [i.id for i in await backend.list_items(MarketItemCategory.ALL, query="databases")] == ["sql-tools"]
+    assert await backend.get_readme("weather", MarketItemCategory.PLUGIN) == "# weather"
+    installed = await backend.download_item("weather", MarketItemCategory.PLUGIN, tmp_path / "plugins")
+    assert installed == tmp_path / "plugins" / "weather" and (installed / "plugin.toml").is_file()
+
+    # 未变化的仓库不会重建快照；新增条目后下一次读取即可看到
+    revision = MarketIndex.load(index_path).revision
+    await backend.list_items(MarketItemCategory.PLUGIN)
+    assert MarketIndex.load(index_path).revision == revision
+    (hub / "plugins" / "maps").mkdir()
+    (hub / "plugins" / "maps" / "plugin.toml").write_text('[plugin]\nname = "maps"\nversion = "0.1.0"\n')
+    assert len(await backend.list_items(MarketItemCategory.PLUGIN)) == 3
+
+    # 离线：一个新的后端实例直接从磁盘快照提供列表
+    offline = LocalMarketBackend(tmp_path / "missing", _FakeLogManager(), index_path=index_path, ttl=3600)
+    assert len(await offline.list_items(MarketItemCategory.PLUGIN)) == 3
+
+
+@pytest.mark.asyncio
+async def test_service_overlays_installed_state_without_touching_catalogue(tmp_path):
+    from dingent.core.plugins.market_service import MarketService
+    from dingent.server.api.schemas import MarketItem, MarketItemCategory
+
+    catalogue = [MarketItem(id="weather", name="weather", version="1.2.0", category=MarketItemCategory.PLUGIN)]
+
+    class _Backend:
+        async def list_items(self, category, query=None):
+            return catalogue
+
+    service = MarketService(tmp_path, _FakeLogManager(), _Backend())
+    (item,) = await service.get_market_items(MarketItemCategory.PLUGIN, installed_plugins=[{"registry_id": "weather", "version": "1.0.0"}])
+    assert item.is_installed and item.installed_version == "1.0.0" and item.update_available
+    assert not catalogue[0].is_installed
+
+    (item,) = await service.get_market_items(MarketItemCategory.PLUGIN)
+    assert not item.is_installed
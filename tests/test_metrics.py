@@ -0,0 +1,47 @@
+"""
+Tests for the Prometheus exposition and the scrape-time collectors.
+"""
+
+from types import SimpleNamespace
+
+from dingent.core import metrics
+
+
+def _scrape() -> str:
+    content, content_type = metrics.render_metrics()
+    assert content_type.startswith("text/plain")
+    return content.decode()
+
+
+def test_plugin_runtimes_and_db_pool_are_collected_at_scrape_time():
+    manager = SimpleNamespace(_active_runtimes={"a": SimpleNamespace(status="active"), "b": SimpleNamespace(status="error")})
+    metrics.bind_plugin_manager(manager)
+    try:
+        text = _scrape()
+    finally:
+        metrics.bind_plugin_manager(None)
+
+    assert 'dingent_plugin_runtimes{status="active"} 1.0' in text
+    assert 'dingent_plugin_runtimes{status="error"} 1.0' in text
+    assert "dingent_db_pool_checkouts_total" in text
+
+
+def test_checkpoint_write_size_is_observed():
+    class _Serde:
+        def dumps_typed(self, obj):
+            return "json", obj
+
+    checkpointer = SimpleNamespace(serde=_Serde())
+    metrics.instrument_checkpointer(checkpointer)
+    before = metrics.REGISTRY.get_sample_value("dingent_checkpoint_write_bytes_sum") or 0.0
+
+    assert checkpointer.serde.dumps_typed(b"x" * 100) == ("json", b"x" * 100)
+    assert metrics.REGISTRY.get_sample_value("dingent_checkpoint_write_bytes_sum") == before + 100
+
+
+def test_tool_and_chat_series_are_exposed():
+    metrics.TOOL_CALL_ERRORS.labels("plugin-x", "search").inc()
+    metrics.CHAT_RUNS_FINISHED.labels("wf", "ok").inc()
+    text = _scrape()
+    assert 'dingent_tool_call_errors_total{plugin="plugin-x",tool="search"}' in text
+    assert 'dingent_chat_runs_finished_total{outcome="ok",workflow="wf"}' in text
@@ -0,0 +1,114 @@
+"""
+Tests for the process-wide resolution cache and client pool of `ModelResolver`.
+"""
+
+import uuid
+
+import pytest
+from sqlmodel import Session, SQLModel, create_engine
+
+from dingent.core.db.models import Assistant, LLMModelConfig, Workspace
+from dingent.core.llms import resolver as resolver_module
+from dingent.core.llms.resolver import ModelCache, ModelResolver
+
+
+class _FakeClient:
+    def __init__(self, **kwargs):
+        self.kwargs = kwargs
+
+
+@pytest.fixture(autouse=True)
+def fake_client(monkeypatch):
+    monkeypatch.setattr(resolver_module, "ChatLiteLLM", _FakeClient)
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+def test_steady_state_is_cached_and_invalidated(session: Session):
+    workspace = Workspace(name="ws", slug="ws")
+    session.add(workspace)
+    session.flush()
+    config = LLMModelConfig(workspace_id=workspace.id, name="m", provider="openai", model="gpt-4o-mini", encrypted_api_key="sk-test")
+    session.add(config)
+    session.flush()
+    assistant = Assistant(name="a", workspace_id=workspace.id, model_config_id=config.id)
+    session.add(assistant)
+    session.commit()
+
+    cache = ModelCache()
+    first = ModelResolver(session, cache).resolve_for_assistant(assistant.id, None, workspace.id)
+    queries = []
+    session.get = lambda *args, **kwargs: queries.append(args)  # type: ignore[method-assign]
+    second = ModelResolver(session, cache).resolve_for_assistant(assistant.id, None, workspace.id)
+
+    assert first is second
+    assert queries == []
+    assert len(cache) == 1
+
+    cache.invalidate(config.id)
+    assert len(cache) == 0
+    assert cache.get((assistant.id, None, workspace.id)) is None
+
+
+def test_identical_configs_share_one_client():
+    cache = ModelCache()
+    kwargs = {"model": "gpt-4o-mini", "api_key": "sk-test"}
+    a = cache.get_or_create_client(None, dict(kwargs))
+    b = cache.get_or_create_client(None, dict(kwargs))
+    c = cache.get_or_create_client(None, {**kwargs, "api_key": "sk-other"})
+    assert a is b
+    assert a is not c
+
+
+def test_batch_resolution_uses_per_assistant_overrides(session: Session):
+    workspace = Workspace(name="ws", slug="ws")
+    session.add(workspace)
+    session.flush()
+    cheap = LLMModelConfig(workspace_id=workspace.id, name="cheap", provider="openai", model="gpt-4o-mini")
+    heavy = LLMModelConfig(workspace_id=workspace.id, name="heavy", provider="openai", model="gpt-4o")
+    session.add_all([cheap, heavy])
+    session.flush()
+    workspace.default_model_config_id = cheap.id
+    router = Assistant(name="router", workspace_id=workspace.id)
+    specialist = Assistant(name="specialist", workspace_id=workspace.id, model_config_id=heavy.id)
+    session.add_all([workspace, router, specialist])
+    session.commit()
+
+    cache = ModelCache()
+    unknown = uuid.uuid4()
+    llms = ModelResolver(session, cache).resolve_for_assistants([router.id, specialist.id, unknown], None, workspace.id)
+
+    assert llms[router.id].kwargs["model"] == "gpt-4o-mini"
+    assert llms[specialist.id].kwargs["model"] == "gpt-4o"
+    assert llms[unknown] is llms[router.id]
+    # Unknown ids (e.g. the fallback workflow) are not remembered
+    assert cache.lookup((unknown, None, workspace.id)) == (False, None)
+
+    again = ModelResolver(session, cache).resolve_for_assistants([router.id, specialist.id], None, workspace.id)
+    assert again[specialist.id] is llms[specialist.id]
+
+
+def test_resolutions_expire_and_are_bounded(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(resolver_module.time, "monotonic", lambda: now[0])
+    cache = ModelCache(max_resolutions=2, ttl=60)
+    config_id = uuid.uuid4()
+    cache.get_or_create_client(config_id, {"model": "gpt-4o-mini"})
+    keys = [(uuid.uuid4(), None, None) for _ in range(3)]
+    for key in keys:
+        cache.remember(key, config_id)
+
+    # 最早的解析结果被挤出
+    assert cache.lookup(keys[0]) == (False, None)
+    assert cache.get(keys[2]) is not None
+
+    # 过期后重新解析，从而看到其它进程中对配置的修改
+    now[0] += 61
+    assert cache.get(keys[2]) is None
+    assert cache.lookup(keys[1]) == (False, None)
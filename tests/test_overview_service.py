@@ -0,0 +1,81 @@
+"""
+Tests for the cached dashboard overview sections.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from dingent.server.services.overview_service import OverviewService
+
+
+class _FakeLogManager:
+    def __init__(self):
+        self.total = 1
+        self.queries = 0
+
+    def get_log_stats(self):
+        return {"total_logs": self.total, "newest_timestamp": None}
+
+    def get_logs(self, limit):
+        self.queries += 1
+        return []
+
+
+class _FakeMarket:
+    def __init__(self):
+        self.calls = 0
+        self.fail = False
+
+    async def get_market_metadata(self):
+        self.calls += 1
+        if self.fail:
+            raise RuntimeError("offline")
+        return SimpleNamespace(model_dump=lambda: {"version": "1"})
+
+    async def get_market_items(self, _category, installed_plugins):
+        assert installed_plugins == [{"registry_id": "weather", "version": "1.0"}]
+        return [SimpleNamespace(update_available=True)]
+
+
+def _service():
+    manifest = SimpleNamespace(id="weather", display_name="Weather", version="1.0")
+    plugin_manager = SimpleNamespace(list_visible_plugins=lambda: [manifest])
+    return OverviewService(plugin_manager, _FakeLogManager(), _FakeMarket(), market_ttl=300)
+
+
+@pytest.mark.asyncio
+async def test_snapshot_never_waits_and_fills_in_background():
+    service = _service()
+    first = service.snapshot()
+    assert first["market"] is None and first["sections"]["market"]["refreshing"]
+
+    await asyncio.sleep(0.01)
+    second = service.snapshot()
+    assert second["plugins"]["installed_total"] == 1
+    assert second["market"] == {"metadata": {"version": "1"}, "plugin_updates": 1}
+    assert second["stale_at"] is not None
+    # 未过期时不会重复加载
+    assert service.market_service.calls == 1
+    await service.stop()
+
+
+@pytest.mark.asyncio
+async def test_logs_refresh_on_change_and_failures_keep_last_value():
+    service = _service()
+    await service.refresh()
+    queries = service.log_manager.queries
+
+    service.log_manager.total += 1
+    service.snapshot()
+    await asyncio.sleep(0.01)
+    assert service.log_manager.queries == queries + 1
+
+    service.market_service.fail = True
+    service.invalidate("market")
+    await asyncio.sleep(0.01)
+    snapshot = service.snapshot()
+    assert snapshot["market"]["plugin_updates"] == 1
+    assert snapshot["sections"]["market"]["error"] == "offline"
+    await service.stop()
@@ -0,0 +1,124 @@
+"""
+Tests for the incremental, cache-backed PluginRegistry scan.
+"""
+
+import json
+import os
+import threading
+import time
+
+import pytest
+
+from dingent.core.plugins.plugin_registry import PluginRegistry
+from dingent.core.plugins.schemas import PluginManifest
+
+
+class _FakeLogManager:
+    def log_with_context(self, *args, **kwargs):
+        pass
+
+
+def _write_plugin(root, plugin_id, version="0.1.0"):
+    plugin_dir = root / plugin_id
+    plugin_dir.mkdir(parents=True, exist_ok=True)
+    (plugin_dir / "plugin.toml").write_text(
+        f'[plugin]\nid = "{plugin_id}"\ndisplay_name = "{plugin_id}"\ndescription = "demo"\nversion = "{version}"\n\n[plugin.server]\nurl = "http://localhost:9000/mcp"\n'
+    )
+    return plugin_dir
+
+
+@pytest.fixture
+def parse_counter(monkeypatch):
+    calls = []
+    original = PluginManifest.read_meta.__func__
+
+    def counting(cls, toml_path):
+        calls.append(toml_path.parent.name)
+        return original(cls, toml_path)
+
+    monkeypatch.setattr(PluginManifest, "read_meta", classmethod(counting))
+    return calls
+
+
+def test_rescan_only_parses_changed_plugins(tmp_path, parse_counter):
+    plugins = tmp_path / "plugins"
+    _write_plugin(plugins, "alpha")
+    beta = _write_plugin(plugins, "beta")
+    cache_path = tmp_path / "cache" / "manifests.json"
+
+    registry = PluginRegistry(plugins, _FakeLogManager(), cache_path=cache_path)
+    assert sorted(parse_counter) == ["alpha", "beta"]
+
+    parse_counter.clear()
+    assert not registry.reload_plugins()
+    assert parse_counter == []
+
+    # touch 但内容不变：按摘要识别，不重新解析
+    os.utime(beta / "plugin.toml", ns=(1, 1))
+    assert not registry.reload_plugins()
+    assert parse_counter == []
+
+    _write_plugin(plugins, "beta", version="0.2.0")
+    _write_plugin(plugins, "gamma")
+    delta = registry.reload_plugins()
+    assert (delta.added, delta.modified, delta.removed) == ({"gamma"}, {"beta"}, set())
+    assert sorted(parse_counter) == ["beta", "gamma"]
+    assert registry.find_manifest("beta").version == "0.2.0"
+
+    # 重启：持久化缓存让未变化的插件无需解析
+    parse_counter.clear()
+    restarted = PluginRegistry(plugins, _FakeLogManager(), cache_path=cache_path)
+    assert parse_counter == []
+    assert {m.id for m in restarted.get_all_manifests()} == {"alpha", "beta", "gamma"}
+    assert restarted.find_manifest("gamma").path == plugins / "gamma"
+
+
+def test_invalid_cached_meta_is_reparsed_from_disk(tmp_path, parse_counter):
+    plugins = tmp_path / "plugins"
+    _write_plugin(plugins, "alpha")
+    cache_path = tmp_path / "cache" / "manifests.json"
+    PluginRegistry(plugins, _FakeLogManager(), cache_path=cache_path)
+
+    # 例如升级后 PluginManifest 不再接受旧缓存里的字段
+    data = json.loads(cache_path.read_text())
+    for entry in data["entries"].values():
+        entry["meta"] = {"id": None}
+    cache_path.write_text(json.dumps(data))
+    parse_counter.clear()
+
+    restarted = PluginRegistry(plugins, _FakeLogManager(), cache_path=cache_path)
+    assert restarted.find_manifest("alpha") is not None
+    assert parse_counter == ["alpha"]
+    assert next(iter(json.loads(cache_path.read_text())["entries"].values()))["meta"]["id"] == "alpha"
+
+    parse_counter.clear()
+    PluginRegistry(plugins, _FakeLogManager(), cache_path=cache_path)
+    assert parse_counter == []
+
+
+def test_plugin_added_during_a_rescan_is_not_dropped(tmp_path, monkeypatch):
+    plugins = tmp_path / "plugins"
+    _write_plugin(plugins, "alpha")
+    registry = PluginRegistry(plugins, _FakeLogManager())
+
+    scanning, resume = threading.Event(), threading.Event()
+    original = registry._load_entry
+
+    def slow_load_entry(plugin_path):
+        scanning.set()
+        resume.wait(5)
+        return original(plugin_path)
+
+    monkeypatch.setattr(registry, "_load_entry", slow_load_entry)
+    # 目录监听的重新扫描已经列出目录，此时市场安装了新插件
+    rescan = threading.Thread(target=registry.reload_plugins)
+    rescan.start()
+    assert scanning.wait(5)
+    installed = threading.Thread(target=registry.add_manifest_from_dir, args=(_write_plugin(tmp_path / "market", "beta"),))
+    installed.start()
+    time.sleep(0.1)
+    resume.set()
+    rescan.join(5)
+    installed.join(5)
+
+    assert registry.find_manifest("beta") is not None
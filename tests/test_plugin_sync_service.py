@@ -0,0 +1,79 @@
+"""
+Tests for the hash-based, delta-aware PluginSyncService.
+"""
+
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from dingent.core.db.models import Plugin
+from dingent.core.plugins.schemas import PluginManifest
+from dingent.server.services.plugin_sync_service import PluginSyncService
+
+
+class _FakeRegistry:
+    def __init__(self, manifests):
+        self.manifests = manifests
+
+    def get_all_manifests(self):
+        return list(self.manifests)
+
+
+def _manifest(plugin_id, version="0.1.0", config_schema=None):
+    return PluginManifest(
+        id=plugin_id,
+        display_name=plugin_id,
+        description="demo",
+        version=version,
+        server={"url": "http://localhost:9000/mcp"},
+        config_schema=config_schema,
+    )
+
+
+def test_only_changed_plugins_are_written():
+    engine = create_engine("sqlite://")
+    SQLModel.metadata.create_all(engine)
+    registry = _FakeRegistry([_manifest("alpha"), _manifest("beta")])
+
+    with Session(engine) as session:
+        assert PluginSyncService(session, registry).sync() == {"inserted": 2, "updated": 0, "deleted": 0}
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, sql, *args: statements.append(sql))
+    with Session(engine) as session:
+        assert PluginSyncService(session, registry).sync() == {"inserted": 0, "updated": 0, "deleted": 0}
+    assert not [sql for sql in statements if sql.lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))]
+
+    registry.manifests = [
+        _manifest("alpha", config_schema=[{"name": "API_KEY", "type": "string", "required": True, "secret": True}]),
+        _manifest("gamma"),
+    ]
+    with Session(engine) as session:
+        assert PluginSyncService(session, registry).sync() == {"inserted": 1, "updated": 1, "deleted": 1}
+        alpha = session.exec(select(Plugin).where(Plugin.registry_id == "alpha")).one()
+        assert alpha.config_schema["required"] == ["API_KEY"]
+        assert sorted(session.exec(select(Plugin.registry_id)).all()) == ["alpha", "gamma"]
+
+    # 只同步指定的 ID：其余插件即使不在注册表中也不会被删除
+    registry.manifests = [_manifest("alpha", version="0.2.0")]
+    with Session(engine) as session:
+        assert PluginSyncService(session, registry).sync(ids={"alpha"}) == {"inserted": 0, "updated": 1, "deleted": 0}
+        assert sorted(session.exec(select(Plugin.registry_id)).all()) == ["alpha", "gamma"]
+
+
+def test_concurrent_insert_of_the_same_plugin_is_retried_as_update(tmp_path):
+    url = f"sqlite:///{tmp_path / 'plugins.db'}"
+    engine, other_worker = create_engine(url), create_engine(url)
+    SQLModel.metadata.create_all(engine)
+
+    def race(_conn, _cursor, sql, *_args):
+        # 模拟另一个 worker 在本次读取之后、写入之前插入了同一个插件（另一个进程不共享进程内的锁）
+        if sql.lstrip().upper().startswith("INSERT") and not race.done:
+            race.done = True
+            with Session(other_worker) as other:
+                PluginSyncService(other, _FakeRegistry([_manifest("alpha")]))._sync(None)
+
+    race.done = False
+    event.listen(engine, "before_cursor_execute", race)
+    with Session(engine) as session:
+        assert PluginSyncService(session, _FakeRegistry([_manifest("alpha", version="0.2.0")])).sync() == {"inserted": 0, "updated": 1, "deleted": 0}
+        assert session.exec(select(Plugin.version)).all() == ["0.2.0"]
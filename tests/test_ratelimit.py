@@ -0,0 +1,40 @@
+"""
+Tests for the token-bucket rate limiter and its bucket stores.
+"""
+
+from dingent.core.ratelimit import InMemoryBucketStore, RateLimiter, SqliteBucketStore
+
+
+def test_burst_then_refusal_then_refill(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr("dingent.core.ratelimit.time.monotonic", lambda: now[0])
+    limiter = RateLimiter(InMemoryBucketStore())
+
+    assert [limiter.hit("visitor:a", per_minute=60, burst=3) for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert limiter.hit("visitor:a", per_minute=60, burst=3) == 1.0
+    # 其他 key 不受影响
+    assert limiter.hit("visitor:b", per_minute=60, burst=3) == 0.0
+
+    now[0] += 1.0
+    assert limiter.hit("visitor:a", per_minute=60, burst=3) == 0.0
+
+
+def test_non_positive_rate_disables_limit():
+    limiter = RateLimiter(InMemoryBucketStore())
+    assert all(limiter.hit("ws:x", per_minute=0, burst=1) == 0.0 for _ in range(100))
+
+
+def test_in_memory_store_is_bounded():
+    store = InMemoryBucketStore(max_keys=2)
+    for key in ("a", "b", "c"):
+        store.take(key, rate_per_second=1.0, burst=1.0)
+    assert list(store._buckets) == ["b", "c"]
+
+
+def test_sqlite_store_is_shared_between_instances(tmp_path):
+    path = tmp_path / "ratelimit.sqlite"
+    first, second = RateLimiter(SqliteBucketStore(path)), RateLimiter(SqliteBucketStore(path))
+
+    assert first.hit("ip:1", per_minute=1, burst=2) == 0.0
+    assert second.hit("ip:1", per_minute=1, burst=2) == 0.0
+    assert first.hit("ip:1", per_minute=1, burst=2) > 0
@@ -0,0 +1,89 @@
+"""
+Tests for `dingent serve`: graceful drain in the service manager and the readiness probe.
+"""
+
+import asyncio
+import sys
+
+import pytest
+
+from dingent.cli.cli import AsyncServiceManager, ServiceConfig
+
+# 收到 SIGTERM 时报告 drain 文件是否已存在，然后退出
+_CHILD = """
+import os, signal, sys, time
+def on_term(*_):
+    print("drained" if os.path.exists(sys.argv[1]) else "not drained", flush=True)
+    sys.exit(0)
+signal.signal(signal.SIGTERM, on_term)
+print("up", flush=True)
+while True:
+    time.sleep(0.05)
+"""
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="relies on SIGTERM handlers")
+@pytest.mark.asyncio
+async def test_shutdown_marks_service_draining_before_sigterm(tmp_path, capsys):
+    drain_file = tmp_path / "draining"
+    service = ServiceConfig(name="backend", command=[sys.executable, "-c", _CHILD, str(drain_file)], color="magenta", drain_file=drain_file, drain_delay=0.2)
+    manager = AsyncServiceManager(auto_open_browser=False, json_logs=True)
+
+    async def stop_when_up():
+        while "backend" not in manager.processes:
+            await asyncio.sleep(0.05)
+        await asyncio.sleep(0.3)
+        await manager.shutdown()
+
+    await asyncio.gather(manager.run_all([service]), stop_when_up())
+    out = capsys.readouterr().out
+    assert drain_file.exists()
+    assert '"message": "drained"' in out
+    assert out.index("is draining") < out.index('"message": "drained"')
+
+
+@pytest.mark.asyncio
+async def test_readiness_reflects_startup_and_drain(tmp_path, monkeypatch):
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from dingent.core.config import settings
+    from dingent.server.api import api_router
+
+    drain_file = tmp_path / "draining"
+    monkeypatch.setattr(settings, "DRAIN_FILE", str(drain_file))
+    app = FastAPI()
+    app.include_router(api_router)
+    client = TestClient(app)
+
+    copilot_ready = asyncio.get_running_loop().create_future()
+    app.state.copilot_ready = copilot_ready
+    assert client.get("/health/ready").json() == {"status": "starting"}
+    assert client.get("/health").status_code == 200
+
+    copilot_ready.set_result(None)
+    assert client.get("/health/ready").status_code == 200
+
+    drain_file.touch()
+    response = client.get("/health/ready")
+    assert (response.status_code, response.json()) == (503, {"status": "draining"})
+
+
+def test_multiple_workers_need_a_shared_rate_limit_backend(tmp_path, monkeypatch):
+    from dingent.core.config import settings
+    from dingent.server import workers
+
+    calls = []
+    monkeypatch.setattr(workers, "create_db_and_tables", lambda: calls.append("init"))
+    monkeypatch.setattr(settings, "RATE_LIMIT_ENABLED", True)
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "memory")
+    with pytest.raises(workers.WorkerConfigError):
+        workers.prepare_workers(4, tmp_path)
+    assert workers.prepare_workers(1, tmp_path) == {"DB_INIT_ON_STARTUP": "false"}
+
+    monkeypatch.setattr(settings, "RATE_LIMIT_BACKEND", "sqlite")
+    env = workers.prepare_workers(4, tmp_path)
+    assert env["LOG_SHARED_STORE"] == "true"
+    assert (tmp_path / "prometheus").is_dir() and env["PROMETHEUS_MULTIPROC_DIR"] == str(tmp_path / "prometheus")
+    # 表结构只在父进程中初始化，worker 启动时跳过
+    assert calls == ["init", "init"] and env["DB_INIT_ON_STARTUP"] == "false"
@@ -0,0 +1,25 @@
+"""
+Tests for the `-X importtime` parsing behind `dingent profile-startup`.
+"""
+
+from dingent.cli.startup_profile import by_package, parse_importtime, profile_imports
+
+REPORT = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 |     pkg.sub.leaf
+import time:       300 |        420 |   pkg.sub
+import time:        80 |        500 | pkg
+import time:        50 |         50 | other
+Traceback lines and other noise are ignored
+"""
+
+
+def test_parse_and_group_by_package():
+    records = parse_importtime(REPORT)
+    assert [(r.module, r.depth) for r in records] == [("pkg.sub.leaf", 2), ("pkg.sub", 1), ("pkg", 0), ("other", 0)]
+    assert by_package(records) == [("pkg", 500), ("other", 50)]
+
+
+def test_profile_imports_runs_in_fresh_interpreter():
+    records = profile_imports("json")
+    assert "json" in {r.module for r in records}
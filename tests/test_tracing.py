@@ -0,0 +1,61 @@
+"""
+Tests for the span recorder and its in-process exporter.
+"""
+
+import asyncio
+from contextlib import nullcontext
+
+import pytest
+
+from dingent.core.logs.correlation import correlation_scope
+from dingent.core.tracing import InProcessExporter, SpanRecorder
+
+
+def test_disabled_recorder_is_noop():
+    recorder = SpanRecorder()
+    assert not recorder.enabled
+    assert isinstance(recorder.span("llm.call"), nullcontext)
+
+
+def test_stage_percentiles_and_run_breakdown():
+    exporter = InProcessExporter()
+    recorder = SpanRecorder(exporter)
+
+    with correlation_scope("run-1"):
+        for _ in range(3):
+            with recorder.span("tool.call", tool="search"):
+                pass
+        with pytest.raises(RuntimeError):
+            with recorder.span("llm.call"):
+                raise RuntimeError("boom")
+    with recorder.span("graph.build"):
+        pass
+
+    stages = exporter.stage_percentiles()
+    assert stages["tool.call"]["count"] == 3
+    assert stages["tool.call"]["p50"] <= stages["tool.call"]["p99"] <= stages["tool.call"]["max"]
+    assert set(stages) == {"tool.call", "llm.call", "graph.build"}
+
+    breakdown = exporter.run_breakdown("run-1")
+    assert breakdown["stages"]["tool.call"]["count"] == 3
+    assert [s["status"] for s in breakdown["spans"] if s["name"] == "llm.call"] == ["error"]
+    assert "graph.build" not in breakdown["stages"]
+    assert exporter.recent_runs() == ["run-1"]
+    assert exporter.run_breakdown("missing") is None
+
+
+def test_async_spans_keep_their_run():
+    exporter = InProcessExporter()
+    recorder = SpanRecorder(exporter)
+
+    async def run(cid: str):
+        with correlation_scope(cid):
+            with recorder.span("llm.call"):
+                await asyncio.sleep(0)
+
+    async def main():
+        await asyncio.gather(run("a"), run("b"))
+
+    asyncio.run(main())
+    assert exporter.run_breakdown("a")["stages"]["llm.call"]["count"] == 1
+    assert exporter.run_breakdown("b")["stages"]["llm.call"]["count"] == 1
@@ -0,0 +1,88 @@
+"""
+Tests for the batched usage ledger and its daily rollups.
+"""
+
+import asyncio
+from datetime import UTC, datetime
+from types import SimpleNamespace
+from uuid import uuid4
+
+import pytest
+from sqlalchemy.pool import StaticPool
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from dingent.core.db.models import UsageDailyRollup, UsageRecord
+from dingent.core.llms.usage_ledger import UsageEvent, UsageLedger, UsageScope, principal_key, usage_metadata, usage_scope
+
+
+@pytest.fixture
+def engine():
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    return engine
+
+
+def _event(workspace_id, user_id=None, model="gpt-4o", cost=0.5, prompt=10, completion=5):
+    return UsageEvent(
+        timestamp=datetime.now(UTC).replace(tzinfo=None),
+        model=model,
+        workspace_id=workspace_id,
+        user_id=user_id,
+        prompt_tokens=prompt,
+        completion_tokens=completion,
+        cost=cost,
+    )
+
+
+def test_batches_append_records_and_bump_rollups(engine):
+    ledger = UsageLedger(engine)
+    workspace_id, user_id = uuid4(), uuid4()
+    ledger.write_batch([_event(workspace_id, user_id), _event(workspace_id, user_id), _event(workspace_id, model="gpt-4o-mini", cost=0.1)])
+    ledger.write_batch([_event(workspace_id, user_id)])
+
+    with Session(engine) as session:
+        assert len(session.exec(select(UsageRecord)).all()) == 4
+        rollups = session.exec(select(UsageDailyRollup)).all()
+    assert len(rollups) == 2
+    user_rollup = next(r for r in rollups if r.principal == principal_key(user_id, None))
+    assert (user_rollup.requests, user_rollup.prompt_tokens, user_rollup.cost) == (3, 30, 1.5)
+
+    assert ledger.spend(workspace_id)["cost"] == pytest.approx(1.6)
+    assert ledger.spend(workspace_id, principal_key(user_id, None))["requests"] == 3
+    assert [row["model"] for row in ledger.breakdown(workspace_id, "model")] == ["gpt-4o", "gpt-4o-mini"]
+    assert ledger.daily(workspace_id)[-1]["total_tokens"] == 60
+    assert ledger.over_budget(workspace_id, "", workspace_budget=1.0, principal_budget=None) is not None
+    assert ledger.over_budget(workspace_id, "", workspace_budget=10.0, principal_budget=None) is None
+    assert ledger.over_budget(workspace_id, "", workspace_tokens=60) is not None
+    assert ledger.over_budget(workspace_id, principal_key(user_id, None), principal_tokens=46) is None
+
+
+@pytest.mark.asyncio
+async def test_queued_events_count_towards_spend_before_flush(engine):
+    ledger = UsageLedger(engine, flush_interval=60)
+    ledger.start()
+    workspace_id = uuid4()
+    ledger.record(_event(workspace_id, cost=2.0))
+    await asyncio.sleep(0)
+
+    # 尚未落库，但预算检查已能看到
+    assert ledger.spend(workspace_id)["cost"] == 2.0
+    await ledger.stop()
+
+    with Session(engine) as session:
+        assert len(session.exec(select(UsageRecord)).all()) == 1
+    assert ledger.spend(workspace_id)["cost"] == 2.0
+
+
+def test_usage_scope_feeds_litellm_metadata():
+    workspace_id, assistant_id = uuid4(), uuid4()
+    assert usage_metadata("agent") == {}
+    with usage_scope(UsageScope(workspace_id=workspace_id, visitor_id="v-1", assistant_ids={"agent": assistant_id})):
+        metadata = usage_metadata("agent")
+    assert metadata == {"workspace_id": str(workspace_id), "visitor_id": "v-1", "assistant_id": str(assistant_id)}
+
+    kwargs = {"model": "gpt-4o", "response_cost": 0.25, "litellm_params": {"metadata": metadata}}
+    event = UsageEvent.from_litellm(kwargs, SimpleNamespace(usage=SimpleNamespace(prompt_tokens=3, completion_tokens=4)))
+    assert event.workspace_id == workspace_id
+    assert event.rollup_key[2] == "visitor:v-1"
+    assert (event.prompt_tokens, event.completion_tokens, event.cost) == (3, 4, 0.25)
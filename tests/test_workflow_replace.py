@@ -0,0 +1,110 @@
+"""
+Tests for the set-based `replace_workflow` implementation.
+
+Both the full replace mode and the diff mode are exercised against an
+in-memory SQLite database.
+"""
+
+import uuid
+
+import pytest
+from sqlalchemy import event
+from sqlmodel import Session, SQLModel, create_engine, select
+
+from dingent.core.db.crud import workflow as crud_workflow
+from dingent.core.db.models import Assistant, Workflow, WorkflowEdge, WorkflowNode, Workspace
+from dingent.core.workflows.schemas import WorkflowEdgeCreate, WorkflowNodeCreate, WorkflowReplace
+
+
+@pytest.fixture
+def session():
+    engine = create_engine("sqlite://")
+    event.listen(engine, "connect", lambda conn, _: conn.execute("PRAGMA foreign_keys=ON;"))
+    SQLModel.metadata.create_all(engine)
+    with Session(engine, expire_on_commit=False) as session:
+        yield session
+
+
+@pytest.fixture
+def workflow(session: Session):
+    workspace = Workspace(name="ws", slug="ws")
+    session.add(workspace)
+    session.flush()
+    wf = Workflow(name="wf", workspace_id=workspace.id)
+    session.add(wf)
+    session.commit()
+    return wf
+
+
+def _make_assistants(session: Session, workspace_id: uuid.UUID, count: int) -> list[Assistant]:
+    assistants = [Assistant(name=f"assistant-{i}", workspace_id=workspace_id) for i in range(count)]
+    session.add_all(assistants)
+    session.commit()
+    return assistants
+
+
+def _chain_payload(assistants: list[Assistant]) -> WorkflowReplace:
+    nodes = [WorkflowNodeCreate(id=f"client-{i}", assistant_id=a.id, is_start_node=i == 0, position={"x": float(i), "y": 0.0}) for i, a in enumerate(assistants)]
+    edges = [WorkflowEdgeCreate(source_node_id=f"client-{i}", target_node_id=f"client-{i + 1}") for i in range(len(assistants) - 1)]
+    return WorkflowReplace(name="wf", nodes=nodes, edges=edges)
+
+
+def test_replace_workflow_bulk_inserts_graph(session: Session, workflow: Workflow):
+    assistants = _make_assistants(session, workflow.workspace_id, 200)
+
+    crud_workflow.replace_workflow(session, workflow, _chain_payload(assistants))
+
+    nodes = session.exec(select(WorkflowNode).where(WorkflowNode.workflow_id == workflow.id)).all()
+    edges = session.exec(select(WorkflowEdge).where(WorkflowEdge.workflow_id == workflow.id)).all()
+    assert len(nodes) == 200
+    assert len(edges) == 199
+    assert sum(n.is_start_node for n in nodes) == 1
+    node_ids = {n.id for n in nodes}
+    assert all(e.source_node_id in node_ids and e.target_node_id in node_ids for e in edges)
+
+    # A second full replace drops the previous graph completely
+    crud_workflow.replace_workflow(session, workflow, _chain_payload(assistants[:3]))
+    assert len(session.exec(select(WorkflowNode).where(WorkflowNode.workflow_id == workflow.id)).all()) == 3
+    assert len(session.exec(select(WorkflowEdge).where(WorkflowEdge.workflow_id == workflow.id)).all()) == 2
+
+
+def test_replace_workflow_diff_only_touches_changed_rows(session: Session, workflow: Workflow):
+    assistants = _make_assistants(session, workflow.workspace_id, 3)
+    crud_workflow.replace_workflow(session, workflow, _chain_payload(assistants), diff=True)
+
+    before = {n.assistant_id: n for n in session.exec(select(WorkflowNode)).all()}
+    edges_before = {e.id for e in session.exec(select(WorkflowEdge)).all()}
+    first, second, third = (before[a.id] for a in assistants)
+
+    # The editor echoes DB ids back: move one node, drop the last one and its edge, add a new one.
+    new_assistant = Assistant(name="assistant-new", workspace_id=workflow.workspace_id)
+    session.add(new_assistant)
+    session.commit()
+    payload = WorkflowReplace(
+        name="wf-renamed",
+        nodes=[
+            WorkflowNodeCreate(id=str(first.id), assistant_id=first.assistant_id, is_start_node=True, position={"x": 0.0, "y": 0.0}),
+            WorkflowNodeCreate(id=str(second.id), assistant_id=second.assistant_id, position={"x": 42.0, "y": 7.0}),
+            WorkflowNodeCreate(id="client-new", assistant_id=new_assistant.id, position={"x": 9.0, "y": 9.0}),
+        ],
+        edges=[
+            WorkflowEdgeCreate(source_node_id=str(first.id), target_node_id=str(second.id)),
+            WorkflowEdgeCreate(source_node_id=str(second.id), target_node_id="client-new"),
+        ],
+    )
+    crud_workflow.replace_workflow(session, workflow, payload, diff=True)
+
+    after = {n.assistant_id: n for n in session.exec(select(WorkflowNode)).all()}
+    assert workflow.name == "wf-renamed"
+    assert after[first.assistant_id].id == first.id
+    assert after[second.assistant_id].id == second.id
+    assert after[second.assistant_id].position == {"x": 42.0, "y": 7.0}
+    assert third.assistant_id not in after
+    assert new_assistant.id in after
+
+    edges_after = session.exec(select(WorkflowEdge)).all()
+    assert len(edges_after) == 2
+    # The untouched first -> second edge keeps its row
+    kept = [e for e in edges_after if e.source_node_id == first.id]
+    assert len(kept) == 1 and kept[0].id in edges_before
+    assert any(e.target_node_id == after[new_assistant.id].id for e in edges_after)